@@ -1,54 +1,88 @@
+import hashlib
+import itertools
+import json
 import logging
 import os
-import pandas as pd
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from dotenv import load_dotenv
 
+try:
+    import orjson
+except ImportError:  # Optional: only makes large JSON responses faster to serialize
+    orjson = None
+
 # Load environment variables
 load_dotenv()
-from flask import Flask, render_template, request, jsonify, flash, redirect, url_for
+from flask import Flask, Response, render_template, request, jsonify, session, g, stream_with_context
+from flask.json.provider import DefaultJSONProvider
 from werkzeug.utils import secure_filename
-from trino.dbapi import connect
-from datahub.emitter.rest_emitter import DatahubRestEmitter
-from datahub.metadata.schema_classes import (
-    DatasetSnapshotClass,
-    MetadataChangeEventClass,
-    DatasetPropertiesClass,
-    SchemaMetadataClass,
-    SchemaFieldClass,
-    SchemaFieldDataTypeClass,
-    StringTypeClass,
-    BooleanTypeClass,
-    NumberTypeClass,
-    AuditStampClass,
-    OtherSchemaClass,
-    OwnershipClass,
-    OwnerClass,
-    OwnershipTypeClass,
-    InstitutionalMemoryClass,
-    InstitutionalMemoryMetadataClass,
-    GlobalTagsClass,
-    TagAssociationClass,
-    DomainsClass
-)
+
 import datetime
 
 # Import configuration first
 from config import (
-    TRINO_HOST, TRINO_PORT, TRINO_USER,
-    DATAHUB_GMS, PLATFORM, PLATFORM_INSTANCE, ENV, OWNER_URN,
+    TRINO_HOST, TRINO_PORT,
+    DATAHUB_GMS, PLATFORM, ENV, OWNER_URN,
     FLASK_HOST, FLASK_PORT, FLASK_DEBUG, SECRET_KEY,
-    UPLOAD_FOLDER, MAX_CONTENT_LENGTH, TABLE_TAGS, COLUMN_TAGS
+    UPLOAD_FOLDER, MAX_CONTENT_LENGTH, TABLE_TAGS, COLUMN_TAGS,
+    PRELOAD_MODULES, CRAWLER_ENABLED,
+    EMIT_CONCURRENT, EMIT_TRINO_CONCURRENCY, EMIT_GMS_CONCURRENCY, TRINO_COUNT_TIMEOUT,
+    EMISSION_LEDGER_PATH, EMIT_MODE,
+    SESSION_IDLE_TIMEOUT, SESSION_MAX_COUNT, SESSION_MAX_BYTES,
+    METADATA_DB_PATH, METADATA_WORKSPACE_TTL, METADATA_SWEEP_INTERVAL, DEAD_LETTER_PATH,
+    COMPRESS_MIN_SIZE, COMPRESS_LEVEL, UPLOAD_PART_SIZE, UPLOAD_CSV_CHUNK_ROWS, UPLOAD_EXPIRY,
+    UPLOAD_MAX_SIZE, UPLOAD_MAX_OPEN,
+    VALIDATION_MAX_ISSUES
 )
+from lazy_imports import (
+    np, pd, datahub_mcp, datahub_rest_emitter, schema_classes, LAZY_MODULES
+)
+from metrics import (
+    metrics, http_request_latency, datahub_emit_latency, datahub_emit_payload_bytes, datahub_emit_failures,
+    emission_tables, csv_upload_latency, csv_upload_rows
+)
+from retry import call_with_retry
+from stores import MetadataStore, EmissionLedger, DeadLetterQueue, _sha256_json
+from trino_catalog import TrinoConnector, trino_pool, metadata_cache, trino_connector, catalog_crawler
+from emission_jobs import submit_emission_job, find_emission_job
+
+class FastJSONProvider(DefaultJSONProvider):
+    """jsonify() through orjson when it is installed, with the standard encoder as the fallback"""
+    
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs.get('indent'):
+            return super().dumps(obj, **kwargs)
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if kwargs.get('sort_keys', self.sort_keys):
+            option |= orjson.OPT_SORT_KEYS
+        try:
+            return orjson.dumps(obj, default=kwargs.get('default', self.default), option=option).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits, which only the standard encoder handles
+            return super().dumps(obj, **kwargs)
+
+def dumps_json(value):
+    """Compact JSON text for a value, via orjson when installed; unknown types become strings"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
+        except TypeError:
+            pass
+    return json.dumps(value, default=str)
 
 # Flask app setup
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 app.secret_key = SECRET_KEY
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
-# Create uploads directory
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -60,121 +94,509 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Global variables to store data
-current_catalogs = []
-current_schemas = []
-current_tables = []
-current_table_columns = {}
-selected_catalog = ""
-selected_schema = ""
-current_metadata = {}
-uploaded_metadata = {}
-
-# Session-based storage to prevent persistence across page reloads
-import uuid
-session_id = str(uuid.uuid4())
+# SQLite stores; opened by create_app() so that importing this module touches no files
+metadata_store = None
+emission_ledger = None
+dead_letter_queue = None
+
+# Serializing a payload a second time just to measure it costs about as much as the
+# emitter's own serialization, so only every Nth call's size is recorded
+PAYLOAD_SAMPLE_EVERY = 20
+payload_sample_counter = itertools.count()
+
+def instrumented_emit(method, call, items, slots=None):
+    """Run one DataHub emitter call with retries, recording latency and failures per attempt and sampled payload sizes.
+    
+    slots, a semaphore bounding concurrent GMS calls, is held for each attempt only,
+    so other tables can post while this one backs off.
+    """
+    def attempt():
+        with slots or nullcontext():
+            try:
+                with datahub_emit_latency.time(method=method):
+                    return call()
+            except Exception:
+                datahub_emit_failures.inc(method=method)
+                raise
+    
+    if next(payload_sample_counter) % PAYLOAD_SAMPLE_EVERY == 0:
+        datahub_emit_payload_bytes.observe(sum(len(json.dumps(item.to_obj())) for item in items), method=method)
+    return call_with_retry('datahub', attempt)
 
-# Tags are now imported from config.py
-class TrinoConnector:
+class CatalogIndex:
+    """Loaded schemas and tables of one catalog with hashed lookups by 'schema.table' key.
+
+    Tables are kept per schema in load order, so listing a schema is a dict lookup
+    and checking N keys costs N hash lookups instead of N list scans. An index stored
+    in a SessionState is replaced rather than mutated; copy() it before making changes.
+    """
+    
     def __init__(self):
-        self.conn = None
-        self.cursor = None
+        self._schemas = {}  # schema -> {table: None}, an insertion-ordered set
+        self._keys = set()  # 'schema.table'
     
-    def connect(self, catalog=None, schema=None):
-        try:
-            self.conn = connect(
-                host=TRINO_HOST,
-                port=TRINO_PORT,
-                user=TRINO_USER,
-                catalog=catalog or "system",
-                schema=schema or "information_schema",
+    def copy(self):
+        index = CatalogIndex()
+        index._schemas = {schema: dict(tables) for schema, tables in self._schemas.items()}
+        index._keys = set(self._keys)
+        return index
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    def __contains__(self, table_key):
+        return table_key in self._keys
+    
+    def add_schemas(self, schemas):
+        """Add schemas, returning the ones that were not indexed yet"""
+        added = []
+        for schema in schemas:
+            if schema not in self._schemas:
+                self._schemas[schema] = {}
+                added.append(schema)
+        return added
+    
+    def add_tables(self, schema, tables):
+        """Add tables to a schema (indexing the schema too), returning the ones that were new"""
+        schema_tables = self._schemas.setdefault(schema, {})
+        added = []
+        for table in tables:
+            if table not in schema_tables:
+                schema_tables[table] = None
+                self._keys.add(f"{schema}.{table}")
+                added.append(table)
+        return added
+    
+    def set_tables(self, schema, tables):
+        """Replace the tables indexed for a schema"""
+        for table in self._schemas.get(schema, ()):
+            self._keys.discard(f"{schema}.{table}")
+        self._schemas[schema] = {}
+        self.add_tables(schema, tables)
+    
+    def has_schema(self, schema):
+        return schema in self._schemas
+    
+    def has_table(self, schema, table):
+        return table in self._schemas.get(schema, ())
+    
+    def schemas(self):
+        return list(self._schemas)
+    
+    def tables(self, schema):
+        """Tables of one schema, in the order they were loaded"""
+        return list(self._schemas.get(schema, ()))
+    
+    def missing_schemas(self, schemas):
+        return [schema for schema in dict.fromkeys(schemas) if schema not in self._schemas]
+    
+    def missing_tables(self, table_keys):
+        """The 'schema.table' keys that are not indexed, in the order given"""
+        return [table_key for table_key in dict.fromkeys(table_keys) if table_key not in self._keys]
+
+class SessionState:
+    """Loaded catalogs/schemas/tables for one browser session.
+
+    Fields are replaced through update() so the approximate memory footprint can be
+    checked against the per-session limit before anything is stored. Hold `lock`
+    around read-modify-write sequences. Metadata lives in metadata_store under the
+    session ID, so it survives restarts and eviction of this in-memory state.
+    
+    version increases with every change and is what response ETags are derived from.
+    
+    catalog_index mirrors the loaded schemas and tables (including tables of schemas
+    other than the selected one) for membership checks; update() keeps it in step
+    with current_schemas/current_tables unless a prepared index is passed in.
+    
+    Sizes are estimated without serializing whole fields: name lists from their
+    string lengths, and current_table_columns per table, measuring only the tables
+    whose column list is not already accounted for.
+    """
+    
+    SIZED_FIELDS = (
+        'current_catalogs', 'current_schemas', 'current_tables', 'current_table_columns'
+    )
+    
+    def __init__(self, session_id, max_bytes=SESSION_MAX_BYTES):
+        self.session_id = session_id
+        self.max_bytes = max_bytes
+        self.lock = threading.RLock()
+        self.created_at = time.time()
+        self.last_access = time.monotonic()
+        self.reset()
+    
+    def reset(self):
+        with self.lock:
+            # Keeps counting across resets so ETags built from it never repeat
+            self.version = getattr(self, 'version', 0) + 1
+            self.current_catalogs = []
+            self.current_schemas = []
+            self.current_tables = []
+            self.current_table_columns = {}
+            self.selected_catalog = ""
+            self.selected_schema = ""
+            self.catalog_index = CatalogIndex()
+            self._field_sizes = {name: 2 for name in self.SIZED_FIELDS}
+            self._column_sizes = {}  # table -> (columns list, its estimated size)
+    
+    @property
+    def size_bytes(self):
+        return sum(self._field_sizes.values())
+    
+    def _check_limit(self, field_sizes):
+        size = sum(field_sizes.values())
+        if self.max_bytes > 0 and size > self.max_bytes:
+            raise ValueError(
+                f'Session data would grow to about {size:,} bytes, over the '
+                f'{self.max_bytes:,} byte per-session limit - clear some loaded data first'
             )
-            self.cursor = self.conn.cursor()
-            logger.info(f"Successfully Connected to Trino")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to connect to Trino: {str(e)}")
-            return False
     
-    def get_catalogs(self):
-        try:
-            if not self.connect():
-                return []
-            query = "SHOW CATALOGS"
-            self.cursor.execute(query)
-            catalogs = [row[0] for row in self.cursor.fetchall()]
-            logger.info(f"Found {len(catalogs)} catalogs")
-            return catalogs
-        except Exception as e:
-            logger.error(f"Failed to fetch catalogs: {str(e)}")
-            return []
+    @staticmethod
+    def _names_size(names):
+        """Approximate JSON size of a list of names"""
+        return sum(map(len, names)) + 4 * len(names) + 2
     
-    def get_schemas(self, catalog):
-        try:
-            if not self.connect(catalog):
-                return []
-            query = f"SHOW SCHEMAS FROM {catalog}"
-            self.cursor.execute(query)
-            schemas = [row[0] for row in self.cursor.fetchall()]
-            logger.info(f"Found {len(schemas)} schemas in catalog {catalog}")
-            return schemas
-        except Exception as e:
-            logger.error(f"Failed to fetch schemas from catalog {catalog}: {str(e)}")
-            return []
+    def _measure_columns(self, table_columns):
+        """Estimated size of each table's columns, reusing the sizes of column lists already measured"""
+        sizes = {}
+        for table, columns in table_columns.items():
+            known = self._column_sizes.get(table)
+            if known is not None and known[0] is columns:
+                sizes[table] = known
+            else:
+                sizes[table] = (columns, len(table) + 4 + len(json.dumps(columns, default=str)))
+        return sizes
     
-    def get_tables(self, catalog, schema):
-        try:
-            if not self.connect(catalog, schema):
-                return []
-            query = f"SHOW TABLES FROM {catalog}.{schema}"
-            self.cursor.execute(query)
-            tables = [row[0] for row in self.cursor.fetchall()]
-            logger.info(f"Found {len(tables)} tables in {catalog}.{schema}")
-            return tables
-        except Exception as e:
-            logger.error(f"Failed to fetch tables from {catalog}.{schema}: {str(e)}")
-            return []
+    def update(self, **fields):
+        """Replace fields, raising ValueError (and changing nothing) if the session limit would be exceeded"""
+        with self.lock:
+            field_sizes = dict(self._field_sizes)
+            column_sizes = self._column_sizes
+            for name, value in fields.items():
+                if name == 'current_table_columns':
+                    column_sizes = self._measure_columns(value)
+                    field_sizes[name] = 2 + sum(size for _, size in column_sizes.values())
+                elif name in field_sizes:
+                    field_sizes[name] = self._names_size(value)
+            self._check_limit(field_sizes)
+            if {'selected_catalog', 'current_schemas', 'current_tables'} & fields.keys():
+                fields['catalog_index'] = self._updated_index(fields)
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._field_sizes = field_sizes
+            self._column_sizes = column_sizes
+            self.version += 1
     
-    def get_table_columns(self, catalog, schema, table_name):
-        try:
-            if not self.connect(catalog, schema):
-                return []
-            query = f"DESCRIBE {catalog}.{schema}.{table_name}"
-            self.cursor.execute(query)
-            columns = self.cursor.fetchall()
-            return [{'name': col[0], 'type': col[1]} for col in columns]
-        except Exception as e:
-            logger.error(f"Failed to get columns for {catalog}.{schema}.{table_name}: {str(e)}")
-            return []
+    def _updated_index(self, fields):
+        """Catalog index reflecting an update of the selected catalog or the schema/table lists"""
+        if 'catalog_index' in fields:
+            index = fields['catalog_index']
+        elif fields.get('selected_catalog', self.selected_catalog) != self.selected_catalog:
+            index = CatalogIndex()
+        else:
+            index = self.catalog_index.copy()
+        if 'current_schemas' in fields:
+            index.add_schemas(fields['current_schemas'])
+        schema = fields.get('selected_schema', self.selected_schema)
+        if 'current_tables' in fields and schema:
+            index.set_tables(schema, fields['current_tables'])
+        return index
     
-    def get_table_summary(self, catalog, schema, table_name):
-        try:
-            columns = self.get_table_columns(catalog, schema, table_name)
-            if not columns:
-                return None
-            
-            # Get row count (optional, might be slow for large tables)
-            try:
-                count_query = f"SELECT COUNT(*) FROM {catalog}.{schema}.{table_name}"
-                self.cursor.execute(count_query)
-                row_count = self.cursor.fetchone()[0]
-            except:
-                row_count = "N/A"
-            
+    def account(self, name, added):
+        """Charge an in-place addition to a field against the session limit before it is made"""
+        with self.lock:
+            field_sizes = dict(self._field_sizes)
+            if name == 'current_table_columns':
+                added_sizes = self._measure_columns(added)
+                replaced = sum(self._column_sizes[table][1] for table in added_sizes if table in self._column_sizes)
+                field_sizes[name] += sum(size for _, size in added_sizes.values()) - replaced
+            else:
+                added_sizes = None
+                field_sizes[name] += self._names_size(added)
+            self._check_limit(field_sizes)
+            self._field_sizes = field_sizes
+            if added_sizes:
+                self._column_sizes = {**self._column_sizes, **added_sizes}
+            self.version += 1
+    
+    def to_dict(self):
+        with self.lock:
             return {
-                'table_name': table_name,
-                'columns': columns,
-                'row_count': row_count
+                'session_id': self.session_id[:8],
+                'selected_catalog': self.selected_catalog,
+                'selected_schema': self.selected_schema,
+                'tables': len(self.current_tables),
+                'size_bytes': self.size_bytes,
+                'idle_seconds': round(time.monotonic() - self.last_access, 1)
             }
+
+class SessionStore:
+    """Per-browser SessionState keyed by the session cookie.
+
+    The store lock only guards the session map; each session has its own lock, so
+    concurrent users never wait on each other. Sessions idle for longer than
+    idle_timeout are dropped and the least recently used one is evicted when more
+    than max_sessions are active.
+    """
+    
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT, max_sessions=SESSION_MAX_COUNT,
+                 max_bytes=SESSION_MAX_BYTES):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> SessionState, least recently used first
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+    
+    def get(self, session_id):
+        """Return the state for a session, creating it on first use"""
+        now = time.monotonic()
+        with self._lock:
+            self._expire_idle(now)
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = SessionState(session_id, max_bytes=self.max_bytes)
+                self._sessions[session_id] = state
+                self.created += 1
+                while len(self._sessions) > max(self.max_sessions, 1):
+                    evicted_id, _ = self._sessions.popitem(last=False)
+                    self.evicted += 1
+                    logger.info(f"Evicted least recently used session {evicted_id[:8]}")
+            else:
+                self._sessions.move_to_end(session_id)
+            state.last_access = now
+            return state
+    
+    def _expire_idle(self, now):
+        # Sessions are kept in access order, so idle ones are all at the front
+        while self._sessions and self.idle_timeout > 0:
+            session_id, state = next(iter(self._sessions.items()))
+            if now - state.last_access < self.idle_timeout:
+                break
+            del self._sessions[session_id]
+            self.expired += 1
+            logger.info(f"Expired idle session {session_id[:8]}")
+    
+    def stats(self):
+        with self._lock:
+            sessions = list(self._sessions.values())
+            created, expired, evicted = self.created, self.expired, self.evicted
+        return {
+            'active': len(sessions),
+            'created': created,
+            'expired': expired,
+            'evicted': evicted,
+            'max_sessions': self.max_sessions,
+            'idle_timeout': self.idle_timeout,
+            'max_bytes': self.max_bytes,
+            'total_bytes': sum(state.size_bytes for state in sessions)
+        }
+
+session_store = SessionStore()
+
+def get_session_state():
+    """State for the requesting browser, issuing a session cookie on first use"""
+    state = g.get('session_state')
+    if state is None:
+        session_id = session.get('session_id')
+        if not session_id:
+            # A persistent cookie lets the browser find its stored metadata again after a restart
+            session.permanent = True
+            session_id = session['session_id'] = uuid.uuid4().hex
+        state = g.session_state = session_store.get(session_id)
+        # Stored metadata outlives the in-memory session; keep it until the browser stops coming back
+        metadata_store.touch(session_id)
+        schedule_workspace_sweep()
+    return state
+
+def start_catalog_crawler():
+    """Start the background crawler when CRAWLER_ENABLED; call from the process that serves requests"""
+    if not CRAWLER_ENABLED:
+        return False
+    if not metadata_cache.enabled:
+        logger.warning("CRAWLER_ENABLED is set but the metadata cache is disabled - not starting the crawler")
+        return False
+    # With the debug reloader, only the child process (WERKZEUG_RUN_MAIN) serves requests
+    if FLASK_DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    return catalog_crawler.start()
+
+module_preload = {'started_at': None, 'finished_at': None, 'errors': {}}
+
+def preload_modules():
+    """Import every lazily loaded module now, so the first upload or emission does not wait for them"""
+    module_preload['started_at'] = time.time()
+    for module in LAZY_MODULES:
+        try:
+            module.load()
         except Exception as e:
-            logger.error(f"Failed to get table summary for {table_name}: {str(e)}")
-            return None
+            module_preload['errors'][module.name] = str(e)
+            logger.warning(f"Preloading {module.name} failed: {str(e)}")
+    module_preload['finished_at'] = time.time()
+
+def start_module_preload():
+    """Preload lazy modules in a daemon thread when PRELOAD_MODULES; call from the process that serves requests"""
+    if not PRELOAD_MODULES or module_preload['started_at'] is not None:
+        return False
+    if FLASK_DEBUG and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    module_preload['started_at'] = time.time()
+    threading.Thread(target=preload_modules, name='module-preload', daemon=True).start()
+    return True
+
+@app.teardown_request
+def release_trino_connection(exc):
+    """Make sure no pooled connection stays checked out by a finished request thread"""
+    trino_connector.release()
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_latency(response):
+    started = g.get('request_started')
+    if started is not None:
+        # The URL rule, not the path, so per-table routes stay one series
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        http_request_latency.observe(
+            time.perf_counter() - started, route=route, method=request.method, status=str(response.status_code)
+        )
+    return response
 
-trino_connector = TrinoConnector()
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/x-ndjson',
+    'text/html', 'text/plain', 'text/css', 'text/csv', 'text/javascript'
+}
+# Streamed as events: every chunk is flushed so a line reaches the client as soon as it is produced
+EVENT_STREAM_MIMETYPES = {'application/x-ndjson'}
 
-def check_missing_schemas_tables(discovered_schemas, discovered_tables):
-    """Check which schemas/tables from CSV are not currently loaded"""
-    global current_catalogs, current_schemas, current_tables, selected_catalog, selected_schema
+def negotiated_encoding():
+    """gzip or deflate if the client accepts one (by Accept-Encoding quality), else None"""
+    if COMPRESS_LEVEL <= 0:
+        return None
+    return request.accept_encodings.best_match(['gzip', 'deflate'])
+
+def _compressor(encoding):
+    # gzip gets a gzip header/trailer; HTTP "deflate" means the zlib format
+    wbits = 16 + zlib.MAX_WBITS if encoding == 'gzip' else zlib.MAX_WBITS
+    return zlib.compressobj(COMPRESS_LEVEL, zlib.DEFLATED, wbits)
+
+def _compress_stream(chunks, encoding, flush_chunks=False):
+    compressor = _compressor(encoding)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if flush_chunks:
+            data += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.after_request
+def compress_response(response):
+    """gzip/deflate text responses as negotiated by Accept-Encoding; streamed ones chunk by chunk"""
+    if response.mimetype in COMPRESSIBLE_MIMETYPES:
+        response.vary.add('Accept-Encoding')
+    if (response.status_code < 200 or response.status_code in (204, 304) or response.direct_passthrough
+            or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+    encoding = negotiated_encoding()
+    if encoding is None:
+        return response
+    
+    if response.is_streamed:
+        response.response = _compress_stream(
+            response.iter_encoded(), encoding, flush_chunks=response.mimetype in EVENT_STREAM_MIMETYPES
+        )
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < COMPRESS_MIN_SIZE:
+            return response
+        compressor = _compressor(encoding)
+        response.set_data(compressor.compress(data) + compressor.flush())
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+def state_etag(*versions):
+    """Strong ETag for this request's response, derived from the state versions it is built from.
+
+    The path, query string and negotiated encoding are part of it, since each gives
+    a different representation.
+    """
+    parts = (request.path, request.query_string, negotiated_encoding()) + versions
+    return hashlib.sha256(repr(parts).encode('utf-8')).hexdigest()[:32]
+
+def not_modified(etag):
+    """A 304 response when the client already holds this ETag (If-None-Match), else None"""
+    if not request.if_none_match.contains(etag):
+        return None
+    return with_etag(Response(status=304), etag)
+
+def with_etag(response, etag):
+    """Tag a response and make browsers revalidate it, so repeat fetches come back as 304s"""
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+def ndjson_response(events):
+    """Stream dict events as newline-delimited JSON, one line per event, as they are produced.
+
+    The request context stays open until the stream ends, and the Trino connection the
+    events checked out is returned to the pool when it ends or the client goes away.
+    """
+    def generate():
+        try:
+            for event in events:
+                yield dumps_json(event) + '\n'
+        finally:
+            events.close()
+            trino_connector.release()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        # Keep reverse proxies from holding lines back until the response ends
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def load_session_columns(state, tables):
+    """Columns for the given tables of the session's schema, fetching only those not loaded yet"""
+    with state.lock:
+        catalog = state.selected_catalog
+        schema = state.selected_schema
+        loaded = state.current_table_columns
+        table_columns = {table: loaded[table] for table in tables if table in loaded}
+    
+    missing = [table for table in tables if table not in table_columns]
+    if missing and catalog and schema:
+        fetched = trino_connector.get_columns_for_tables(catalog, schema, missing)
+        store_session_columns(state, catalog, schema, fetched)
+        table_columns.update(fetched)
+    return table_columns
+
+def store_session_columns(state, catalog, schema, table_columns):
+    """Add fetched columns to a session; False if the user switched catalog/schema meanwhile"""
+    with state.lock:
+        if state.selected_catalog != catalog or state.selected_schema != schema:
+            return False
+        # Empty results are not kept, so a table that failed to load is retried next time
+        found = {table: columns for table, columns in table_columns.items() if columns}
+        if found:
+            state.account('current_table_columns', found)
+            state.current_table_columns.update(found)
+        return True
+
+def check_missing_schemas_tables(state, discovered_schemas, discovered_tables):
+    """Check which schemas/tables from CSV are not currently loaded in a session"""
+    with state.lock:
+        current_catalogs = state.current_catalogs
+        catalog_index = state.catalog_index
+        selected_catalog = state.selected_catalog
+        selected_schema = state.selected_schema
     
     missing_info = {
         'has_missing': False,
@@ -193,22 +615,11 @@ def check_missing_schemas_tables(discovered_schemas, discovered_tables):
             missing_info['missing_catalogs'] = ['Need to load catalogs first']
             missing_info['has_missing'] = True
         
-        # Check for missing schemas
-        for schema_name in discovered_schemas:
-            if schema_name not in current_schemas:
-                missing_info['missing_schemas'].append(schema_name)
-                missing_info['has_missing'] = True
-        
-        # Check for missing tables (only if we have a selected schema)
-        if selected_schema:
-            for table_key in discovered_tables:
-                schema_name, table_name = table_key.split('.', 1)
-                if schema_name == selected_schema and table_name not in current_tables:
-                    missing_info['missing_tables'].append(table_key)
-                    missing_info['has_missing'] = True
-        else:
-            # No schema selected, so all tables are "missing"
-            missing_info['missing_tables'] = list(discovered_tables)
+        # Check for missing schemas and tables; tables of every schema count, since
+        # load_missing_items resolves all of them in one pass
+        missing_info['missing_schemas'] = catalog_index.missing_schemas(discovered_schemas)
+        missing_info['missing_tables'] = catalog_index.missing_tables(discovered_tables)
+        if missing_info['missing_schemas'] or missing_info['missing_tables']:
             missing_info['has_missing'] = True
         
         logger.info(f"Missing check results: {missing_info}")
@@ -220,11 +631,16 @@ def check_missing_schemas_tables(discovered_schemas, discovered_tables):
         missing_info['error'] = str(e)
         return missing_info
 
-def auto_discover_from_csv(discovered_schemas, discovered_tables):
-    """Auto-discover and load schemas/tables from CSV that aren't currently loaded"""
-    global current_catalogs, current_schemas, current_tables, current_table_columns
-    global selected_catalog, selected_schema
-    
+def group_tables_by_schema(schemas, table_keys):
+    """'schema.table' keys grouped into schema -> table names, listing every given schema"""
+    schema_tables = {schema_name: [] for schema_name in schemas}
+    for table_key in table_keys:
+        schema_name, table_name = table_key.split('.', 1)
+        schema_tables.setdefault(schema_name, []).append(table_name)
+    return schema_tables
+
+def auto_discover_from_csv(state, discovered_schemas, discovered_tables):
+    """Auto-discover and load schemas/tables from CSV that aren't currently loaded in a session"""
     results = {
         'new_schemas_found': [],
         'new_tables_found': [],
@@ -234,6 +650,15 @@ def auto_discover_from_csv(discovered_schemas, discovered_tables):
     }
     
     try:
+        # Snapshot the session, query Trino without holding its lock, then apply the
+        # results under the lock, so the session's other requests are not held up
+        with state.lock:
+            current_catalogs = list(state.current_catalogs)
+            selected_catalog = state.selected_catalog
+            selected_schema = state.selected_schema
+            missing_schemas = state.catalog_index.missing_schemas(discovered_schemas)
+            known_columns = set(state.current_table_columns)
+        
         # If no catalog is selected, try to load catalogs first
         if not selected_catalog and not current_catalogs:
             logger.info("No catalog selected, loading catalogs for auto-discovery")
@@ -242,62 +667,89 @@ def auto_discover_from_csv(discovered_schemas, discovered_tables):
                 selected_catalog = 'hive'  # Default to hive catalog
                 logger.info(f"Auto-selected catalog: {selected_catalog}")
         
-        # Discover new schemas
-        for schema_name in discovered_schemas:
-            if schema_name not in current_schemas:
-                results['new_schemas_found'].append(schema_name)
-                
-                # Try to load this schema if we have a catalog
-                if selected_catalog:
-                    try:
-                        schema_tables = trino_connector.get_tables(selected_catalog, schema_name)
-                        if schema_tables:  # Schema exists and has tables
-                            if schema_name not in current_schemas:
-                                current_schemas.append(schema_name)
-                                results['schemas_loaded'].append(schema_name)
-                            
-                            # If this is the first schema or matches current selection, load its tables
-                            if not selected_schema or selected_schema == schema_name:
-                                selected_schema = schema_name
-                                
-                                # Load tables and columns for this schema
-                                for table_name in schema_tables:
-                                    table_key = f"{schema_name}.{table_name}"
-                                    if table_name not in current_tables:
-                                        current_tables.append(table_name)
-                                        results['tables_loaded'].append(table_key)
-                                    
-                                    # Load columns for this table
-                                    if table_name not in current_table_columns:
-                                        columns = trino_connector.get_table_columns(selected_catalog, schema_name, table_name)
-                                        current_table_columns[table_name] = columns
-                                
-                                logger.info(f"Auto-loaded schema {schema_name} with {len(schema_tables)} tables")
-                    except Exception as e:
-                        error_msg = f"Failed to load schema {schema_name}: {str(e)}"
-                        results['errors'].append(error_msg)
-                        logger.error(error_msg)
+        schema_tables = group_tables_by_schema(discovered_schemas, discovered_tables)
         
-        # Discover new tables in current schema
-        if selected_schema:
-            for table_key in discovered_tables:
-                schema_name, table_name = table_key.split('.', 1)
-                if schema_name == selected_schema and table_name not in current_tables:
-                    results['new_tables_found'].append(table_key)
-                    
-                    try:
-                        # Verify table exists in Trino
-                        table_columns = trino_connector.get_table_columns(selected_catalog, schema_name, table_name)
-                        if table_columns:
-                            current_tables.append(table_name)
-                            current_table_columns[table_name] = table_columns
-                            results['tables_loaded'].append(table_key)
-                            logger.info(f"Auto-loaded table {table_key}")
-                    except Exception as e:
-                        error_msg = f"Failed to load table {table_key}: {str(e)}"
-                        results['errors'].append(error_msg)
-                        logger.error(error_msg)
+        # Resolve every schema and table the CSV mentions in one pass; schemas
+        # other than the selected one stay in the metadata cache for later
+        resolved = {}
+        if selected_catalog:
+            try:
+                resolved = trino_connector.resolve_schema_tables(selected_catalog, schema_tables)
+            except Exception as e:
+                error_msg = f"Failed to resolve schemas from CSV: {str(e)}"
+                results['errors'].append(error_msg)
+                logger.error(error_msg)
+        
+        # The first new schema that exists becomes the selection when none is
+        # selected (or is the selection); load columns for all its tables at once
+        columns_schema = None
+        loaded_columns = {}
+        for schema_name in missing_schemas:
+            schema_listing = resolved.get(schema_name, {}).get('tables')
+            if schema_listing and (not selected_schema or selected_schema == schema_name):
+                columns_schema = schema_name
+                tables_without_columns = [t for t in schema_listing if t not in known_columns]
+                if tables_without_columns:
+                    loaded_columns = trino_connector.get_all_table_columns(
+                        selected_catalog, schema_name, tables_without_columns
+                    )
+                break
         
+        with state.lock:
+            if state.selected_catalog and state.selected_catalog != selected_catalog:
+                results['errors'].append('The selected catalog changed during auto-discovery; upload the CSV again')
+                return results
+            # Work on copies and store them in one update so the session limit is checked once
+            current_catalogs = list(state.current_catalogs) or current_catalogs
+            current_table_columns = dict(state.current_table_columns)
+            catalog_index = state.catalog_index.copy()
+            selected_schema = state.selected_schema
+            
+            results['new_schemas_found'] = catalog_index.missing_schemas(discovered_schemas)
+            for schema_name in results['new_schemas_found']:
+                schema_listing = resolved.get(schema_name, {}).get('tables')
+                if not schema_listing:  # Schema missing or empty
+                    continue
+                catalog_index.add_schemas([schema_name])
+                results['schemas_loaded'].append(schema_name)
+                
+                # If this is the first schema or matches current selection, load its tables
+                if not selected_schema or selected_schema == schema_name:
+                    selected_schema = schema_name
+                    
+                    # Load tables and columns for this schema
+                    for table_name in catalog_index.add_tables(schema_name, schema_listing):
+                        results['tables_loaded'].append(f"{schema_name}.{table_name}")
+                    if schema_name == columns_schema:
+                        for table_name, columns in loaded_columns.items():
+                            current_table_columns.setdefault(table_name, columns)
+                    
+                    logger.info(f"Auto-loaded schema {schema_name} with {len(schema_listing)} tables")
+            
+            # Index the CSV's tables that exist in Trino; only the selected schema's
+            # tables (and columns) go into the session's table list
+            for schema_name, table_names in schema_tables.items():
+                schema_columns = resolved.get(schema_name, {}).get('columns', {})
+                found = [table_name for table_name in table_names if schema_columns.get(table_name)]
+                if not found or not catalog_index.has_schema(schema_name):
+                    continue
+                for table_name in catalog_index.add_tables(schema_name, found):
+                    table_key = f"{schema_name}.{table_name}"
+                    results['new_tables_found'].append(table_key)
+                    results['tables_loaded'].append(table_key)
+                    if schema_name == selected_schema:
+                        current_table_columns[table_name] = schema_columns[table_name]
+                        logger.info(f"Auto-loaded table {table_key}")
+            
+            state.update(
+                current_catalogs=current_catalogs,
+                current_schemas=catalog_index.schemas(),
+                current_tables=catalog_index.tables(selected_schema),
+                current_table_columns=current_table_columns,
+                selected_catalog=selected_catalog,
+                selected_schema=selected_schema,
+                catalog_index=catalog_index
+            )
         logger.info(f"Auto-discovery results: {results}")
         return results
         
@@ -313,27 +765,117 @@ def index():
 
 @app.route('/clear_session', methods=['POST'])
 def clear_session():
-    """Clear all session data"""
-    global current_catalogs, current_schemas, current_tables, current_table_columns
-    global selected_catalog, selected_schema, current_metadata, uploaded_metadata
-    
-    current_catalogs = []
-    current_schemas = []
-    current_tables = []
-    current_table_columns = {}
-    selected_catalog = ""
-    selected_schema = ""
-    current_metadata = {}
-    uploaded_metadata = {}
-    
-    logger.info("Session data cleared - all metadata and selections reset")
-    return jsonify({'success': True, 'message': 'Session cleared - all data reset'})
+    """Clear this browser session's selections, and its stored metadata when asked to"""
+    state = get_session_state()
+    state.reset()
+    
+    # The page-load call keeps the catalog cache warm and the stored metadata;
+    # "Clear All Data" drops both
+    data = request.get_json(silent=True) or request.form
+    if str(data.get('refresh_cache', '')).lower() == 'true':
+        metadata_cache.invalidate()
+    if str(data.get('clear_metadata', '')).lower() == 'true':
+        metadata_store.clear(state.session_id)
+        dead_letter_queue.clear(state.session_id)
+        logger.info(f"Session {state.session_id[:8]} cleared - all metadata and selections reset")
+        return jsonify({'success': True, 'message': 'Session cleared - all data reset'})
+    
+    logger.info(f"Session {state.session_id[:8]} selections reset - stored metadata kept")
+    return jsonify({'success': True, 'message': 'Session selections reset - stored metadata kept'})
+
+@app.route('/refresh_metadata_cache', methods=['POST'])
+def refresh_metadata_cache():
+    """Invalidate cached Trino metadata for a schema, a catalog, or everything"""
+    data = request.get_json(silent=True) or {}
+    catalog = data.get('catalog')
+    schema = data.get('schema')
+    if schema and not catalog:
+        catalog = get_session_state().selected_catalog
+    if schema and not catalog:
+        return jsonify({'success': False, 'message': 'Catalog not specified'})
+    
+    removed = metadata_cache.invalidate(catalog, schema)
+    scope = f"{catalog}.{schema}" if schema else (catalog or 'all catalogs')
+    return jsonify({
+        'success': True,
+        'message': f'Refreshed metadata cache for {scope} ({removed} entries dropped)',
+        'stats': metadata_cache.stats()
+    })
+
+@app.route('/get_cache_stats')
+def get_cache_stats():
+    return jsonify({'success': True, 'cache': metadata_cache.stats()})
+
+@app.route('/get_crawler_status')
+def get_crawler_status():
+    return jsonify({'success': True, 'crawler': catalog_crawler.stats()})
+
+@app.route('/get_import_stats')
+def get_import_stats():
+    """Which lazily imported modules are loaded, and how long each import took"""
+    return jsonify({
+        'success': True,
+        'modules': [
+            {'name': module.name, 'loaded': module.module is not None, 'load_seconds': module.load_seconds}
+            for module in LAZY_MODULES
+        ],
+        'preload': {'enabled': PRELOAD_MODULES, **module_preload}
+    })
+
+@app.route('/get_session_stats')
+def get_session_stats():
+    """The caller's own session plus store-wide totals; other sessions stay private"""
+    with workspace_sweep_lock:
+        sweep = dict(workspace_sweep, ttl=METADATA_WORKSPACE_TTL)
+    return jsonify({
+        'success': True,
+        'session': get_session_state().to_dict(),
+        'sessions': session_store.stats(),
+        'metadata': metadata_store.stats(),
+        'workspace_sweep': sweep
+    })
+
+@metrics.collector
+def component_metrics():
+    """Counters the cache, connection pool, session store and catalog crawler already keep"""
+    cache = metadata_cache.stats()
+    pool = trino_pool.stats()
+    sessions = session_store.stats()
+    crawler = catalog_crawler.stats()
+    return [
+        ('metadata_cache_hits_total', 'counter', 'Metadata cache hits', cache['hits']),
+        ('metadata_cache_misses_total', 'counter', 'Metadata cache misses', cache['misses']),
+        ('metadata_cache_evictions_total', 'counter', 'Metadata cache LRU evictions', cache['evictions']),
+        ('metadata_cache_expirations_total', 'counter', 'Metadata cache TTL expirations', cache['expirations']),
+        ('metadata_cache_invalidations_total', 'counter', 'Metadata cache entries invalidated', cache['invalidations']),
+        ('metadata_cache_entries', 'gauge', 'Metadata cache entries', cache['size']),
+        ('trino_pool_hits_total', 'counter', 'Trino connections reused from the pool', pool['hits']),
+        ('trino_pool_misses_total', 'counter', 'Trino connections opened', pool['misses']),
+        ('trino_pool_expired_total', 'counter', 'Idle Trino connections closed after the idle timeout', pool['expired']),
+        ('trino_pool_health_check_failures_total', 'counter',
+         'Pooled Trino connections that failed a health check and were replaced', pool['health_check_failures']),
+        ('trino_pool_in_use', 'gauge', 'Trino connections checked out', pool['in_use']),
+        ('sessions_active', 'gauge', 'Browser sessions held in memory', sessions['active']),
+        ('sessions_created_total', 'counter', 'Browser sessions created', sessions['created']),
+        ('sessions_expired_total', 'counter', 'Browser sessions dropped after the idle timeout', sessions['expired']),
+        ('sessions_evicted_total', 'counter', 'Browser sessions evicted at the session limit', sessions['evicted']),
+        ('crawler_passes_total', 'counter', 'Completed catalog crawler passes', crawler['passes']),
+        ('crawler_failures_total', 'counter', 'Catalog crawler passes that failed', crawler['failures']),
+        ('crawler_schemas_refreshed_total', 'counter', 'Schemas the crawler re-fetched', crawler['schemas_refreshed']),
+        ('crawler_schemas_unchanged_total', 'counter',
+         'Schemas the crawler found unchanged by fingerprint', crawler['schemas_unchanged']),
+    ]
+
+@app.route('/metrics')
+def get_metrics():
+    """Prometheus text exposition of request, Trino, DataHub, CSV and cache metrics"""
+    return Response(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
 
 @app.route('/load_catalogs', methods=['POST'])
 def load_catalogs():
-    global current_catalogs
     try:
         current_catalogs = trino_connector.get_catalogs()
+        get_session_state().update(current_catalogs=current_catalogs)
         logger.info(f"Loaded {len(current_catalogs)} catalogs")
         return jsonify({
             'success': True, 
@@ -346,15 +888,14 @@ def load_catalogs():
 
 @app.route('/load_schemas', methods=['POST'])
 def load_schemas():
-    global current_schemas, selected_catalog
     try:
         data = request.json
         catalog = data.get('catalog')
         if not catalog:
             return jsonify({'success': False, 'message': 'Catalog not specified'})
         
-        selected_catalog = catalog
         current_schemas = trino_connector.get_schemas(catalog)
+        get_session_state().update(selected_catalog=catalog, current_schemas=current_schemas)
         logger.info(f"Loaded {len(current_schemas)} schemas from catalog {catalog}")
         return jsonify({
             'success': True, 
@@ -367,57 +908,171 @@ def load_schemas():
 
 @app.route('/load_tables', methods=['POST'])
 def load_tables():
-    global current_tables, current_table_columns, selected_schema
     try:
+        state = get_session_state()
         data = request.json
         schema = data.get('schema')
+        selected_catalog = state.selected_catalog
         if not schema or not selected_catalog:
             return jsonify({'success': False, 'message': 'Catalog or schema not specified'})
         
-        selected_schema = schema
         current_tables = trino_connector.get_tables(selected_catalog, schema)
         
-        # Load columns for all tables
-        current_table_columns = {}
-        for table in current_tables:
-            columns = trino_connector.get_table_columns(selected_catalog, schema, table)
-            current_table_columns[table] = columns
+        # Columns are loaded lazily per table/page unless the caller asks for all of them
+        if data.get('include_columns'):
+            current_table_columns = trino_connector.get_all_table_columns(selected_catalog, schema, current_tables)
+        else:
+            current_table_columns = {}
+        state.update(
+            selected_schema=schema,
+            current_tables=current_tables,
+            current_table_columns=current_table_columns
+        )
         
         logger.info(f"Loaded {len(current_tables)} tables from {selected_catalog}.{schema}")
-        return jsonify({
+        response = {
             'success': True, 
             'message': f'Successfully loaded {len(current_tables)} tables from {selected_catalog}.{schema}',
             'tables': current_tables,
-            'table_columns': current_table_columns
-        })
+            'total': len(current_tables)
+        }
+        if data.get('include_columns'):
+            response['table_columns'] = current_table_columns
+        return jsonify(response)
     except Exception as e:
         logger.error(f"Error loading tables: {str(e)}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/load_tables_stream', methods=['POST'])
+def load_tables_stream():
+    """load_tables with columns, as newline-delimited JSON.
+
+    A 'tables' line comes as soon as the table list is known, then a 'columns'
+    line for each group of tables whose columns have arrived, then 'done'.
+    """
+    state = get_session_state()
+    data = request.get_json(silent=True) or {}
+    schema = data.get('schema')
+    selected_catalog = state.selected_catalog
+    
+    def generate():
+        if not schema or not selected_catalog:
+            yield {'type': 'done', 'success': False, 'message': 'Catalog or schema not specified'}
+            return
+        try:
+            current_tables = trino_connector.get_tables(selected_catalog, schema)
+            state.update(selected_schema=schema, current_tables=current_tables, current_table_columns={})
+            yield {'type': 'tables', 'tables': current_tables, 'total': len(current_tables)}
+            
+            loaded = 0
+            for table_columns in trino_connector.iter_all_table_columns(selected_catalog, schema, current_tables):
+                if not store_session_columns(state, selected_catalog, schema, table_columns):
+                    yield {'type': 'done', 'success': False, 'message': 'Schema selection changed while loading'}
+                    return
+                loaded += len(table_columns)
+                yield {'type': 'columns', 'table_columns': table_columns, 'loaded': loaded,
+                       'total': len(current_tables)}
+            
+            logger.info(f"Streamed {len(current_tables)} tables from {selected_catalog}.{schema}")
+            yield {'type': 'done', 'success': True,
+                   'message': f'Successfully loaded {len(current_tables)} tables from {selected_catalog}.{schema}'}
+        except Exception as e:
+            logger.error(f"Error streaming tables: {str(e)}")
+            yield {'type': 'done', 'success': False, 'message': str(e)}
+    
+    return ndjson_response(generate())
+
 @app.route('/get_catalogs')
 def get_catalogs():
-    return jsonify({'catalogs': current_catalogs})
+    return jsonify({'catalogs': get_session_state().current_catalogs})
 
 @app.route('/get_schemas')
 def get_schemas():
-    return jsonify({'schemas': current_schemas, 'selected_catalog': selected_catalog})
+    state = get_session_state()
+    with state.lock:
+        return jsonify({'schemas': state.current_schemas, 'selected_catalog': state.selected_catalog})
 
 @app.route('/get_tables')
 def get_tables():
-    return jsonify({
-        'tables': current_tables, 
-        'table_columns': current_table_columns,
-        'selected_catalog': selected_catalog,
-        'selected_schema': selected_schema
-    })
+    """Loaded tables, optionally filtered by name and paginated (?filter=&page=&per_page=&include_columns=true)"""
+    try:
+        state = get_session_state()
+        with state.lock:
+            current_tables = state.current_tables
+            selected_catalog = state.selected_catalog
+            selected_schema = state.selected_schema
+            version = state.version
+        
+        # Tagged with the version read before building, so the body is never older than its ETag
+        etag = state_etag(state.session_id, version)
+        cached = not_modified(etag)
+        if cached is not None:
+            return cached
+        
+        name_filter = request.args.get('filter', '').strip().lower()
+        tables = [t for t in current_tables if name_filter in t.lower()] if name_filter else current_tables
+        
+        # per_page=0 (the default) returns every matching table on one page
+        per_page = max(request.args.get('per_page', 0, type=int), 0)
+        pages = max(-(-len(tables) // per_page), 1) if per_page else 1
+        page = min(max(request.args.get('page', 1, type=int), 1), pages)
+        page_tables = tables[(page - 1) * per_page:page * per_page] if per_page else tables
+        
+        response = {
+            'success': True,
+            'tables': page_tables,
+            'total': len(tables),
+            'total_tables': len(current_tables),
+            'page': page,
+            'per_page': per_page,
+            'pages': pages,
+            'selected_catalog': selected_catalog,
+            'selected_schema': selected_schema
+        }
+        if request.args.get('include_columns', 'false').lower() == 'true':
+            response['table_columns'] = load_session_columns(state, page_tables)
+        return with_etag(jsonify(response), etag)
+    except Exception as e:
+        logger.error(f"Error getting tables: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/get_table_columns/<table_name>')
+def get_table_columns(table_name):
+    """Columns for one table, fetched from Trino the first time it is opened"""
+    try:
+        state = get_session_state()
+        if not state.selected_catalog or not state.selected_schema:
+            return jsonify({'success': False, 'message': 'Catalog or schema not selected'})
+        
+        columns = load_session_columns(state, [table_name]).get(table_name)
+        if not columns:
+            return jsonify({'success': False, 'message': f'No columns found for {table_name}'})
+        return jsonify({'success': True, 'table': table_name, 'columns': columns})
+    except Exception as e:
+        logger.error(f"Error getting columns for {table_name}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/get_pool_stats')
+def get_pool_stats():
+    """Connection pool hit/miss counters for sizing TRINO_POOL_SIZE"""
+    return jsonify({'success': True, 'pool': trino_pool.stats()})
 
 @app.route('/get_table_summary/<table_name>')
 def get_table_summary(table_name):
     try:
+        state = get_session_state()
+        with state.lock:
+            selected_catalog = state.selected_catalog
+            selected_schema = state.selected_schema
         if not selected_catalog or not selected_schema:
             return jsonify({'success': False, 'message': 'Catalog or schema not selected'})
         
-        summary = trino_connector.get_table_summary(selected_catalog, selected_schema, table_name)
+        exact_count = request.args.get('exact_count', 'false').lower() == 'true'
+        count_timeout = request.args.get('count_timeout', TRINO_COUNT_TIMEOUT, type=int)
+        summary = trino_connector.get_table_summary(
+            selected_catalog, selected_schema, table_name,
+            exact_count=exact_count, count_timeout=count_timeout
+        )
         if summary:
             return jsonify({'success': True, 'summary': summary})
         else:
@@ -436,155 +1091,460 @@ def get_tags():
 @app.route('/get_all_available_tables')
 def get_all_available_tables():
     """Get all tables available for emission (from Trino + metadata)"""
-    all_tables = set(current_tables)
+    state = get_session_state()
+    with state.lock:
+        current_tables = list(state.current_tables)
+        catalog_index = state.catalog_index
+        selected_schema = state.selected_schema
     
-    # Add tables from metadata
-    for table_key in list(current_metadata.keys()) + list(uploaded_metadata.keys()):
-        if '.' in table_key:
-            schema_name, table_name = table_key.split('.', 1)
-            if schema_name == selected_schema:
-                all_tables.add(table_name)
+    # Add tables from metadata, split once and checked against the index
+    prefix = f"{selected_schema}."
+    metadata_tables = [key[len(prefix):] for key in metadata_store.table_keys(state.session_id) if key.startswith(prefix)]
+    all_tables = current_tables + [t for t in metadata_tables if not catalog_index.has_table(selected_schema, t)]
     
     return jsonify({
-        'tables': list(all_tables),
+        'tables': all_tables,
         'trino_tables': current_tables,
-        'metadata_tables': [key.split('.', 1)[1] for key in list(current_metadata.keys()) + list(uploaded_metadata.keys()) if '.' in key and key.split('.', 1)[0] == selected_schema]
+        'metadata_tables': metadata_tables
     })
 
 @app.route('/get_discovery_status')
 def get_discovery_status():
     """Get current discovery status after CSV upload"""
-    return jsonify({
-        'selected_catalog': selected_catalog,
-        'selected_schema': selected_schema,
-        'current_schemas': current_schemas,
-        'current_tables': current_tables,
-        'table_columns_count': len(current_table_columns)
-    })
+    state = get_session_state()
+    with state.lock:
+        return jsonify({
+            'selected_catalog': state.selected_catalog,
+            'selected_schema': state.selected_schema,
+            'current_schemas': state.current_schemas,
+            'current_tables': state.current_tables,
+            'table_columns_count': len(state.current_table_columns)
+        })
 
-@app.route('/load_missing_items', methods=['POST'])
-def load_missing_items():
-    """Load missing schemas/tables that were identified from CSV upload"""
+def iter_load_missing_items(state, missing_info):
+    """Load missing schemas/tables identified from a CSV upload, one resolved batch at a time.
+
+    The session is updated after every batch of schemas and a 'progress' event
+    describing it is yielded; the last event ('done') carries the overall results.
+    """
+    results = {
+        'success': False,
+        'message': '',
+        'loaded_catalogs': [],
+        'loaded_schemas': [],
+        'loaded_tables': [],
+        'errors': []
+    }
+    
     try:
-        data = request.json
-        missing_info = data.get('missing_items', {})
-        
-        results = {
-            'success': False,
-            'message': '',
-            'loaded_catalogs': [],
-            'loaded_schemas': [],
-            'loaded_tables': [],
-            'errors': []
-        }
-        
         # Load catalogs if needed
+        selected_catalog = state.selected_catalog
         if missing_info.get('missing_catalogs'):
             try:
-                global current_catalogs, selected_catalog
                 current_catalogs = trino_connector.get_catalogs()
                 if current_catalogs and 'hive' in current_catalogs:
                     selected_catalog = 'hive'
                     results['loaded_catalogs'] = current_catalogs
                     logger.info(f"Loaded catalogs: {current_catalogs}")
+                state.update(current_catalogs=current_catalogs, selected_catalog=selected_catalog)
             except Exception as e:
                 results['errors'].append(f"Failed to load catalogs: {str(e)}")
         
-        # Load missing schemas
+        # Resolve the missing schemas and the tables of every schema in one pass
         missing_schemas = missing_info.get('missing_schemas', [])
-        for schema_name in missing_schemas:
+        schema_tables = group_tables_by_schema(missing_schemas, missing_info.get('missing_tables', []))
+        resolved_count = 0
+        if selected_catalog and schema_tables:
             try:
-                if selected_catalog:
-                    # Verify schema exists
-                    schema_tables = trino_connector.get_tables(selected_catalog, schema_name)
-                    if schema_tables:
-                        if schema_name not in current_schemas:
-                            current_schemas.append(schema_name)
-                            results['loaded_schemas'].append(schema_name)
-                        logger.info(f"Verified schema {schema_name} exists with {len(schema_tables)} tables")
-                    else:
-                        results['errors'].append(f"Schema {schema_name} not found or has no tables")
+                for resolved in trino_connector.iter_resolve_schema_tables(selected_catalog, schema_tables):
+                    event = apply_resolved_schemas(state, schema_tables, missing_schemas, resolved)
+                    resolved_count += len(resolved)
+                    for name in ('loaded_schemas', 'loaded_tables', 'errors'):
+                        results[name].extend(event[name])
+                    event.update(type='progress', resolved=resolved_count, total=len(schema_tables))
+                    yield event
             except Exception as e:
-                results['errors'].append(f"Failed to verify schema {schema_name}: {str(e)}")
-        
-        # Load missing tables (for current schema)
-        missing_tables = missing_info.get('missing_tables', [])
-        tables_to_load = []
-        
-        for table_key in missing_tables:
-            schema_name, table_name = table_key.split('.', 1)
-            if schema_name == selected_schema:
-                tables_to_load.append(table_name)
+                results['errors'].append(f"Failed to resolve schemas: {str(e)}")
+    except Exception as e:
+        logger.error(f"Error loading missing items: {str(e)}")
+        results['errors'].append(str(e))
+        results['message'] = f'Failed to load missing items: {str(e)}'
+        yield dict(results, type='done')
+        return
+    
+    # Determine success
+    results['success'] = (len(results['loaded_catalogs']) > 0 or 
+                        len(results['loaded_schemas']) > 0 or 
+                        len(results['loaded_tables']) > 0)
+    
+    if results['success']:
+        loaded_items = []
+        if results['loaded_catalogs']:
+            loaded_items.append(f"{len(results['loaded_catalogs'])} catalogs")
+        if results['loaded_schemas']:
+            loaded_items.append(f"{len(results['loaded_schemas'])} schemas")
+        if results['loaded_tables']:
+            loaded_items.append(f"{len(results['loaded_tables'])} tables")
         
-        if tables_to_load and selected_catalog and selected_schema:
-            try:
-                # Load all tables for the current schema
-                all_schema_tables = trino_connector.get_tables(selected_catalog, selected_schema)
-                
-                # Load columns for missing tables
-                global current_tables, current_table_columns
-                for table_name in tables_to_load:
-                    if table_name in all_schema_tables:
-                        if table_name not in current_tables:
-                            current_tables.append(table_name)
-                            results['loaded_tables'].append(f"{selected_schema}.{table_name}")
-                        
-                        # Load columns
-                        if table_name not in current_table_columns:
-                            columns = trino_connector.get_table_columns(selected_catalog, selected_schema, table_name)
-                            current_table_columns[table_name] = columns
-                        
-                        logger.info(f"Loaded table {selected_schema}.{table_name}")
-                    else:
-                        results['errors'].append(f"Table {table_name} not found in schema {selected_schema}")
-            except Exception as e:
-                results['errors'].append(f"Failed to load tables: {str(e)}")
+        results['message'] = f"Successfully loaded: {', '.join(loaded_items)}"
+    else:
+        results['message'] = "No items were loaded"
+    
+    logger.info(f"Load missing items results: {results}")
+    yield dict(results, type='done')
+
+def apply_resolved_schemas(state, schema_tables, missing_schemas, resolved):
+    """Add one batch of resolved schemas and their CSV tables to a session; returns what changed"""
+    event = {'loaded_schemas': [], 'loaded_tables': [], 'errors': [], 'table_columns': {}}
+    with state.lock:
+        # Work on copies and store them in one update so the session limit is checked once
+        catalog_index = state.catalog_index.copy()
+        current_table_columns = dict(state.current_table_columns)
+        selected_schema = state.selected_schema
         
-        # Determine success
-        results['success'] = (len(results['loaded_catalogs']) > 0 or 
-                            len(results['loaded_schemas']) > 0 or 
-                            len(results['loaded_tables']) > 0)
+        for schema_name in dict.fromkeys(missing_schemas):
+            if schema_name not in resolved:
+                continue
+            schema_listing = resolved[schema_name]['tables']
+            if schema_listing:
+                event['loaded_schemas'].extend(catalog_index.add_schemas([schema_name]))
+                logger.info(f"Verified schema {schema_name} exists with {len(schema_listing)} tables")
+            else:
+                event['errors'].append(f"Schema {schema_name} not found or has no tables")
         
-        if results['success']:
-            loaded_items = []
-            if results['loaded_catalogs']:
-                loaded_items.append(f"{len(results['loaded_catalogs'])} catalogs")
-            if results['loaded_schemas']:
-                loaded_items.append(f"{len(results['loaded_schemas'])} schemas")
-            if results['loaded_tables']:
-                loaded_items.append(f"{len(results['loaded_tables'])} tables")
-            
-            results['message'] = f"Successfully loaded: {', '.join(loaded_items)}"
-        else:
-            results['message'] = "No items were loaded"
+        # Without a selected schema, the first one that resolved becomes the selection
+        if not selected_schema:
+            selected_schema = next((name for name in schema_tables if resolved.get(name, {}).get('tables')), '')
+            if selected_schema:
+                current_table_columns = {}
         
-        logger.info(f"Load missing items results: {results}")
-        return jsonify(results)
+        # Tables of every schema are verified and indexed; only the selected
+        # schema's go into the table list, the rest stay cached until opened
+        for schema_name, table_names in schema_tables.items():
+            schema_listing = resolved.get(schema_name, {}).get('tables')
+            if not schema_listing:
+                continue  # Not in this batch, or an unknown schema reported above
+            existing = set(schema_listing)
+            catalog_index.add_schemas([schema_name])
+            for table_name in table_names:
+                if table_name not in existing:
+                    event['errors'].append(f"Table {table_name} not found in schema {schema_name}")
+                    continue
+                catalog_index.add_tables(schema_name, [table_name])
+                if schema_name == selected_schema and table_name not in current_table_columns:
+                    columns = resolved[schema_name]['columns'].get(table_name, [])
+                    current_table_columns[table_name] = columns
+                    event['table_columns'][table_name] = columns
+                event['loaded_tables'].append(f"{schema_name}.{table_name}")
+                logger.info(f"Loaded table {schema_name}.{table_name}")
         
-    except Exception as e:
-        logger.error(f"Error loading missing items: {str(e)}")
-        return jsonify({
-            'success': False,
-            'message': f'Failed to load missing items: {str(e)}',
-            'errors': [str(e)]
-        })
+        state.update(
+            current_schemas=catalog_index.schemas(),
+            current_tables=catalog_index.tables(selected_schema),
+            current_table_columns=current_table_columns,
+            selected_schema=selected_schema,
+            catalog_index=catalog_index
+        )
+        event['selected_schema'] = selected_schema
+        if event['table_columns']:
+            event['tables'] = state.current_tables
+    return event
+
+@app.route('/load_missing_items', methods=['POST'])
+def load_missing_items():
+    """Load missing schemas/tables that were identified from CSV upload"""
+    data = request.get_json(silent=True) or {}
+    results = None
+    for event in iter_load_missing_items(get_session_state(), data.get('missing_items', {})):
+        results = event
+    results.pop('type')
+    return jsonify(results)
+
+@app.route('/load_missing_items_stream', methods=['POST'])
+def load_missing_items_stream():
+    """load_missing_items as newline-delimited JSON: a 'progress' line per resolved batch of schemas, then 'done'"""
+    data = request.get_json(silent=True) or {}
+    return ndjson_response(iter_load_missing_items(get_session_state(), data.get('missing_items', {})))
 
 @app.route('/debug_metadata')
 def debug_metadata():
-    """Debug endpoint to check metadata state"""
-    return jsonify({
-        'selected_catalog': selected_catalog,
-        'selected_schema': selected_schema,
-        'current_tables': current_tables,
-        'manual_metadata_keys': list(current_metadata.keys()),
-        'uploaded_metadata_keys': list(uploaded_metadata.keys()),
-        'manual_metadata': current_metadata,
-        'uploaded_metadata': uploaded_metadata
-    })
+    """Debug endpoint to check metadata state; ?details=true also returns the stored entries"""
+    state = get_session_state()
+    metadata_version = metadata_store.version(state.session_id)
+    etag = state_etag(state.session_id, state.version, metadata_version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    
+    response = {
+        'manual_metadata_keys': metadata_store.table_keys(state.session_id, source='manual'),
+        'uploaded_metadata_keys': metadata_store.table_keys(state.session_id, source='csv'),
+        'metadata_version': metadata_version
+    }
+    if request.args.get('details', 'false').lower() == 'true':
+        manual_metadata = {}
+        uploaded_metadata = {}
+        for table_key, entries in metadata_store.iter_tables(state.session_id):
+            if entries['manual'] is not None:
+                manual_metadata[table_key] = entries['manual']
+            if entries['csv'] is not None:
+                uploaded_metadata[table_key] = entries['csv']
+        response.update(manual_metadata=manual_metadata, uploaded_metadata=uploaded_metadata)
+    
+    with state.lock:
+        response.update(
+            selected_catalog=state.selected_catalog,
+            selected_schema=state.selected_schema,
+            current_tables=state.current_tables,
+            session_size_bytes=state.size_bytes
+        )
+    return with_etag(jsonify(response), etag)
+
+def build_uploaded_metadata(df):
+    """Group metadata CSV rows into the uploaded_metadata structure.
+
+    Uses grouped, vectorized pandas operations instead of walking rows: table-level
+    fields come from each table's first row and a repeated column keeps its last
+    row, matching a row-by-row pass. Returns (metadata, discovered_schemas,
+    discovered_tables).
+    """
+    def values(frame, column, default):
+        if column in frame.columns:
+            return frame[column].tolist()
+        return [default] * len(frame)
+    
+    schema_names = df['SchemaName'].tolist()
+    table_keys = [f"{schema_name}.{table_name}" for schema_name, table_name in zip(schema_names, df['TableName'].tolist())]
+    keys = pd.Series(table_keys, index=df.index)
+    
+    # Table-level fields: first row of every table, in order of first appearance
+    first_rows = df[~keys.duplicated(keep='first').values]
+    uploaded = {}
+    for table_key, schema_name, domain, owner, description, tag in zip(
+        keys[first_rows.index].tolist(),
+        first_rows['SchemaName'].tolist(),
+        values(first_rows, 'Domain', ''),
+        values(first_rows, 'OwnerName', ''),
+        values(first_rows, 'TableDescription', ''),
+        values(first_rows, 'TableTag', '')
+    ):
+        uploaded[table_key] = {
+            'table_info': {
+                'schema': schema_name,
+                'domain': domain,
+                'owner': owner,
+                'description': description,
+                'tag': tag
+            },
+            'columns': {}
+        }
+    
+    # Column-level fields: last row of every (table, column) pair, ordered by the pair's first appearance
+    pair_ids = pd.DataFrame({'table_key': table_keys, 'column': df['ColumnName'].tolist()}).groupby(
+        ['table_key', 'column'], sort=False, dropna=False
+    ).ngroup()
+    last_positions = pd.Series(range(len(df))).groupby(pair_ids.values).max()
+    column_rows = df.iloc[last_positions.values]
+    for table_key, column_name, description, tag, data_type in zip(
+        [table_keys[position] for position in last_positions.tolist()],
+        column_rows['ColumnName'].tolist(),
+        column_rows['ColumnDescription'].tolist(),
+        values(column_rows, 'ColumnTag', ''),
+        values(column_rows, 'ColumnDataType', 'string')
+    ):
+        uploaded[table_key]['columns'][column_name] = {
+            'description': description,
+            'tag': tag,
+            'data_type': data_type
+        }
+    
+    return uploaded, set(schema_names), set(table_keys)
+
+REQUIRED_CSV_COLUMNS = ['SchemaName', 'TableName', 'ColumnName', 'ColumnDescription']
+
+# Native type substrings create_field_schema() emits as DataHub number/boolean fields; anything else is a string
+NUMBER_TYPE_MARKERS = ('int', 'bigint', 'double', 'decimal', 'float', 'numeric')
+BOOLEAN_TYPE_MARKERS = ('boolean', 'bool')
+
+def type_families(types):
+    """DataHub field type ('number', 'boolean' or 'string') for a Series of native type names"""
+    # A file repeats a handful of type names, so classify each distinct name once;
+    # missing names (code -1) pick up the 'string' appended at the end
+    codes, names = pd.factorize(types)
+    lowered = pd.Series(names, dtype=object).astype(str).str.lower()
+    families = np.full(len(names) + 1, 'string', dtype=object)
+    families[:-1][lowered.str.contains('|'.join(BOOLEAN_TYPE_MARKERS), regex=True).to_numpy()] = 'boolean'
+    numeric = (lowered == 'number') | lowered.str.contains('|'.join(NUMBER_TYPE_MARKERS), regex=True)
+    families[:-1][numeric.to_numpy()] = 'number'
+    return pd.Series(families[codes], index=types.index)
+
+class MetadataValidator:
+    """Checks metadata CSV rows against the Trino catalog, one chunk of rows at a time.
+
+    Every check is a vectorized join or group operation over the chunk: unknown
+    schemas, tables and columns, a ColumnDataType whose DataHub type differs from
+    the column's Trino type, repeated (table, column) rows and table-level values
+    that differ from the table's first row. Repeats and conflicts are tracked
+    across chunks. Counts cover every row; details are kept for the first
+    max_issues issues.
+    """
+    
+    SEVERITIES = {
+        'unknown_schema': 'error',
+        'unknown_table': 'error',
+        'unknown_column': 'error',
+        'type_mismatch': 'warning',
+        'duplicate_column': 'warning',
+        'conflicting_table_value': 'warning',
+    }
+    TABLE_FIELDS = ('Domain', 'OwnerName', 'TableDescription', 'TableTag')
+    
+    def __init__(self, catalog, connector=None, max_issues=VALIDATION_MAX_ISSUES):
+        self.catalog = catalog
+        self.connector = connector or trino_connector
+        self.max_issues = max_issues
+        self.rows = 0
+        self.counts = dict.fromkeys(self.SEVERITIES, 0)
+        self.issues = []
+        self.catalog_error = None if catalog else 'No catalog selected'
+        self._column_rows = pd.Series(dtype='int64')  # 'schema.table.column' -> first row
+        self._table_rows = pd.DataFrame(columns=('row',) + self.TABLE_FIELDS)  # 'schema.table' -> first row and its values
+    
+    def _catalog_lookup(self, schema_tables):
+        """Known schemas, tables and column types for the chunk's tables, or None when the catalog cannot be checked"""
+        if self.catalog_error:
+            return None
+        try:
+            resolved = self.connector.resolve_schema_tables(self.catalog, schema_tables)
+        except Exception as e:
+            logger.warning(f"Skipping catalog checks of CSV validation: {str(e)}")
+            self.catalog_error = str(e)
+            return None
+        column_types = {}
+        for schema, result in resolved.items():
+            for table, columns in result['columns'].items():
+                for column in columns:
+                    column_types[f"{schema}.{table}.{column['name']}"] = column['type']
+        return {
+            'schemas': {schema for schema, result in resolved.items() if result['tables']},
+            'tables': {f"{schema}.{table}" for schema, result in resolved.items() for table in result['tables']},
+            'described': {f"{schema}.{table}" for schema, result in resolved.items()
+                          for table, columns in result['columns'].items() if columns},
+            'column_types': column_types
+        }
+    
+    def validate(self, df):
+        """Check one chunk of CSV rows; rows are numbered from 1 across chunks"""
+        rows = pd.RangeIndex(self.rows + 1, self.rows + len(df) + 1)
+        
+        # Plain object arrays: elementwise comparisons and concatenation are much
+        # faster on them than on pandas' string dtype
+        def column(name, text=False):
+            values = df[name].astype(str) if text else df[name]
+            return pd.Series(values.to_numpy(dtype=object), index=rows)
+        
+        schemas = column('SchemaName', text=True)
+        tables = column('TableName', text=True)
+        columns = column('ColumnName', text=True)
+        table_keys = schemas + '.' + tables
+        column_keys = table_keys + '.' + columns
+        self.rows += len(df)
+        found = []
+        
+        def flag(code, mask, messages):
+            count = int(mask.sum())
+            if not count:
+                return
+            self.counts[code] += count
+            found.append(pd.DataFrame({
+                'row': rows[mask.values],
+                'severity': self.SEVERITIES[code],
+                'code': code,
+                'schema': schemas[mask],
+                'table': tables[mask],
+                'column': columns[mask],
+                'message': messages(mask)
+            }))
+        
+        lookup = self._catalog_lookup(group_tables_by_schema(schemas.unique(), table_keys.unique()))
+        if lookup is not None:
+            unknown_schema = ~schemas.isin(lookup['schemas'])
+            flag('unknown_schema', unknown_schema,
+                 lambda mask: "Schema '" + schemas[mask] + "' not found in catalog " + self.catalog)
+            unknown_table = ~unknown_schema & ~table_keys.isin(lookup['tables'])
+            flag('unknown_table', unknown_table,
+                 lambda mask: "Table '" + tables[mask] + "' not found in schema " + schemas[mask])
+            # Tables whose columns could not be fetched are not checked column by column
+            trino_types = column_keys.map(lookup['column_types'])
+            unknown_column = table_keys.isin(lookup['described']) & trino_types.isna()
+            flag('unknown_column', unknown_column,
+                 lambda mask: "Column '" + columns[mask] + "' not found in " + table_keys[mask])
+            
+            if 'ColumnDataType' in df.columns:
+                csv_types = column('ColumnDataType')
+                compared = trino_types.notna() & csv_types.notna()
+                mismatch = compared & (type_families(csv_types) != type_families(trino_types.fillna('')))
+                flag('type_mismatch', mismatch,
+                     lambda mask: "ColumnDataType '" + csv_types[mask].astype(str) +
+                     "' does not match Trino type '" + trino_types[mask] + "'")
+        
+        # Repeated (table, column) rows: the last one wins, as in build_uploaded_metadata()
+        first_in_chunk = ~column_keys.duplicated()
+        new_columns = first_in_chunk & ~column_keys.isin(self._column_rows.index)
+        if new_columns.any():
+            firsts = pd.Series(rows[new_columns.values], index=column_keys[new_columns].values)
+            self._column_rows = firsts if self._column_rows.empty else pd.concat([self._column_rows, firsts])
+        first_rows = column_keys.map(self._column_rows)
+        flag('duplicate_column', first_rows != rows,
+             lambda mask: "Column '" + columns[mask] + "' already listed on row " + first_rows[mask].astype(str) +
+             "; the last row's values are used")
+        
+        # Table-level values: the table's first row wins, as in build_uploaded_metadata()
+        fields = [field for field in self.TABLE_FIELDS if field in df.columns]
+        values = pd.DataFrame({field: column(field) for field in fields}, index=rows)
+        first_in_chunk = ~table_keys.duplicated()
+        new_tables = first_in_chunk & ~table_keys.isin(self._table_rows.index)
+        if new_tables.any():
+            firsts = values[new_tables.values].assign(row=rows[new_tables.values])
+            firsts.index = table_keys[new_tables].values
+            self._table_rows = firsts if self._table_rows.empty else pd.concat([self._table_rows, firsts])
+        reference = self._table_rows.reindex(table_keys.values)
+        reference.index = rows
+        first_rows = reference['row']
+        differing = pd.Series('', index=rows, dtype=object)
+        for field in fields:
+            current = values[field].to_numpy()
+            first = reference[field].to_numpy()
+            differs = ~((current == first) | (pd.isna(current) & pd.isna(first))) & (first_rows != rows).to_numpy()
+            differing[differs] += field + ', '
+        conflicting = differing != ''
+        flag('conflicting_table_value', conflicting,
+             lambda mask: "Table-level values differ from row " + first_rows[mask].astype(str) +
+             ", the table's first row, whose values are used: " + differing[mask].str[:-2])
+        
+        remaining = self.max_issues - len(self.issues)
+        if found and remaining > 0:
+            issues = pd.concat(found, ignore_index=True).sort_values('row', kind='stable').head(remaining)
+            self.issues.extend(issues.to_dict('records'))
+    
+    def report(self):
+        errors = sum(count for code, count in self.counts.items() if self.SEVERITIES[code] == 'error')
+        warnings = sum(self.counts.values()) - errors
+        return {
+            'valid': errors == 0,
+            'rows': self.rows,
+            'errors': errors,
+            'warnings': warnings,
+            'counts': self.counts,
+            'catalog': self.catalog,
+            'catalog_checked': self.catalog_error is None,
+            'catalog_error': self.catalog_error,
+            'issues': self.issues,
+            'truncated': errors + warnings > len(self.issues)
+        }
 
 @app.route('/upload_metadata', methods=['POST'])
 def upload_metadata():
-    global uploaded_metadata
     try:
         if 'file' not in request.files:
             return jsonify({'success': False, 'message': 'No file selected'})
@@ -594,78 +1554,49 @@ def upload_metadata():
             return jsonify({'success': False, 'message': 'No file selected'})
         
         if file and file.filename.endswith('.csv'):
-            filename = secure_filename(file.filename)
-            filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-            file.save(filepath)
-            
-            # Read and process CSV
-            df = pd.read_csv(filepath)
+            # Parsed straight from the request stream; nothing is written to UPLOAD_FOLDER
+            with csv_upload_latency.time(stage='read'):
+                df = pd.read_csv(file.stream)
+            csv_upload_rows.observe(len(df))
             logger.info(f"Uploaded CSV with {len(df)} rows and columns: {list(df.columns)}")
             
             # Expected CSV format: SchemaName, Domain, OwnerName, TableName, TableDescription, TableTag, ColumnName, ColumnDescription, ColumnTag, ColumnDataType
-            required_columns = ['SchemaName', 'TableName', 'ColumnName', 'ColumnDescription']
-            if not all(col in df.columns for col in required_columns):
+            if not all(col in df.columns for col in REQUIRED_CSV_COLUMNS):
                 return jsonify({
                     'success': False, 
-                    'message': f'CSV must contain columns: {", ".join(required_columns)}'
+                    'message': f'CSV must contain columns: {", ".join(REQUIRED_CSV_COLUMNS)}'
                 })
             
             # Process metadata and discover new schemas/tables
-            uploaded_metadata = {}
-            discovered_schemas = set()
-            discovered_tables = set()
-            
-            for _, row in df.iterrows():
-                schema_name = row['SchemaName']
-                table_name = row['TableName']
-                table_key = f"{schema_name}.{table_name}"
-                
-                # Track discovered schemas and tables
-                discovered_schemas.add(schema_name)
-                discovered_tables.add(table_key)
-                
-                if table_key not in uploaded_metadata:
-                    uploaded_metadata[table_key] = {
-                        'table_info': {
-                            'schema': schema_name,
-                            'domain': row.get('Domain', ''),
-                            'owner': row.get('OwnerName', ''),
-                            'description': row.get('TableDescription', ''),
-                            'tag': row.get('TableTag', '')
-                        },
-                        'columns': {}
-                    }
-                
-                uploaded_metadata[table_key]['columns'][row['ColumnName']] = {
-                    'description': row['ColumnDescription'],
-                    'tag': row.get('ColumnTag', ''),
-                    'data_type': row.get('ColumnDataType', 'string')
-                }
+            with csv_upload_latency.time(stage='transform'):
+                uploaded_metadata, discovered_schemas, discovered_tables = build_uploaded_metadata(df)
+            state = get_session_state()
+            with csv_upload_latency.time(stage='validate'):
+                validator = MetadataValidator(state.selected_catalog)
+                validator.validate(df)
+            with csv_upload_latency.time(stage='store'):
+                metadata_store.set_uploaded(state.session_id, uploaded_metadata)
             
             logger.info(f"Processed metadata for {len(uploaded_metadata)} tables")
             logger.info(f"Discovered schemas: {discovered_schemas}")
             logger.info(f"Discovered tables: {discovered_tables}")
             
-            # Check for missing schemas/tables that need to be loaded
-            missing_check = check_missing_schemas_tables(discovered_schemas, discovered_tables)
+            # Check for missing schemas/tables that need to be loaded - don't auto-load, ask user first
+            missing_check = check_missing_schemas_tables(state, discovered_schemas, discovered_tables)
             
+            # Counts only; the stored metadata is read back through /get_metadata
+            response = {
+                'success': True,
+                'message': f'Successfully uploaded metadata for {len(uploaded_metadata)} tables',
+                'rows': len(df),
+                'tables': len(uploaded_metadata),
+                'version': metadata_store.version(state.session_id),
+                'requires_loading': missing_check['has_missing']
+            }
             if missing_check['has_missing']:
-                # Return with missing items info - don't auto-load, ask user first
-                return jsonify({
-                    'success': True, 
-                    'message': f'Successfully uploaded metadata for {len(uploaded_metadata)} tables',
-                    'metadata': uploaded_metadata,
-                    'missing_items': missing_check,
-                    'requires_loading': True
-                })
-            else:
-                # All schemas/tables are already loaded, proceed normally
-                return jsonify({
-                    'success': True, 
-                    'message': f'Successfully uploaded metadata for {len(uploaded_metadata)} tables',
-                    'metadata': uploaded_metadata,
-                    'requires_loading': False
-                })
+                response['missing_items'] = missing_check
+            response['validation'] = validator.report()
+            return jsonify(response)
         else:
             return jsonify({'success': False, 'message': 'Please upload a CSV file'})
     
@@ -673,9 +1604,278 @@ def upload_metadata():
         logger.error(f"Error uploading metadata: {str(e)}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/validate_metadata', methods=['POST'])
+def validate_metadata():
+    """Check a metadata CSV against the selected catalog without storing it; returns the row-level report"""
+    try:
+        file = request.files.get('file')
+        if not file or not file.filename.endswith('.csv'):
+            return jsonify({'success': False, 'message': 'Please upload a CSV file'})
+        
+        validator = MetadataValidator(get_session_state().selected_catalog)
+        with pd.read_csv(file.stream, chunksize=UPLOAD_CSV_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                if not all(col in chunk.columns for col in REQUIRED_CSV_COLUMNS):
+                    return jsonify({
+                        'success': False,
+                        'message': f'CSV must contain columns: {", ".join(REQUIRED_CSV_COLUMNS)}'
+                    })
+                validator.validate(chunk)
+        report = validator.report()
+        return jsonify({
+            'success': True,
+            'message': f"{report['errors']} errors and {report['warnings']} warnings in {report['rows']} rows",
+            'validation': report
+        })
+    except Exception as e:
+        logger.error(f"Error validating metadata: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+class ChunkedUpload:
+    """A metadata CSV sent in fixed-size parts, assembled in a temp file under UPLOAD_FOLDER.
+
+    Parts can arrive in any order and be sent again; each one is written at its own
+    offset, so an interrupted upload resumes by sending only the parts still missing.
+    """
+    
+    COPY_BLOCK_SIZE = 1024 * 1024
+    
+    def __init__(self, workspace, filename, size, part_size):
+        self.upload_id = uuid.uuid4().hex
+        self.workspace = workspace
+        self.filename = filename
+        self.size = size
+        self.part_size = part_size
+        self.part_count = -(-size // part_size)
+        self.path = os.path.join(app.config['UPLOAD_FOLDER'], f"{self.upload_id}.part")
+        self.received = set()
+        self.completing = False
+        self.updated_at = time.time()
+        self._lock = threading.Lock()
+        with open(self.path, 'wb') as f:
+            f.truncate(size)
+    
+    def part_length(self, index):
+        return min(self.part_size, self.size - index * self.part_size)
+    
+    def write_part(self, index, stream):
+        """Copy one part from a request body stream to its offset in the temp file"""
+        if self.completing:
+            raise ValueError('Upload is already being processed')
+        if not 0 <= index < self.part_count:
+            raise ValueError(f'Part {index} is out of range (0-{self.part_count - 1})')
+        with self._lock:
+            # Until this write succeeds the part's bytes on disk cannot be trusted
+            self.received.discard(index)
+        expected = self.part_length(index)
+        written = 0
+        with open(self.path, 'r+b') as f:
+            f.seek(index * self.part_size)
+            while written <= expected:
+                block = stream.read(min(self.COPY_BLOCK_SIZE, expected + 1 - written))
+                if not block:
+                    break
+                f.write(block[:expected - written])
+                written += len(block)
+        if written != expected:
+            raise ValueError(f'Part {index} has {written} bytes, expected {expected}')
+        with self._lock:
+            self.received.add(index)
+            self.updated_at = time.time()
+    
+    def missing_parts(self):
+        with self._lock:
+            return [index for index in range(self.part_count) if index not in self.received]
+    
+    def discard(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+    
+    def to_dict(self):
+        missing = self.missing_parts()
+        return {
+            'upload_id': self.upload_id,
+            'filename': self.filename,
+            'size': self.size,
+            'part_size': self.part_size,
+            'part_count': self.part_count,
+            'received_parts': self.part_count - len(missing),
+            'missing_parts': missing
+        }
+
+chunked_uploads = {}
+chunked_uploads_lock = threading.Lock()
+
+def start_chunked_upload(workspace, filename, size):
+    """Register a new upload, raising ValueError (before any file is created) if it is too large or the session has too many open"""
+    if size > UPLOAD_MAX_SIZE:
+        raise ValueError(f'File is {size:,} bytes, over the {UPLOAD_MAX_SIZE:,} byte upload limit')
+    with chunked_uploads_lock:
+        # Delete the temp files of uploads nobody has sent a part to for a while
+        cutoff = time.time() - UPLOAD_EXPIRY
+        for upload_id in [upload_id for upload_id, old_upload in chunked_uploads.items()
+                          if not old_upload.completing and old_upload.updated_at < cutoff]:
+            chunked_uploads.pop(upload_id).discard()
+        if sum(1 for old_upload in chunked_uploads.values() if old_upload.workspace == workspace) >= UPLOAD_MAX_OPEN:
+            raise ValueError(f'This session already has {UPLOAD_MAX_OPEN} unfinished uploads - finish or cancel one first')
+        # Parts travel as single requests, so they must fit under MAX_CONTENT_LENGTH
+        upload = ChunkedUpload(workspace, filename, size, max(min(UPLOAD_PART_SIZE, MAX_CONTENT_LENGTH), 1))
+        chunked_uploads[upload.upload_id] = upload
+    return upload
+
+def get_chunked_upload(upload_id, workspace):
+    upload = chunked_uploads.get(upload_id)
+    return upload if upload and upload.workspace == workspace else None
+
+def ingest_metadata_csv(workspace, path, upload_id, validator=None):
+    """Store a metadata CSV UPLOAD_CSV_CHUNK_ROWS rows at a time, so memory follows the chunk size, not the file size.
+
+    Each parsed chunk is merged into the upload's staging rows in the metadata store;
+    once the whole file is read they replace the workspace's CSV metadata a page of
+    tables at a time. Each chunk also goes through `validator` when one is given.
+    Returns (rows, discovered_schemas, discovered_tables).
+    """
+    rows = 0
+    discovered_schemas = set()
+    discovered_tables = set()
+    timings = {'read': 0.0, 'transform': 0.0, 'validate': 0.0, 'store': 0.0}
+    try:
+        with pd.read_csv(path, chunksize=UPLOAD_CSV_CHUNK_ROWS) as reader:
+            chunks = iter(reader)
+            while True:
+                started = time.perf_counter()
+                chunk = next(chunks, None)
+                timings['read'] += time.perf_counter() - started
+                if chunk is None:
+                    break
+                if not all(col in chunk.columns for col in REQUIRED_CSV_COLUMNS):
+                    raise ValueError(f'CSV must contain columns: {", ".join(REQUIRED_CSV_COLUMNS)}')
+                
+                started = time.perf_counter()
+                uploaded, schemas, tables = build_uploaded_metadata(chunk)
+                timings['transform'] += time.perf_counter() - started
+                if validator is not None:
+                    started = time.perf_counter()
+                    validator.validate(chunk)
+                    timings['validate'] += time.perf_counter() - started
+                started = time.perf_counter()
+                metadata_store.stage_uploaded(upload_id, uploaded)
+                timings['store'] += time.perf_counter() - started
+                
+                rows += len(chunk)
+                discovered_schemas.update(schemas)
+                discovered_tables.update(tables)
+        
+        started = time.perf_counter()
+        metadata_store.commit_staged(workspace, upload_id)
+        timings['store'] += time.perf_counter() - started
+    finally:
+        # Nothing is left staged after a commit; this cleans up after a failed parse
+        metadata_store.discard_staged(upload_id)
+    
+    for stage, seconds in timings.items():
+        csv_upload_latency.observe(seconds, stage=stage)
+    csv_upload_rows.observe(rows)
+    return rows, discovered_schemas, discovered_tables
+
+@app.route('/start_metadata_upload', methods=['POST'])
+def start_metadata_upload():
+    """Begin a chunked CSV upload of `size` bytes; returns the upload ID and the part size to slice the file by"""
+    try:
+        data = request.get_json(silent=True) or {}
+        filename = secure_filename(str(data.get('filename', '')))
+        size = data.get('size')
+        if not filename.endswith('.csv'):
+            return jsonify({'success': False, 'message': 'Please upload a CSV file'})
+        if not isinstance(size, int) or size <= 0:
+            return jsonify({'success': False, 'message': 'File is empty'})
+        
+        upload = start_chunked_upload(get_session_state().session_id, filename, size)
+        logger.info(f"Started chunked upload {upload.upload_id} of {filename} ({size} bytes, {upload.part_count} parts)")
+        return jsonify({'success': True, 'upload': upload.to_dict()})
+    except Exception as e:
+        logger.error(f"Error starting upload: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/upload_metadata_part/<upload_id>/<int:index>', methods=['POST'])
+def upload_metadata_part(upload_id, index):
+    """Store part `index` of a chunked upload; the request body is the raw bytes of the part"""
+    upload = get_chunked_upload(upload_id, get_session_state().session_id)
+    if not upload:
+        return jsonify({'success': False, 'message': 'Upload not found'})
+    try:
+        upload.write_part(index, request.stream)
+        return jsonify({'success': True, 'missing_parts': len(upload.missing_parts())})
+    except Exception as e:
+        logger.error(f"Error storing part {index} of upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/get_metadata_upload/<upload_id>')
+def get_metadata_upload(upload_id):
+    """Progress of a chunked upload, including the parts still to send when resuming"""
+    upload = get_chunked_upload(upload_id, get_session_state().session_id)
+    if not upload:
+        return jsonify({'success': False, 'message': 'Upload not found'})
+    return jsonify({'success': True, 'upload': upload.to_dict()})
+
+@app.route('/complete_metadata_upload/<upload_id>', methods=['POST'])
+def complete_metadata_upload(upload_id):
+    """Parse and store a fully received chunked upload, then delete its temp file"""
+    state = get_session_state()
+    upload = get_chunked_upload(upload_id, state.session_id)
+    if not upload:
+        return jsonify({'success': False, 'message': 'Upload not found'})
+    missing = upload.missing_parts()
+    if missing:
+        return jsonify({'success': False, 'message': f'{len(missing)} parts have not been received yet',
+                        'missing_parts': missing})
+    with chunked_uploads_lock:
+        if upload.completing:
+            return jsonify({'success': False, 'message': 'Upload is already being processed'})
+        upload.completing = True
+    
+    try:
+        validator = MetadataValidator(state.selected_catalog)
+        rows, discovered_schemas, discovered_tables = ingest_metadata_csv(
+            state.session_id, upload.path, upload_id, validator
+        )
+        logger.info(f"Processed chunked upload {upload_id}: {rows} rows, {len(discovered_tables)} tables")
+        
+        # Check for missing schemas/tables that need to be loaded
+        missing_check = check_missing_schemas_tables(state, discovered_schemas, discovered_tables)
+        response = {
+            'success': True,
+            'message': f'Successfully uploaded metadata for {len(discovered_tables)} tables',
+            'rows': rows,
+            'tables': len(discovered_tables),
+            'requires_loading': missing_check['has_missing'],
+            'validation': validator.report()
+        }
+        if missing_check['has_missing']:
+            response['missing_items'] = missing_check
+        return jsonify(response)
+    except Exception as e:
+        logger.error(f"Error processing upload {upload_id}: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+    finally:
+        with chunked_uploads_lock:
+            chunked_uploads.pop(upload_id, None)
+        upload.discard()
+
+@app.route('/cancel_metadata_upload/<upload_id>', methods=['POST'])
+def cancel_metadata_upload(upload_id):
+    upload = get_chunked_upload(upload_id, get_session_state().session_id)
+    if not upload or upload.completing:
+        return jsonify({'success': False, 'message': 'Upload not found'})
+    with chunked_uploads_lock:
+        chunked_uploads.pop(upload_id, None)
+    upload.discard()
+    return jsonify({'success': True, 'message': 'Upload cancelled'})
+
 @app.route('/add_metadata', methods=['POST'])
 def add_metadata():
-    global current_metadata
     try:
         data = request.json
         table_name = data.get('table_name')
@@ -689,23 +1889,19 @@ def add_metadata():
         if not all([table_name, column_name, column_description]):
             return jsonify({'success': False, 'message': 'Missing required fields'})
         
+        state = get_session_state()
+        selected_schema = state.selected_schema
         table_key = f"{selected_schema}.{table_name}" if selected_schema else table_name
         
-        if table_key not in current_metadata:
-            current_metadata[table_key] = {
-                'table_info': {
-                    'schema': selected_schema,
-                    'description': table_description,
-                    'tag': table_tag
-                },
-                'columns': {}
-            }
-        
-        current_metadata[table_key]['columns'][column_name] = {
+        metadata_store.add_manual_column(state.session_id, table_key, {
+            'schema': selected_schema,
+            'description': table_description,
+            'tag': table_tag
+        }, column_name, {
             'description': column_description,
             'tag': column_tag,
             'data_type': data_type
-        }
+        })
         
         logger.info(f"Added metadata for {table_key}.{column_name}")
         return jsonify({'success': True, 'message': 'Metadata added successfully'})
@@ -714,71 +1910,160 @@ def add_metadata():
         logger.error(f"Error adding metadata: {str(e)}")
         return jsonify({'success': False, 'message': str(e)})
 
-@app.route('/get_metadata')
-def get_metadata():
-    # Combine manual and uploaded metadata
-    combined_metadata = {}
+METADATA_EDIT_OPS = ('set', 'patch', 'delete')
+# Request field -> stored field, as named by /add_metadata
+METADATA_EDIT_TABLE_FIELDS = {'table_description': 'description', 'table_tag': 'tag'}
+METADATA_EDIT_COLUMN_FIELDS = {'column_description': 'description', 'column_tag': 'tag', 'data_type': 'data_type'}
+
+def parse_metadata_edit(item, default_schema):
+    """Normalize one /batch_metadata edit for MetadataStore.apply_manual_edits(), raising ValueError if it is malformed"""
+    if not isinstance(item, dict):
+        raise ValueError('Each edit must be a JSON object')
+    op = item.get('op', 'set')
+    if op not in METADATA_EDIT_OPS:
+        raise ValueError(f"Unknown op '{op}', expected one of: {', '.join(METADATA_EDIT_OPS)}")
+    table_name = item.get('table_name')
+    column_name = item.get('column_name') or None
+    schema = item.get('schema', default_schema)
+    for name, value in [('table_name', table_name), ('column_name', column_name), ('schema', schema)]:
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{name} must be a string')
+    if not table_name:
+        raise ValueError('table_name is required')
     
-    # Add manual metadata
-    for table_key, table_data in current_metadata.items():
-        combined_metadata[table_key] = table_data
+    given = {name: item[name] for name in (*METADATA_EDIT_TABLE_FIELDS, *METADATA_EDIT_COLUMN_FIELDS) if name in item}
+    for name, value in given.items():
+        if value is not None and not isinstance(value, str):
+            raise ValueError(f'{name} must be a string or null')
+    if op == 'set':
+        # Replaces the whole entry, so absent fields take the /add_metadata defaults
+        given = {'table_description': '', 'table_tag': '', 'column_tag': '', 'data_type': 'string', **given}
+        if column_name and not given.get('column_description'):
+            raise ValueError('column_description is required')
+    table_values = {field: given[name] for name, field in METADATA_EDIT_TABLE_FIELDS.items() if name in given}
+    column_values = {field: given[name] for name, field in METADATA_EDIT_COLUMN_FIELDS.items() if name in given}
+    if op == 'patch':
+        if not column_name and column_values:
+            raise ValueError('column_name is required to patch column fields')
+        if not table_values and not column_values:
+            raise ValueError('Nothing to patch')
+    if op == 'delete' and (table_values or column_values):
+        raise ValueError('A delete takes no field values')
     
-    # Add uploaded metadata
-    for table_key, table_data in uploaded_metadata.items():
-        if table_key not in combined_metadata:
-            combined_metadata[table_key] = table_data
+    return {
+        'op': op,
+        'table_key': f"{schema}.{table_name}" if schema else table_name,
+        'schema': schema,
+        'column': column_name,
+        'table': table_values,
+        'column_values': column_values if column_name else {}
+    }
+
+@app.route('/batch_metadata', methods=['POST'])
+def batch_metadata():
+    """Apply many table- and column-level manual metadata edits at once, all or nothing, with a result per edit"""
+    try:
+        data = request.get_json(silent=True) or {}
+        items = data.get('edits')
+        if not isinstance(items, list) or not items:
+            return jsonify({'success': False, 'message': 'No edits given'})
+        
+        state = get_session_state()
+        edits = []
+        errors = []
+        for item in items:
+            try:
+                edits.append(parse_metadata_edit(item, state.selected_schema))
+                errors.append(None)
+            except ValueError as e:
+                edits.append(None)
+                errors.append(str(e))
+        if not any(errors):
+            errors = metadata_store.apply_manual_edits(state.session_id, edits)
+        
+        failed = sum(1 for error in errors if error)
+        results = []
+        for index, (edit, error) in enumerate(zip(edits, errors)):
+            result = {'index': index, 'status': 'failed' if error else ('skipped' if failed else 'applied')}
+            if edit is not None:
+                result.update({'op': edit['op'], 'table': edit['table_key'], 'column': edit['column']})
+            if error:
+                result['message'] = error
+            results.append(result)
+        
+        if failed:
+            message = f'No edits applied: {failed} of {len(edits)} edits failed'
         else:
-            # Merge columns
-            combined_metadata[table_key]['columns'].update(table_data['columns'])
+            message = f'Applied {len(edits)} edits to {len({edit["table_key"] for edit in edits})} tables'
+        return jsonify({
+            'success': not failed,
+            'message': message,
+            'applied': 0 if failed else len(edits),
+            'failed': failed,
+            'results': results,
+            'version': metadata_store.version(state.session_id)
+        })
+    
+    except Exception as e:
+        logger.error(f"Error applying metadata edits: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+def iter_json_object(pairs, encoded=False):
+    """Serialize (key, value) pairs as a JSON object one member at a time; encoded values are already JSON text"""
+    yield '{'
+    for index, (key, value) in enumerate(pairs):
+        yield (', ' if index else '') + dumps_json(str(key)) + ': ' + (value if encoded else dumps_json(value))
+    yield '}'
+
+@app.route('/get_metadata')
+def get_metadata():
+    """Merged manual + CSV metadata streamed from the metadata store; ?since_version=N returns only later changes"""
+    workspace = get_session_state().session_id
+    since_version = request.args.get('since_version', type=int)
+    version = metadata_store.version(workspace)
+    etag = state_etag(workspace, version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
+    if since_version is None:
+        table_keys, removed = None, []
+    else:
+        table_keys, removed = metadata_store.changes_since(workspace, since_version)
+    
+    def generate():
+        yield '{"metadata": '
+        for chunk in iter_json_object(metadata_store.iter_merged(workspace, table_keys), encoded=True):
+            yield chunk
+        yield f', "removed": {dumps_json(removed)}, "version": {version}}}'
     
-    return jsonify({'metadata': combined_metadata})
+    return with_etag(Response(generate(), mimetype='application/json'), etag)
 
 @app.route('/get_metadata_with_source')
 def get_metadata_with_source():
-    """Get metadata with source information (manual vs CSV)"""
-    metadata_with_source = {
-        'manual': current_metadata,
-        'csv': uploaded_metadata,
-        'combined': {}
-    }
-    
-    # Create combined metadata with source tracking
-    combined = {}
+    """Get metadata with source information (manual vs CSV), streamed from the metadata store"""
+    workspace = get_session_state().session_id
+    version = metadata_store.version(workspace)
+    etag = state_etag(workspace, version)
+    cached = not_modified(etag)
+    if cached is not None:
+        return cached
     
-    # Add manual metadata
-    for table_key, table_data in current_metadata.items():
-        if table_key not in combined:
-            combined[table_key] = {
-                'table_info': table_data.get('table_info', {}),
-                'columns': {},
-                'sources': {'table': 'manual', 'columns': {}}
-            }
-        
-        for col_name, col_data in table_data.get('columns', {}).items():
-            combined[table_key]['columns'][col_name] = col_data
-            combined[table_key]['sources']['columns'][col_name] = 'manual'
-    
-    # Add uploaded metadata
-    for table_key, table_data in uploaded_metadata.items():
-        if table_key not in combined:
-            combined[table_key] = {
-                'table_info': table_data.get('table_info', {}),
-                'columns': {},
-                'sources': {'table': 'csv', 'columns': {}}
-            }
-        else:
-            # Merge table info (CSV takes precedence if manual doesn't have it)
-            if not combined[table_key]['table_info'].get('description') and table_data.get('table_info', {}).get('description'):
-                combined[table_key]['table_info'].update(table_data['table_info'])
-                combined[table_key]['sources']['table'] = 'csv'
-        
-        for col_name, col_data in table_data.get('columns', {}).items():
-            combined[table_key]['columns'][col_name] = col_data
-            combined[table_key]['sources']['columns'][col_name] = 'csv'
+    def section(source):
+        for table_key, entries in metadata_store.iter_tables(workspace):
+            if entries[source] is not None:
+                yield table_key, entries[source]
     
-    metadata_with_source['combined'] = combined
+    def generate():
+        for index, source in enumerate(('manual', 'csv')):
+            yield ('{' if index == 0 else ', ') + dumps_json(source) + ': '
+            for chunk in iter_json_object(section(source)):
+                yield chunk
+        yield ', "combined": '
+        for chunk in iter_json_object(metadata_store.iter_merged(workspace, with_sources=True), encoded=True):
+            yield chunk
+        yield f', "version": {version}}}'
     
-    return jsonify(metadata_with_source)
+    return with_etag(Response(generate(), mimetype='application/json'), etag)
 
 def create_field_schema(column_info, metadata=None):
     """Create SchemaFieldClass from column info and metadata"""
@@ -787,14 +2072,14 @@ def create_field_schema(column_info, metadata=None):
     
     # Determine field type - fix the logic for number detection
     if col_type == 'number' or any(num_type in col_type for num_type in ['int', 'bigint', 'double', 'decimal', 'float', 'numeric']):
-        field_type = NumberTypeClass()
+        field_type = schema_classes.NumberTypeClass()
     elif 'boolean' in col_type or 'bool' in col_type:
-        field_type = BooleanTypeClass()
+        field_type = schema_classes.BooleanTypeClass()
     elif 'varchar' in col_type or 'char' in col_type or 'string' in col_type or 'text' in col_type:
-        field_type = StringTypeClass()
+        field_type = schema_classes.StringTypeClass()
     else:
         # Default to string for unknown types
-        field_type = StringTypeClass()
+        field_type = schema_classes.StringTypeClass()
         logger.warning(f"Unknown column type '{col_type}' for column '{col_name}', defaulting to string")
     
     # Get description from metadata if available
@@ -805,9 +2090,9 @@ def create_field_schema(column_info, metadata=None):
         description = col_metadata.get('description', description)
     
     # Create the field schema (tags will be handled separately at dataset level)
-    field_schema = SchemaFieldClass(
+    field_schema = schema_classes.SchemaFieldClass(
         fieldPath=col_name,
-        type=SchemaFieldDataTypeClass(type=field_type),
+        type=schema_classes.SchemaFieldDataTypeClass(type=field_type),
         nativeDataType=col_type,
         description=description,
     )
@@ -815,10 +2100,330 @@ def create_field_schema(column_info, metadata=None):
     logger.debug(f"Created field schema for {col_name}: type={type(field_type).__name__}, nativeType={col_type}")
     return field_schema
 
+
+workspace_sweep = {'last_run': None, 'running': False, 'expired_total': 0, 'last_error': None}
+workspace_sweep_lock = threading.Lock()
+workspace_sweep_checked = [float('-inf')]  # monotonic time of the last due check
+
+def sweep_expired_workspaces():
+    """Delete the stored metadata and dead letters of workspaces unused for METADATA_WORKSPACE_TTL seconds"""
+    try:
+        expired = metadata_store.expire_workspaces(time.time() - METADATA_WORKSPACE_TTL)
+        if expired:
+            dead_letter_queue.clear_workspaces(expired)
+        with workspace_sweep_lock:
+            workspace_sweep['expired_total'] += len(expired)
+            workspace_sweep['last_error'] = None
+    except Exception as e:
+        logger.error(f"Error sweeping expired workspaces: {str(e)}")
+        with workspace_sweep_lock:
+            workspace_sweep['last_error'] = str(e)
+    finally:
+        with workspace_sweep_lock:
+            workspace_sweep['last_run'] = time.time()
+            workspace_sweep['running'] = False
+
+def schedule_workspace_sweep():
+    """Start a background sweep when METADATA_SWEEP_INTERVAL has passed since the last one"""
+    if METADATA_WORKSPACE_TTL <= 0:
+        return
+    now = time.monotonic()
+    with workspace_sweep_lock:
+        if workspace_sweep['running'] or now - workspace_sweep_checked[0] < METADATA_SWEEP_INTERVAL:
+            return
+        workspace_sweep_checked[0] = now
+        workspace_sweep['running'] = True
+    threading.Thread(target=sweep_expired_workspaces, name='workspace-sweep', daemon=True).start()
+
+def _aspect_payload(aspect):
+    """Serializable aspect content without the audit timestamps that change on every run"""
+    aspect_obj = aspect.to_obj()
+    aspect_obj.pop('created', None)
+    aspect_obj.pop('lastModified', None)
+    return [type(aspect).__name__, aspect_obj]
+
+def compute_aspects_hash(aspects):
+    """Hash the emitted aspects as a whole"""
+    return _sha256_json([_aspect_payload(aspect) for aspect in aspects])
+
+def compute_aspect_hashes(aspects):
+    """Hash each aspect separately, keyed by aspect name"""
+    return {aspect.get_aspect_name(): _sha256_json(_aspect_payload(aspect)) for aspect in aspects}
+
+def select_supplied_aspects(aspects, table_metadata):
+    """Keep only the aspects backed by user-supplied metadata (all of them for a table without any)"""
+    if not table_metadata:
+        return list(aspects)
+    
+    table_info = table_metadata.get('table_info', {})
+    columns = table_metadata.get('columns', {})
+    supplied = []
+    for aspect in aspects:
+        if isinstance(aspect, schema_classes.DatasetPropertiesClass) and not table_info.get('description'):
+            continue
+        if isinstance(aspect, schema_classes.SchemaMetadataClass) and not any(col.get('description') for col in columns.values()):
+            continue
+        supplied.append(aspect)
+    return supplied
+
+def build_aspect_mcps(dataset_urn, aspects, table_metadata, force=False):
+    """MCPs for the supplied aspects of one table that changed since the last emission, with their hashes"""
+    supplied_aspects = select_supplied_aspects(aspects, table_metadata)
+    aspect_hashes = compute_aspect_hashes(supplied_aspects)
+    if not force:
+        previous_hashes = emission_ledger.get_aspect_hashes(dataset_urn)
+        aspect_hashes = {name: content_hash for name, content_hash in aspect_hashes.items()
+                         if previous_hashes.get(name) != content_hash}
+    
+    mcps = [
+        datahub_mcp.MetadataChangeProposalWrapper(entityUrn=dataset_urn, aspect=aspect)
+        for aspect in supplied_aspects if aspect.get_aspect_name() in aspect_hashes
+    ]
+    return mcps, aspect_hashes
+
+def send_to_gms(emitter, items, slots=None):
+    """Send ('mce', mce) and ('mcps', [mcp, ...]) items in order, each with retries.
+
+    Returns (unsent items, error): ([], None) when everything went through, otherwise
+    the failed item and everything after it together with the error.
+    """
+    for index, (kind, payload) in enumerate(items):
+        try:
+            if kind == 'mce':
+                instrumented_emit('emit_mce', lambda: emitter.emit_mce(payload), [payload], slots)
+            elif hasattr(emitter, 'emit_mcps'):
+                # One batched ingestProposal round trip for all of the table's aspects
+                instrumented_emit('emit_mcps', lambda: emitter.emit_mcps(payload), payload, slots)
+            else:
+                for mcp in payload:
+                    instrumented_emit('emit_mcp', lambda: emitter.emit_mcp(mcp), [mcp], slots)
+        except Exception as e:
+            return items[index:], e
+    return [], None
+
+def record_emission(dataset_urn, content_hash, aspect_hashes):
+    """Note a delivered emission in the ledger; content_hash is None for MCP-only emissions"""
+    if content_hash:
+        emission_ledger.record(dataset_urn, content_hash)
+    emission_ledger.record_aspects(dataset_urn, aspect_hashes)
+
+def build_dataset_mce(table_name, catalog, schema, table_summary, table_metadata):
+    """Build the dataset snapshot MCE for one table from its columns and curated metadata"""
+    # Create field schemas
+    field_schemas = []
+    
+    logger.info(f"Processing table: {table_name}, table_key: {schema}.{table_name}")
+    logger.info(f"Found metadata for table: {bool(table_metadata)}")
+    if table_metadata:
+        logger.info(f"Metadata columns: {list(table_metadata.get('columns', {}).keys())}")
+    
+    # Get column metadata if available
+    column_metadata = {}
+    if 'columns' in table_metadata:
+        column_metadata = table_metadata['columns']
+    
+    for column_info in table_summary['columns']:
+        field_schema = create_field_schema(column_info, column_metadata)
+        field_schemas.append(field_schema)
+    
+    # Get table description and metadata
+    table_description = f"Table `{table_name}` from Trino catalog {catalog}.{schema}"
+    table_info = {}
+    
+    if table_metadata and 'table_info' in table_metadata:
+        table_info = table_metadata['table_info']
+        if table_info.get('description'):
+            table_description = table_info['description']
+    
+    # Build dataset snapshot
+    dataset_urn = f"urn:li:dataset:(urn:li:dataPlatform:{PLATFORM},{catalog}.{schema}.{table_name},{ENV})"
+    now = datetime.datetime.now()
+    
+    # Create aspects list
+    aspects = []
+    
+    # Add dataset properties (keep description clean)
+    aspects.append(schema_classes.DatasetPropertiesClass(description=table_description))
+    
+    # Add schema metadata
+    aspects.append(schema_classes.SchemaMetadataClass(
+        schemaName=f"{table_name}_schema",
+        platform=f"urn:li:dataPlatform:{PLATFORM}",
+        version=0,
+        created=schema_classes.AuditStampClass(time=int(now.timestamp() * 1000), actor=OWNER_URN),
+        lastModified=schema_classes.AuditStampClass(time=int(now.timestamp() * 1000), actor=OWNER_URN),
+        hash="",
+        platformSchema=schema_classes.OtherSchemaClass(rawSchema=""),
+        fields=field_schemas,
+    ))
+    
+    # Add ownership if owner is specified
+    if table_info.get('owner'):
+        try:
+            owner_urn = f"urn:li:corpuser:{table_info['owner'].lower().replace(' ', '_')}"
+            aspects.append(schema_classes.OwnershipClass(
+                owners=[
+                    schema_classes.OwnerClass(
+                        owner=owner_urn,
+                        type=schema_classes.OwnershipTypeClass.DATAOWNER,
+                        source=None
+                    )
+                ],
+                lastModified=schema_classes.AuditStampClass(time=int(now.timestamp() * 1000), actor=OWNER_URN)
+            ))
+            logger.info(f"Added owner {table_info['owner']} for table {table_name}")
+        except Exception as e:
+            logger.warning(f"Failed to add owner for {table_name}: {str(e)}")
+    
+    # Add proper DataHub domain if specified
+    if table_info.get('domain'):
+        try:
+            clean_domain = table_info['domain'].lower().replace(' ', '_').replace('-', '_')
+            domain_urn = f"urn:li:domain:{clean_domain}"
+            
+            # Validate domain URN
+            if clean_domain and len(clean_domain) > 0:
+                aspects.append(schema_classes.DomainsClass(domains=[domain_urn]))
+                logger.info(f"Added domain {table_info['domain']} ({domain_urn}) for table {table_name}")
+            else:
+                logger.warning(f"Invalid domain name for {table_name}: {table_info['domain']}")
+        except Exception as e:
+            logger.warning(f"Failed to add domain for {table_name}: {str(e)}")
+    
+    # Add proper DataHub tags if specified
+    tags_to_add = []
+    
+    # Add table tag
+    if table_info.get('tag'):
+        table_tag = table_info['tag'].lower().replace(' ', '_').replace('-', '_')
+        table_tag_urn = f"urn:li:tag:{table_tag}"
+        tags_to_add.append(schema_classes.TagAssociationClass(tag=table_tag_urn))
+    
+    # Add column tags (collect all unique column tags)
+    if 'columns' in table_metadata:
+        column_tags = set()
+        for col_name, col_data in table_metadata['columns'].items():
+            if col_data.get('tag'):
+                column_tags.add(col_data['tag'])
+        
+        for tag in sorted(column_tags):
+            clean_tag = tag.lower().replace(' ', '_').replace('-', '_')
+            tag_urn = f"urn:li:tag:{clean_tag}"
+            tags_to_add.append(schema_classes.TagAssociationClass(tag=tag_urn))
+    
+    if tags_to_add:
+        try:
+            # Validate tag URNs before creating GlobalTagsClass
+            valid_tags = []
+            for tag_assoc in tags_to_add:
+                if tag_assoc.tag and tag_assoc.tag.startswith('urn:li:tag:'):
+                    valid_tags.append(tag_assoc)
+                else:
+                    logger.warning(f"Invalid tag URN: {tag_assoc.tag}")
+            
+            if valid_tags:
+                aspects.append(schema_classes.GlobalTagsClass(tags=valid_tags))
+                tag_names = [tag.tag.split(':')[-1] for tag in valid_tags]
+                logger.info(f"Added tags {tag_names} for table {table_name}")
+        except Exception as e:
+            logger.warning(f"Failed to add tags for {table_name}: {str(e)}")
+    
+    snapshot = schema_classes.DatasetSnapshotClass(
+        urn=dataset_urn,
+        aspects=aspects
+    )
+    
+    mce = schema_classes.MetadataChangeEventClass(proposedSnapshot=snapshot)
+    
+    # Debug: Log the MCE structure
+    logger.info(f"Emitting MCE for {table_name} with {len(aspects)} aspects")
+    return mce
+
+def emit_table_to_datahub(table_name, catalog, schema, combined_metadata, emitter, trino_slots, gms_slots,
+                          force=False, mode='mce', workspace=None):
+    """Fetch, build and emit one table.
+
+    Returns ('success', None), ('skipped', None) when the aspects match the last
+    emission recorded in the ledger, or ('failed', message). Built items that GMS
+    still rejects after retrying go to the workspace's dead-letter queue.
+    """
+    try:
+        table_key = f"{schema}.{table_name}"
+        
+        # Emission only needs the column list - no row count
+        with trino_slots:
+            columns = trino_connector.get_table_columns(catalog, schema, table_name)
+        table_summary = {'table_name': table_name, 'columns': columns} if columns else None
+        if not table_summary:
+            # Check if we have metadata for this table even if it's not in Trino
+            if table_key in combined_metadata and combined_metadata[table_key].get('columns'):
+                logger.warning(f"Table {table_name} not found in Trino but has metadata - creating basic schema")
+                # Create a basic table summary from metadata
+                table_summary = {
+                    'table_name': table_name,
+                    'columns': []
+                }
+                # Create columns from metadata
+                for col_name, col_data in combined_metadata[table_key]['columns'].items():
+                    table_summary['columns'].append({
+                        'name': col_name,
+                        'type': col_data.get('data_type', 'string')
+                    })
+            else:
+                return 'failed', f"{table_name}: Table not found in Trino and no metadata available"
+        
+        table_metadata = combined_metadata.get(table_key, {})
+        mce = build_dataset_mce(table_name, catalog, schema, table_summary, table_metadata)
+        dataset_urn = mce.proposedSnapshot.urn
+        aspects = mce.proposedSnapshot.aspects
+        
+        if mode == 'mcp':
+            content_hash = None
+            mcps, aspect_hashes = build_aspect_mcps(dataset_urn, aspects, table_metadata, force)
+            if not mcps:
+                logger.info(f"Skipping {table_name} - no supplied aspect changed since last emission")
+                return 'skipped', None
+            items = [('mcps', mcps)]
+        else:
+            # Skip tables whose aspects are identical to the last successful emission
+            content_hash = compute_aspects_hash(aspects)
+            if not force and emission_ledger.get_hash(dataset_urn) == content_hash:
+                logger.info(f"Skipping {table_name} - metadata unchanged since last emission")
+                return 'skipped', None
+            aspect_hashes = compute_aspect_hashes(aspects)
+            
+            # Domains is not part of the DatasetSnapshot aspect union, so it follows the MCE as an MCP
+            domain_mcps = [datahub_mcp.MetadataChangeProposalWrapper(entityUrn=dataset_urn, aspect=aspect)
+                           for aspect in aspects if isinstance(aspect, schema_classes.DomainsClass)]
+            items = [('mce', mce)]
+            if domain_mcps:
+                mce.proposedSnapshot.aspects = [aspect for aspect in aspects if not isinstance(aspect, schema_classes.DomainsClass)]
+                items.append(('mcps', domain_mcps))
+        
+        # Emit to DataHub; whatever still fails after retrying is kept for "retry failed"
+        unsent, emit_error = send_to_gms(emitter, items, gms_slots)
+        if emit_error:
+            logger.error(f"DataHub emission failed for {table_name}: {str(emit_error)}")
+            if workspace:
+                dead_letter_queue.add(workspace, catalog, schema, table_name, dataset_urn, mode, unsent,
+                                      content_hash, aspect_hashes, str(emit_error))
+            return 'failed', f"{table_name}: DataHub emission failed - {str(emit_error)}"
+        
+        record_emission(dataset_urn, content_hash, aspect_hashes)
+        logger.info(f"Successfully emitted metadata for {table_name}")
+        return 'success', None
+        
+    except Exception as e:
+        logger.error(f"Failed to prepare metadata for {table_name}: {str(e)}")
+        logger.error(f"Exception type: {type(e)}")
+        import traceback
+        logger.error(f"Traceback: {traceback.format_exc()}")
+        return 'failed', f"{table_name}: Metadata preparation failed - {str(e)}"
+
 @app.route('/test_datahub_connection', methods=['POST'])
 def test_datahub_connection():
     try:
-        emitter = DatahubRestEmitter(gms_server=DATAHUB_GMS)
+        emitter = datahub_rest_emitter.DatahubRestEmitter(gms_server=DATAHUB_GMS)
         # Try to create a simple test connection
         logger.info("Testing DataHub connection...")
         
@@ -845,6 +2450,10 @@ def test_datahub_connection():
 @app.route('/test_trino_connection', methods=['POST'])
 def test_trino_connection():
     try:
+        state = get_session_state()
+        with state.lock:
+            selected_catalog = state.selected_catalog
+            selected_schema = state.selected_schema
         if not selected_catalog or not selected_schema:
             return jsonify({
                 'success': False, 
@@ -854,8 +2463,11 @@ def test_trino_connection():
         test_connector = TrinoConnector()
         if test_connector.connect(selected_catalog, selected_schema):
             # Try a simple query
-            test_connector.cursor.execute("SELECT 1")
-            result = test_connector.cursor.fetchone()
+            try:
+                test_connector.cursor.execute("SELECT 1")
+                result = test_connector.cursor.fetchone()
+            finally:
+                test_connector.release()
             if result:
                 logger.info("Trino connection test successful")
                 return jsonify({
@@ -874,239 +2486,263 @@ def test_trino_connection():
             'message': f'Trino connection failed: {str(e)}'
         })
 
+def prepare_emission(data):
+    """Validate an emission request and snapshot everything the run needs.
+
+    Returns (settings, None) on success or (None, error response dict).
+    """
+    table_names = list(dict.fromkeys(data.get('tables', [])))
+    
+    if not table_names:
+        return None, {'success': False, 'message': 'No tables selected'}
+    
+    state = get_session_state()
+    with state.lock:
+        selected_catalog = state.selected_catalog
+        selected_schema = state.selected_schema
+    
+    # The run may outlive this request, so it works on a snapshot of the tables being emitted
+    workspace = state.session_id
+    metadata_version = metadata_store.version(workspace)
+    combined_metadata = metadata_store.get_combined(
+        workspace, [f"{selected_schema}.{table_name}" for table_name in table_names]
+    )
+    
+    if not selected_catalog or not selected_schema:
+        return None, {
+            'success': False, 
+            'message': 'Catalog and schema must be selected before emitting'
+        }
+    
+    mode = data.get('mode', EMIT_MODE)
+    if mode not in ('mce', 'mcp'):
+        return None, {'success': False, 'message': f'Unknown emission mode: {mode}'}
+    
+    logger.info(f"Metadata for emission (version {metadata_version}): {list(combined_metadata.keys())}")
+    logger.info(f"Selected schema: {selected_schema}, Selected catalog: {selected_catalog}")
+    logger.info(f"Tables to emit: {table_names}")
+    
+    try:
+        emitter = datahub_rest_emitter.DatahubRestEmitter(gms_server=DATAHUB_GMS)
+    except Exception as e:
+        logger.error(f"Failed to create DataHub emitter: {str(e)}")
+        return None, {
+            'success': False, 
+            'message': f'Failed to connect to DataHub: {str(e)}'
+        }
+    
+    return {
+        'table_names': table_names,
+        'catalog': selected_catalog,
+        'schema': selected_schema,
+        'combined_metadata': combined_metadata,
+        'emitter': emitter,
+        'force': bool(data.get('force', False)),
+        'mode': mode,
+        'concurrent': data.get('concurrent', EMIT_CONCURRENT),
+        'workspace': workspace
+    }, None
+
+def run_emission(settings, on_result=None, is_cancelled=None):
+    """Emit every requested table; returns (successful, skipped, failed) in request order"""
+    table_names = settings['table_names']
+    trino_slots = threading.BoundedSemaphore(EMIT_TRINO_CONCURRENCY)
+    gms_slots = threading.BoundedSemaphore(EMIT_GMS_CONCURRENCY)
+    
+    def process_table(table_name):
+        if is_cancelled and is_cancelled():
+            outcome = ('cancelled', None)
+        else:
+            outcome = emit_table_to_datahub(
+                table_name, settings['catalog'], settings['schema'], settings['combined_metadata'],
+                settings['emitter'], trino_slots, gms_slots, force=settings['force'], mode=settings['mode'],
+                workspace=settings.get('workspace')
+            )
+        if on_result:
+            on_result(table_name, *outcome)
+        return outcome
+    
+    if settings['concurrent'] and len(table_names) > 1:
+        # Trino fetches and GMS posts are independent across tables; the
+        # semaphores keep each side within its own concurrency limit
+        max_workers = min(len(table_names), EMIT_TRINO_CONCURRENCY + EMIT_GMS_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='emit') as executor:
+            outcomes = list(executor.map(process_table, table_names))
+    else:
+        outcomes = [process_table(table_name) for table_name in table_names]
+    
+    successful_emissions = []
+    skipped_emissions = []
+    failed_emissions = []
+    for table_name, (status, error) in zip(table_names, outcomes):
+        emission_tables.inc(outcome=status)
+        if status == 'success':
+            successful_emissions.append(table_name)
+        elif status == 'skipped':
+            skipped_emissions.append(table_name)
+        elif status == 'failed':
+            failed_emissions.append(error)
+    
+    # Tables that went through (or were already up to date) no longer need their dead letters
+    delivered = successful_emissions + skipped_emissions
+    if settings.get('workspace') and delivered:
+        dead_letter_queue.remove(
+            settings['workspace'], [(settings['catalog'], settings['schema'], table_name) for table_name in delivered]
+        )
+    return successful_emissions, skipped_emissions, failed_emissions
+
+def emission_response(successful_emissions, skipped_emissions, failed_emissions):
+    message = f'Emitted {len(successful_emissions)} tables successfully'
+    if skipped_emissions:
+        message += f', skipped {len(skipped_emissions)} unchanged'
+    
+    return {
+        'success': len(successful_emissions) + len(skipped_emissions) > 0,
+        'message': message,
+        'successful': successful_emissions,
+        'skipped': skipped_emissions,
+        'skipped_count': len(skipped_emissions),
+        'failed': failed_emissions
+    }
+
+def run_emission_job(settings, on_result, is_cancelled):
+    """Runner for background emission jobs: one run_emission() pass, as an /emit_to_datahub response"""
+    return emission_response(*run_emission(settings, on_result=on_result, is_cancelled=is_cancelled))
+
 @app.route('/emit_to_datahub', methods=['POST'])
 def emit_to_datahub():
     try:
-        data = request.json
-        table_names = data.get('tables', [])
-        
-        if not table_names:
-            return jsonify({'success': False, 'message': 'No tables selected'})
-        
-        if not selected_catalog or not selected_schema:
-            return jsonify({
-                'success': False, 
-                'message': 'Catalog and schema must be selected before emitting'
-            })
-        
-        # Get combined metadata
-        combined_metadata = {}
-        
-        # Add manual metadata
-        for table_key, table_data in current_metadata.items():
-            combined_metadata[table_key] = table_data
-        
-        # Add uploaded metadata
-        for table_key, table_data in uploaded_metadata.items():
-            if table_key not in combined_metadata:
-                combined_metadata[table_key] = table_data
-            else:
-                # Merge columns
-                if 'columns' not in combined_metadata[table_key]:
-                    combined_metadata[table_key]['columns'] = {}
-                combined_metadata[table_key]['columns'].update(table_data['columns'])
-        
-        logger.info(f"Combined metadata keys: {list(combined_metadata.keys())}")
-        logger.info(f"Selected schema: {selected_schema}, Selected catalog: {selected_catalog}")
-        logger.info(f"Tables to emit: {table_names}")
-        
-        try:
-            emitter = DatahubRestEmitter(gms_server=DATAHUB_GMS)
-        except Exception as e:
-            logger.error(f"Failed to create DataHub emitter: {str(e)}")
-            return jsonify({
-                'success': False, 
-                'message': f'Failed to connect to DataHub: {str(e)}'
-            })
-        
-        successful_emissions = []
-        failed_emissions = []
+        settings, error_response = prepare_emission(request.json)
+        if error_response:
+            return jsonify(error_response)
         
-        for table_name in table_names:
-            try:
-                # Get table summary with proper parameters
-                table_summary = trino_connector.get_table_summary(selected_catalog, selected_schema, table_name)
-                if not table_summary:
-                    # Check if we have metadata for this table even if it's not in Trino
-                    table_key = f"{selected_schema}.{table_name}"
-                    if table_key in combined_metadata and combined_metadata[table_key].get('columns'):
-                        logger.warning(f"Table {table_name} not found in Trino but has metadata - creating basic schema")
-                        # Create a basic table summary from metadata
-                        table_summary = {
-                            'table_name': table_name,
-                            'columns': []
-                        }
-                        # Create columns from metadata
-                        for col_name, col_data in combined_metadata[table_key]['columns'].items():
-                            table_summary['columns'].append({
-                                'name': col_name,
-                                'type': col_data.get('data_type', 'string')
-                            })
-                    else:
-                        failed_emissions.append(f"{table_name}: Table not found in Trino and no metadata available")
-                        continue
-                
-                # Create field schemas
-                field_schemas = []
-                table_key = f"{selected_schema}.{table_name}"
-                table_metadata = combined_metadata.get(table_key, {})
-                
-                logger.info(f"Processing table: {table_name}, table_key: {table_key}")
-                logger.info(f"Found metadata for table: {table_key in combined_metadata}")
-                if table_key in combined_metadata:
-                    logger.info(f"Metadata columns: {list(table_metadata.get('columns', {}).keys())}")
-                
-                # Get column metadata if available
-                column_metadata = {}
-                if 'columns' in table_metadata:
-                    column_metadata = table_metadata['columns']
-                
-                for column_info in table_summary['columns']:
-                    field_schema = create_field_schema(column_info, column_metadata)
-                    field_schemas.append(field_schema)
-                
-                # Get table description and metadata
-                table_description = f"Table `{table_name}` from Trino catalog {selected_catalog}.{selected_schema}"
-                table_info = {}
-                
-                if table_metadata and 'table_info' in table_metadata:
-                    table_info = table_metadata['table_info']
-                    if table_info.get('description'):
-                        table_description = table_info['description']
-                
-                # Build dataset snapshot
-                dataset_urn = f"urn:li:dataset:(urn:li:dataPlatform:{PLATFORM},{selected_catalog}.{selected_schema}.{table_name},{ENV})"
-                now = datetime.datetime.now()
-                
-                # Create aspects list
-                aspects = []
-                
-                # Add dataset properties (keep description clean)
-                aspects.append(DatasetPropertiesClass(description=table_description))
-                
-                # Add schema metadata
-                aspects.append(SchemaMetadataClass(
-                    schemaName=f"{table_name}_schema",
-                    platform=f"urn:li:dataPlatform:{PLATFORM}",
-                    version=0,
-                    created=AuditStampClass(time=int(now.timestamp() * 1000), actor=OWNER_URN),
-                    lastModified=AuditStampClass(time=int(now.timestamp() * 1000), actor=OWNER_URN),
-                    hash="",
-                    platformSchema=OtherSchemaClass(rawSchema=""),
-                    fields=field_schemas,
-                ))
-                
-                # Add ownership if owner is specified
-                if table_info.get('owner'):
-                    try:
-                        owner_urn = f"urn:li:corpuser:{table_info['owner'].lower().replace(' ', '_')}"
-                        aspects.append(OwnershipClass(
-                            owners=[
-                                OwnerClass(
-                                    owner=owner_urn,
-                                    type=OwnershipTypeClass.DATAOWNER,
-                                    source=None
-                                )
-                            ],
-                            lastModified=AuditStampClass(time=int(now.timestamp() * 1000), actor=OWNER_URN)
-                        ))
-                        logger.info(f"Added owner {table_info['owner']} for table {table_name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to add owner for {table_name}: {str(e)}")
-                
-                # Add proper DataHub domain if specified
-                if table_info.get('domain'):
-                    try:
-                        clean_domain = table_info['domain'].lower().replace(' ', '_').replace('-', '_')
-                        domain_urn = f"urn:li:domain:{clean_domain}"
-                        
-                        # Validate domain URN
-                        if clean_domain and len(clean_domain) > 0:
-                            aspects.append(DomainsClass(domains=[domain_urn]))
-                            logger.info(f"Added domain {table_info['domain']} ({domain_urn}) for table {table_name}")
-                        else:
-                            logger.warning(f"Invalid domain name for {table_name}: {table_info['domain']}")
-                    except Exception as e:
-                        logger.warning(f"Failed to add domain for {table_name}: {str(e)}")
-                
-                # Add proper DataHub tags if specified
-                tags_to_add = []
-                
-                # Add table tag
-                if table_info.get('tag'):
-                    table_tag = table_info['tag'].lower().replace(' ', '_').replace('-', '_')
-                    table_tag_urn = f"urn:li:tag:{table_tag}"
-                    tags_to_add.append(TagAssociationClass(tag=table_tag_urn))
-                
-                # Add column tags (collect all unique column tags)
-                if 'columns' in table_metadata:
-                    column_tags = set()
-                    for col_name, col_data in table_metadata['columns'].items():
-                        if col_data.get('tag'):
-                            column_tags.add(col_data['tag'])
-                    
-                    for tag in column_tags:
-                        clean_tag = tag.lower().replace(' ', '_').replace('-', '_')
-                        tag_urn = f"urn:li:tag:{clean_tag}"
-                        tags_to_add.append(TagAssociationClass(tag=tag_urn))
-                
-                if tags_to_add:
-                    try:
-                        # Validate tag URNs before creating GlobalTagsClass
-                        valid_tags = []
-                        for tag_assoc in tags_to_add:
-                            if tag_assoc.tag and tag_assoc.tag.startswith('urn:li:tag:'):
-                                valid_tags.append(tag_assoc)
-                            else:
-                                logger.warning(f"Invalid tag URN: {tag_assoc.tag}")
-                        
-                        if valid_tags:
-                            aspects.append(GlobalTagsClass(tags=valid_tags))
-                            tag_names = [tag.tag.split(':')[-1] for tag in valid_tags]
-                            logger.info(f"Added tags {tag_names} for table {table_name}")
-                    except Exception as e:
-                        logger.warning(f"Failed to add tags for {table_name}: {str(e)}")
-                
-                snapshot = DatasetSnapshotClass(
-                    urn=dataset_urn,
-                    aspects=aspects
-                )
-                
-                mce = MetadataChangeEventClass(proposedSnapshot=snapshot)
-                
-                # Debug: Log the MCE structure
-                logger.info(f"Emitting MCE for {table_name} with {len(aspects)} aspects")
-                
-                # Emit to DataHub
-                try:
-                    emitter.emit_mce(mce)
-                    successful_emissions.append(table_name)
-                    logger.info(f"Successfully emitted metadata for {table_name}")
-                except Exception as emit_error:
-                    error_msg = f"{table_name}: DataHub emission failed - {str(emit_error)}"
-                    failed_emissions.append(error_msg)
-                    logger.error(f"DataHub emission failed for {table_name}: {str(emit_error)}")
-                    logger.error(f"MCE structure: {type(mce)}")
-                    continue
-                
-            except Exception as e:
-                error_msg = f"{table_name}: Metadata preparation failed - {str(e)}"
-                failed_emissions.append(error_msg)
-                logger.error(f"Failed to prepare metadata for {table_name}: {str(e)}")
-                logger.error(f"Exception type: {type(e)}")
-                import traceback
-                logger.error(f"Traceback: {traceback.format_exc()}")
+        return jsonify(emission_response(*run_emission(settings)))
+    
+    except Exception as e:
+        logger.error(f"Error emitting to DataHub: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/start_emission_job', methods=['POST'])
+def start_emission_job():
+    """Start emission in the background and return a job ID to poll"""
+    try:
+        settings, error_response = prepare_emission(request.json)
+        if error_response:
+            return jsonify(error_response)
         
+        job = submit_emission_job(settings, get_session_state().session_id, run_emission_job)
+        logger.info(f"Started emission job {job.job_id} for {len(settings['table_names'])} tables")
         return jsonify({
-            'success': len(successful_emissions) > 0,
-            'message': f'Emitted {len(successful_emissions)} tables successfully',
-            'successful': successful_emissions,
-            'failed': failed_emissions
+            'success': True,
+            'message': f"Emission started for {len(settings['table_names'])} tables",
+            'job_id': job.job_id
         })
+    except Exception as e:
+        logger.error(f"Error starting emission job: {str(e)}")
+        return jsonify({'success': False, 'message': str(e)})
+
+@app.route('/get_emission_job/<job_id>')
+def get_emission_job(job_id):
+    job = find_emission_job(job_id, get_session_state().session_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Emission job not found'})
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+@app.route('/cancel_emission_job/<job_id>', methods=['POST'])
+def cancel_emission_job(job_id):
+    job = find_emission_job(job_id, get_session_state().session_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Emission job not found'})
+    if job.finished:
+        return jsonify({'success': False, 'message': f'Emission job already {job.status}'})
+    
+    job.cancel()
+    logger.info(f"Cancellation requested for emission job {job_id}")
+    return jsonify({'success': True, 'message': 'Cancellation requested - tables already in flight will finish'})
+
+def replay_dead_letters(workspace, emitter, urns=None):
+    """Re-send dead-lettered items exactly as they were built, without querying Trino.
+
+    Returns (successful table names, failure messages); tables that fail again stay queued.
+    """
+    entries = dead_letter_queue.entries(workspace, urns, with_items=True)
     
+    def replay(entry):
+        key = (entry['catalog'], entry['schema'], entry['table_name'])
+        unsent, emit_error = send_to_gms(emitter, entry['items'])
+        if emit_error:
+            logger.error(f"Retry of {entry['urn']} failed: {str(emit_error)}")
+            dead_letter_queue.add(workspace, *key, entry['urn'], entry['mode'], unsent,
+                                  entry['content_hash'], entry['aspect_hashes'], str(emit_error))
+            return 'failed', f"{entry['table_name']}: DataHub emission failed - {str(emit_error)}"
+        record_emission(entry['urn'], entry['content_hash'], entry['aspect_hashes'])
+        dead_letter_queue.remove(workspace, [key])
+        return 'success', None
+    
+    if EMIT_CONCURRENT and len(entries) > 1:
+        max_workers = min(len(entries), EMIT_GMS_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='replay') as executor:
+            outcomes = list(executor.map(replay, entries))
+    else:
+        outcomes = [replay(entry) for entry in entries]
+    
+    successful = [entry['table_name'] for entry, (status, _) in zip(entries, outcomes) if status == 'success']
+    failed = [error for status, error in outcomes if status == 'failed']
+    for status, _ in outcomes:
+        emission_tables.inc(outcome=status)
+    return successful, failed
+
+@app.route('/get_failed_emissions')
+def get_failed_emissions():
+    """Tables of this session whose emission is waiting in the dead-letter queue"""
+    entries = dead_letter_queue.entries(get_session_state().session_id)
+    return jsonify({'success': True, 'failed': entries, 'count': len(entries)})
+
+@app.route('/retry_failed_emissions', methods=['POST'])
+def retry_failed_emissions():
+    """Replay this session's dead-lettered emissions (all, or the given URNs)"""
+    try:
+        data = request.get_json(silent=True) or {}
+        workspace = get_session_state().session_id
+        if not dead_letter_queue.count(workspace):
+            return jsonify({'success': False, 'message': 'No failed emissions to retry'})
+        
+        emitter = datahub_rest_emitter.DatahubRestEmitter(gms_server=DATAHUB_GMS)
+        successful, failed = replay_dead_letters(workspace, emitter, data.get('urns'))
+        response = emission_response(successful, [], failed)
+        response['message'] = f'Retried {len(successful) + len(failed)} failed tables: {len(successful)} emitted'
+        response['remaining'] = dead_letter_queue.count(workspace)
+        logger.info(f"Dead-letter replay: {len(successful)} emitted, {len(failed)} still failing")
+        return jsonify(response)
     except Exception as e:
-        logger.error(f"Error emitting to DataHub: {str(e)}")
+        logger.error(f"Error retrying failed emissions: {str(e)}")
         return jsonify({'success': False, 'message': str(e)})
 
+@app.route('/clear_failed_emissions', methods=['POST'])
+def clear_failed_emissions():
+    """Discard this session's dead-lettered emissions (all, or the given URNs)"""
+    data = request.get_json(silent=True) or {}
+    removed = dead_letter_queue.clear(get_session_state().session_id, data.get('urns'))
+    return jsonify({'success': True, 'message': f'Discarded {removed} failed emissions'})
+
+def create_app():
+    """Create the uploads directory and open the SQLite stores; returns the Flask app.
+    
+    Importing this module has no side effects on disk, so benchmarks and tests can
+    point the *_PATH settings elsewhere first. Calling it again is a no-op. run.py and
+    `python app.py` call it; a WSGI server can load `app:create_app()`.
+    """
+    global metadata_store, emission_ledger, dead_letter_queue
+    if metadata_store is None:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
+        metadata_store = MetadataStore(os.path.join(base_dir, METADATA_DB_PATH))
+        emission_ledger = EmissionLedger(os.path.join(base_dir, EMISSION_LEDGER_PATH))
+        dead_letter_queue = DeadLetterQueue(os.path.join(base_dir, DEAD_LETTER_PATH))
+    return app
+
 if __name__ == '__main__':
+    create_app()
+    start_module_preload()
+    start_catalog_crawler()
     app.run(debug=FLASK_DEBUG, host=FLASK_HOST, port=FLASK_PORT)
\ No newline at end of file
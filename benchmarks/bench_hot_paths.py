@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hot paths against a fake Trino and a stub DataHub GMS (fully offline)
+
+Runs load_tables (names only and with columns), upload_metadata (fresh,
+unchanged re-upload and chunked), auto_discover_from_csv and emit_to_datahub (MCE and MCP)
+through the Flask app for each data size, and reports latency, throughput and
+peak Python memory (tracemalloc). Sizes are TABLESxCOLUMNS per schema; the
+uploaded CSV covers every schema, emission covers up to --emit-limit tables.
+Each timed run starts with a cold metadata cache.
+
+Use --json to save the results and --compare to diff against a saved run, so
+regressions show up release to release.
+
+Usage:
+    python benchmarks/bench_hot_paths.py --sizes 100x10 1000x20 --trino-latency-ms 2
+    python benchmarks/bench_hot_paths.py --json results.json --compare baseline.json
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from fakes import FakeTrino, StubGMS  # noqa: E402
+
+CSV_COLUMNS = [
+    'SchemaName', 'Domain', 'OwnerName', 'TableName', 'TableDescription',
+    'TableTag', 'ColumnName', 'ColumnDescription', 'ColumnTag', 'ColumnDataType'
+]
+
+
+def configure_environment(work_dir, gms_url):
+    """Offline settings so app.py can be imported without a .env file; state goes to work_dir"""
+    for key, value in {
+        'TRINO_HOST': 'localhost', 'TRINO_PORT': '8080', 'TRINO_USER': 'benchmark',
+        'DATAHUB_PLATFORM': 'trino', 'DATAHUB_PLATFORM_INSTANCE': 'benchmark', 'DATAHUB_ENV': 'DEV',
+        'DATAHUB_OWNER_URN': 'urn:li:corpuser:benchmark', 'FLASK_HOST': '127.0.0.1',
+        'FLASK_PORT': '5000', 'FLASK_DEBUG': 'false', 'SECRET_KEY': 'benchmark',
+        'MAX_CONTENT_LENGTH': '1073741824',
+    }.items():
+        os.environ.setdefault(key, value)
+    # Never let a real .env point the benchmark at live services or persistent state
+    os.environ.update({
+        'DATAHUB_GMS': gms_url,
+        'UPLOAD_FOLDER': os.path.join(work_dir, 'uploads'),
+        'EMISSION_LEDGER_PATH': os.path.join(work_dir, 'emission_ledger.db'),
+        'METADATA_DB_PATH': os.path.join(work_dir, 'metadata_store.db'),
+        'DEAD_LETTER_PATH': os.path.join(work_dir, 'dead_letters.db'),
+    })
+
+
+def parse_size(text):
+    tables, _, columns = text.lower().partition('x')
+    return int(tables), int(columns)
+
+
+def generate_csv(trino, seed=42):
+    """Metadata CSV describing every column of the fake catalog"""
+    rng = random.Random(seed)
+    tags = ['PII', 'Financial', 'Business', '']
+    buffer = io.StringIO()
+    buffer.write(','.join(CSV_COLUMNS) + '\n')
+    for schema in trino.schema_names:
+        for table in trino.table_names:
+            table_description = f"{table} in {schema}" if rng.random() < 0.8 else ''
+            for column, data_type in trino.columns:
+                buffer.write(','.join([
+                    schema, rng.choice(['Finance', 'Sales', '']), rng.choice(['Data Team', '']),
+                    table, table_description, rng.choice(tags),
+                    column, f"{column} of {table}", rng.choice(tags), data_type.split('(')[0],
+                ]) + '\n')
+    return buffer.getvalue().encode()
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(path, size, items, unit, func, repeat, setup=None, check=None):
+    """Time func `repeat` times, then run it once more under tracemalloc for the peak"""
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+        if check:
+            check(result)
+
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    median = statistics.median(timings)
+    return {
+        'path': path,
+        'size': size,
+        'items': items,
+        'unit': unit,
+        'median_s': round(median, 6),
+        'min_s': round(min(timings), 6),
+        'max_s': round(max(timings), 6),
+        'throughput': round(items / median, 2) if median else None,
+        'peak_mb': round(peak / 1024 / 1024, 2)
+    }
+
+
+def expect_success(response):
+    payload = response.get_json()
+    if response.status_code != 200 or not payload.get('success'):
+        raise RuntimeError(f"Request failed ({response.status_code}): {payload}")
+    return payload
+
+
+def run_size(app_module, gms, args, tables, columns):
+    import trino_catalog
+
+    size = f"{tables}x{columns}"
+    trino = FakeTrino(args.schemas, tables, columns, latency=args.trino_latency_ms / 1000)
+    trino_catalog.connect = trino.connect
+    app_module.trino_pool.clear()
+    app_module.metadata_cache.invalidate()
+
+    flask_app = app_module.app
+    client = flask_app.test_client()
+    expect_success(client.post('/load_catalogs'))
+    expect_success(client.post('/load_schemas', json={'catalog': trino.catalog}))
+    with client.session_transaction() as flask_session:
+        workspace = flask_session['session_id']
+    schema = trino.schema_names[0]
+
+    def cold_cache():
+        app_module.metadata_cache.invalidate()
+
+    results = []
+
+    def load_tables(include_columns):
+        return lambda: expect_success(client.post(
+            '/load_tables', json={'schema': schema, 'include_columns': include_columns}
+        ))
+
+    results.append(measure('load_tables', size, tables, 'tables', load_tables(False), args.repeat, setup=cold_cache))
+    results.append(measure('load_tables+columns', size, tables, 'tables', load_tables(True), args.repeat,
+                           setup=cold_cache))
+
+    csv_bytes = generate_csv(trino)
+    rows = args.schemas * tables * columns
+
+    def upload():
+        return expect_success(client.post(
+            '/upload_metadata', data={'file': (io.BytesIO(csv_bytes), 'benchmark.csv')},
+            content_type='multipart/form-data'
+        ))
+
+    results.append(measure('upload_metadata', size, rows, 'rows', upload, args.repeat,
+                           setup=lambda: app_module.metadata_store.clear(workspace)))
+    results.append(measure('upload_metadata (unchanged)', size, rows, 'rows', upload, args.repeat))
+
+    def chunked_upload():
+        upload = expect_success(client.post(
+            '/start_metadata_upload', json={'filename': 'benchmark.csv', 'size': len(csv_bytes)}
+        ))['upload']
+        part_size = upload['part_size']
+        for index in range(upload['part_count']):
+            expect_success(client.post(
+                f"/upload_metadata_part/{upload['upload_id']}/{index}",
+                data=csv_bytes[index * part_size:(index + 1) * part_size]
+            ))
+        return expect_success(client.post(f"/complete_metadata_upload/{upload['upload_id']}"))
+
+    results.append(measure('upload_metadata (chunked)', size, rows, 'rows', chunked_upload, args.repeat,
+                           setup=lambda: app_module.metadata_store.clear(workspace)))
+
+    import pandas as pd
+    _, discovered_schemas, discovered_tables = app_module.build_uploaded_metadata(pd.read_csv(io.BytesIO(csv_bytes)))
+
+    def auto_discover():
+        state = app_module.SessionState('benchmark-auto-discover')
+        with flask_app.test_request_context():
+            return app_module.auto_discover_from_csv(state, discovered_schemas, discovered_tables)
+
+    def check_discovery(result):
+        if result['errors'] or not result['tables_loaded']:
+            raise RuntimeError(f"auto_discover_from_csv failed: {result['errors']}")
+
+    results.append(measure('auto_discover_from_csv', size, len(discovered_tables), 'tables', auto_discover,
+                           args.repeat, setup=cold_cache, check=check_discovery))
+
+    emit_tables = trino.table_names[:args.emit_limit]
+    for mode in args.emit_modes:
+        def emit(mode=mode):
+            return expect_success(client.post(
+                '/emit_to_datahub', json={'tables': emit_tables, 'force': True, 'mode': mode}
+            ))
+
+        def reset_emission():
+            cold_cache()
+            gms.reset()
+
+        def check_emission(payload, mode=mode):
+            recorded = gms.recorded()
+            received = recorded['mces'] if mode == 'mce' else recorded['mcps']
+            if payload['failed'] or len(payload['successful']) != len(emit_tables) or not received:
+                raise RuntimeError(f"Emission failed: {payload['failed'][:3]} (GMS recorded {recorded})")
+
+        results.append(measure(f'emit_to_datahub ({mode})', size, len(emit_tables), 'tables', emit, args.repeat,
+                               setup=reset_emission, check=check_emission))
+
+    app_module.trino_pool.clear()
+    return results
+
+
+def print_results(results, baseline=None):
+    baseline_times = {(r['path'], r['size']): r['median_s'] for r in (baseline or {}).get('results', [])}
+    header = f"{'path':<28} {'size':>10} {'items':>8} {'median (s)':>11} {'min (s)':>9} {'throughput':>16} {'peak MB':>9}"
+    if baseline_times:
+        header += f" {'vs baseline':>12}"
+    print(header)
+    for r in results:
+        line = (f"{r['path']:<28} {r['size']:>10} {r['items']:>8} {r['median_s']:>11.4f} {r['min_s']:>9.4f} "
+                f"{r['throughput']:>10.1f} {r['unit'] + '/s':<5} {r['peak_mb']:>9.2f}")
+        previous = baseline_times.get((r['path'], r['size']))
+        if previous:
+            line += f" {previous / r['median_s']:>11.2f}x"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=['100x10', '500x20', '2000x20'],
+                        help='TABLESxCOLUMNS per schema')
+    parser.add_argument('--schemas', type=int, default=2)
+    parser.add_argument('--trino-latency-ms', type=float, default=1.0, help='Added to every fake Trino query')
+    parser.add_argument('--gms-latency-ms', type=float, default=1.0, help='Added to every stub GMS ingest request')
+    parser.add_argument('--emit-limit', type=int, default=200, help='Maximum tables per emission run')
+    parser.add_argument('--emit-modes', nargs='+', choices=['mce', 'mcp'], default=['mce', 'mcp'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Results file from an earlier run to compare medians against')
+    args = parser.parse_args()
+    sizes = [parse_size(size) for size in args.sizes]
+    output_path = os.path.abspath(args.json) if args.json else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix='datahub-bench-') as work_dir, \
+            StubGMS(latency=args.gms_latency_ms / 1000) as gms:
+        configure_environment(work_dir, gms.url)
+        # app.py logs to datahub_app.log in the working directory
+        original_dir = os.getcwd()
+        os.chdir(work_dir)
+        try:
+            import app as app_module
+            app_module.create_app()
+            logging.disable(logging.WARNING)
+
+            results = []
+            for tables, columns in sizes:
+                results.extend(run_size(app_module, gms, args, tables, columns))
+        finally:
+            os.chdir(original_dir)
+
+    print_results(results, baseline)
+    if output_path:
+        report = {
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'compare')},
+            'results': results
+        }
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Benchmark: startup cost of the app, from `python -X importtime` data (fully offline)
+
+Starts a fresh interpreter --repeat times. Each one imports app.py under
+-X importtime, opens the stores with create_app() and serves the index page
+through the Flask test client, then
+imports the lazily loaded modules (pandas, the Trino client, the DataHub
+SDK) the way the first upload or emission would. The report has the median
+time of each step and the packages app.py imports at startup, ranked by
+cumulative import time.
+
+Use --json to save the results and --compare to diff against a saved run, so
+startup regressions (a heavy import creeping back onto the startup path) show
+up release to release.
+
+Usage:
+    python benchmarks/bench_startup.py --repeat 5 --top 15
+    python benchmarks/bench_startup.py --json startup.json --compare baseline.json
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from bench_hot_paths import configure_environment, git_revision  # noqa: E402
+
+# Runs in the child interpreter; stdout carries one JSON line, stderr the importtime data
+CHILD_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {repo_dir!r})
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.create_app().test_client().get('/')
+assert response.status_code == 200, response.status_code
+served = time.perf_counter()
+loaded_at_startup = [module.name for module in app.LAZY_MODULES if module.module is not None]
+app.preload_modules()
+preloaded = time.perf_counter()
+print(json.dumps({{
+    'import_app_s': imported - started,
+    'first_page_s': served - imported,
+    'preload_s': preloaded - served,
+    'loaded_at_startup': loaded_at_startup,
+    'modules': {{module.name: module.load_seconds for module in app.LAZY_MODULES}}
+}}))
+"""
+
+
+def parse_importtime(stderr, root='app'):
+    """(root cumulative seconds, {direct import: cumulative seconds}) from -X importtime output.
+
+    Lines look like `import time:  self [us] | cumulative | <indent>name`; children
+    are printed before their parent, so root's imports are the lines between the
+    previous top-level import and root itself.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((depth, name.strip(), int(cumulative) / 1e6))
+
+    for index, (depth, name, cumulative) in enumerate(entries):
+        if depth == 0 and name == root:
+            break
+    else:
+        raise RuntimeError(f"{root} not found in -X importtime output")
+    children = {}
+    for child_depth, child_name, child_cumulative in reversed(entries[:index]):
+        if child_depth == 0:
+            break
+        if child_depth == 1:
+            children[child_name] = child_cumulative
+    return cumulative, children
+
+
+def run_once(work_dir):
+    env = dict(os.environ)
+    command = [sys.executable, '-X', 'importtime', '-c', CHILD_SCRIPT.format(repo_dir=REPO_DIR)]
+    started = time.perf_counter()
+    completed = subprocess.run(command, cwd=work_dir, env=env, capture_output=True, text=True)
+    process_s = time.perf_counter() - started
+    if completed.returncode != 0:
+        raise RuntimeError(f"Child interpreter failed:\n{completed.stderr[-2000:]}")
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    result['process_s'] = process_s
+    result['importtime_app_s'], result['imports'] = parse_importtime(completed.stderr)
+    return result
+
+
+def summarize(runs, top):
+    def median(key):
+        return round(statistics.median(run[key] for run in runs), 6)
+
+    steps = [
+        ('import app (-X importtime)', median('importtime_app_s')),
+        ('import app', median('import_app_s')),
+        ('first page (GET /)', median('first_page_s')),
+        ('preload lazy modules', median('preload_s')),
+        ('process start to exit', median('process_s')),
+    ]
+    imports = {}
+    for run in runs:
+        for name, seconds in run['imports'].items():
+            imports.setdefault(name, []).append(seconds)
+    ranked = sorted(((name, statistics.median(values)) for name, values in imports.items()),
+                    key=lambda item: item[1], reverse=True)
+    lazy = {}
+    for run in runs:
+        for name, seconds in run['modules'].items():
+            if seconds is not None:
+                lazy.setdefault(name, []).append(seconds)
+    return {
+        'results': [{'path': path, 'median_s': seconds} for path, seconds in steps],
+        'startup_imports': [{'module': name, 'median_s': round(seconds, 6)} for name, seconds in ranked[:top]],
+        'lazy_modules': [{'module': name, 'median_s': round(statistics.median(values), 6)}
+                         for name, values in lazy.items()],
+        'loaded_at_startup': sorted({name for run in runs for name in run['loaded_at_startup']})
+    }
+
+
+def print_report(report, baseline=None):
+    baseline_times = {r['path']: r['median_s'] for r in (baseline or {}).get('results', [])}
+    header = f"{'step':<28} {'median (s)':>11}"
+    if baseline_times:
+        header += f" {'vs baseline':>12}"
+    print(header)
+    for r in report['results']:
+        line = f"{r['path']:<28} {r['median_s']:>11.4f}"
+        previous = baseline_times.get(r['path'])
+        if previous:
+            line += f" {previous / r['median_s']:>11.2f}x"
+        print(line)
+
+    print(f"\n{'imported by app.py at startup':<40} {'cumulative (s)':>14}")
+    for entry in report['startup_imports']:
+        print(f"{entry['module']:<40} {entry['median_s']:>14.4f}")
+    print(f"\n{'lazily imported on first use':<40} {'load (s)':>14}")
+    for entry in report['lazy_modules']:
+        print(f"{entry['module']:<40} {entry['median_s']:>14.4f}")
+    if report['loaded_at_startup']:
+        print(f"\nWarning: lazy modules already loaded at startup: {', '.join(report['loaded_at_startup'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--repeat', type=int, default=5, help='Fresh interpreters to start')
+    parser.add_argument('--top', type=int, default=15, help='Startup imports to list')
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Results file from an earlier run to compare medians against')
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.json) if args.json else None
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+
+    with tempfile.TemporaryDirectory(prefix='datahub-startup-') as work_dir:
+        # Nothing listens here; startup must not contact DataHub or Trino
+        configure_environment(work_dir, 'http://127.0.0.1:9')
+        os.environ['PRELOAD_MODULES'] = 'false'
+        os.environ['CRAWLER_ENABLED'] = 'false'
+        runs = [run_once(work_dir) for _ in range(args.repeat)]
+
+    report = summarize(runs, args.top)
+    print_report(report, baseline)
+    if output_path:
+        report.update({
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'settings': {k: v for k, v in vars(args).items() if k not in ('json', 'compare')},
+        })
+        with open(output_path, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {output_path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Offline stand-ins for the services the app talks to, used by the benchmarks.
+
+FakeTrino is a DB-API style connection factory serving synthetic catalogs of
+N schemas x T tables x M columns, with a configurable per-query latency. It
+answers the statements TrinoConnector issues (SHOW CATALOGS/SCHEMAS/TABLES,
+DESCRIBE, information_schema queries and schema fingerprints, SHOW STATS,
+COUNT(*) and SELECT 1).
+
+StubGMS runs a minimal DataHub GMS HTTP server in a child process so its work
+does not show up in the app's timings or tracemalloc peaks. It records every
+MCE and MCP it receives; GET /_recorded returns the counts (and the payloads
+with ?full=1), POST /_reset clears them. POST /_fail?count=N rejects the next
+N ingest requests with a 400 (-1 rejects all of them until reset).
+
+The stub GMS can also be started by hand:
+    python benchmarks/fakes.py gms --port 8080 --latency-ms 5
+"""
+import argparse
+import hashlib
+import json
+import re
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+COLUMN_TYPES = ['varchar', 'bigint', 'double', 'boolean', 'timestamp(3)', 'date', 'decimal(18,2)']
+
+_LITERAL = re.compile(r"'((?:[^']|'')*)'")
+
+
+def _literals(text):
+    return [value.replace("''", "'") for value in _LITERAL.findall(text)]
+
+
+def _predicate(where, column):
+    """Values a WHERE clause restricts `column` to (= or IN), or None when unrestricted"""
+    match = re.search(rf"\b{column}\s*=\s*('(?:[^']|'')*')", where)
+    if match:
+        return set(_literals(match.group(1)))
+    match = re.search(rf"\b{column}\s+IN\s*\(([^)]*)\)", where)
+    if match:
+        return set(_literals(match.group(1)))
+    return None
+
+
+class FakeTrino:
+    """Synthetic Trino catalog: `schemas` schemas of `tables` tables with `columns` columns each"""
+
+    def __init__(self, schemas=4, tables=100, columns=20, latency=0.0, catalog='hive'):
+        self.catalog = catalog
+        self.schema_names = [f"schema_{i}" for i in range(schemas)]
+        self.table_names = [f"table_{i}" for i in range(tables)]
+        self.columns = [(f"column_{i}", COLUMN_TYPES[i % len(COLUMN_TYPES)]) for i in range(columns)]
+        self._schema_set = set(self.schema_names)
+        self._table_set = set(self.table_names)
+        self.latency = latency
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.connections = 0
+
+    def connect(self, **kwargs):
+        """Drop-in for trino.dbapi.connect"""
+        with self._lock:
+            self.connections += 1
+        return FakeConnection(self)
+
+    def reset_counters(self):
+        with self._lock:
+            self.queries = 0
+            self.connections = 0
+
+    def _has_schema(self, schema):
+        return schema in self._schema_set
+
+    def _has_table(self, schema, table):
+        return self._has_schema(schema) and table in self._table_set
+
+    def run(self, query):
+        """Execute one statement and return (column names, rows)"""
+        with self._lock:
+            self.queries += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        statement = ' '.join(query.split())
+        if statement == 'SELECT 1':
+            return ['_col0'], [(1,)]
+        if statement == 'SHOW CATALOGS':
+            return ['Catalog'], [(self.catalog,), ('system',)]
+        if statement.startswith('SHOW SCHEMAS FROM '):
+            return ['Schema'], [(schema,) for schema in self.schema_names + ['information_schema']]
+        if statement.startswith('SHOW TABLES FROM '):
+            schema = statement.rsplit('.', 1)[-1]
+            if not self._has_schema(schema):
+                raise RuntimeError(f"Schema '{schema}' does not exist")
+            return ['Table'], [(table,) for table in self.table_names]
+        if statement.startswith('DESCRIBE '):
+            _, schema, table = statement[len('DESCRIBE '):].split('.')
+            if not self._has_table(schema, table):
+                raise RuntimeError(f"Table '{schema}.{table}' does not exist")
+            return ['Column', 'Type', 'Extra', 'Comment'], [(name, data_type, '', '') for name, data_type in self.columns]
+        if statement.startswith('SHOW STATS FOR '):
+            names = ['column_name', 'data_size', 'distinct_values_count', 'nulls_fraction',
+                     'row_count', 'low_value', 'high_value']
+            rows = [(name, None, None, 0.0, None, None, None) for name, _ in self.columns]
+            return names, rows + [(None, None, None, None, 1000.0, None, None)]
+        if statement.startswith('SELECT COUNT(*) FROM '):
+            return ['_col0'], [(1000,)]
+        if 'information_schema.columns' in statement and ' GROUP BY table_schema' in statement:
+            return self._fingerprints(statement)
+        if 'information_schema.columns' in statement or 'information_schema.tables' in statement:
+            return self._information_schema(statement)
+        raise RuntimeError(f"FakeTrino does not support: {statement}")
+
+    def _fingerprints(self, statement):
+        """Per-schema count(*) and checksum(...) over information_schema.columns"""
+        schemas = _predicate(statement.split(' WHERE ', 1)[1], 'table_schema')
+        digest = hashlib.sha256(repr((self.table_names, self.columns)).encode()).digest()[:8]
+        rows = [(schema, len(self.table_names) * len(self.columns), digest)
+                for schema in self.schema_names if schemas is None or schema in schemas]
+        return ['table_schema', '_col1', '_col2'], rows
+
+    def _information_schema(self, statement):
+        select = statement[len('SELECT '):statement.index(' FROM ')]
+        names = [name.strip() for name in select.split(',')]
+        where = statement.split(' WHERE ', 1)[1] if ' WHERE ' in statement else ''
+        where = where.split(' ORDER BY ', 1)[0]
+        schemas = _predicate(where, 'table_schema')
+        tables = _predicate(where, 'table_name')
+
+        listing_columns = 'information_schema.columns' in statement
+        rows = []
+        for schema in self.schema_names:
+            if schemas is not None and schema not in schemas:
+                continue
+            for table in self.table_names:
+                if tables is not None and table not in tables:
+                    continue
+                if not listing_columns:
+                    values = {'table_schema': schema, 'table_name': table, 'table_type': 'BASE TABLE'}
+                    rows.append(tuple(values[name] for name in names))
+                    continue
+                for position, (column, data_type) in enumerate(self.columns, start=1):
+                    values = {
+                        'table_catalog': self.catalog, 'table_schema': schema, 'table_name': table,
+                        'column_name': column, 'data_type': data_type, 'ordinal_position': position
+                    }
+                    rows.append(tuple(values[name] for name in names))
+        return names, rows
+
+
+class FakeCursor:
+    def __init__(self, trino):
+        self._trino = trino
+        self._rows = []
+        self._offset = 0
+        self.description = None
+
+    def execute(self, query, params=None):
+        names, self._rows = self._trino.run(query)
+        self._offset = 0
+        self.description = [(name, None, None, None, None, None, None) for name in names]
+        return self
+
+    def fetchone(self):
+        if self._offset >= len(self._rows):
+            return None
+        self._offset += 1
+        return self._rows[self._offset - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._offset:self._offset + size]
+        self._offset += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._offset:]
+        self._offset = len(self._rows)
+        return rows
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    def __init__(self, trino):
+        self._trino = trino
+
+    def cursor(self):
+        return FakeCursor(self._trino)
+
+    def close(self):
+        pass
+
+
+class _GMSHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out as separate writes; without this, keep-alive
+    # requests stall on delayed ACKs and the stub dominates emission timings
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        server = self.server
+        if url.path == '/config':
+            self._reply({'noCode': 'true', 'versions': {'acryldata/datahub': {'version': 'v1.0.0'}}})
+        elif url.path == '/_recorded':
+            with server.lock:
+                payload = {
+                    'requests': server.requests,
+                    'bytes': server.bytes_received,
+                    'mces': len(server.mces),
+                    'mcps': len(server.mcps)
+                }
+                if parse_qs(url.query).get('full') == ['1']:
+                    payload['mce_items'] = list(server.mces)
+                    payload['mcp_items'] = list(server.mcps)
+            self._reply(payload)
+        else:
+            self._reply({'message': f'Unknown path {url.path}'}, status=404)
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        action = parse_qs(url.query).get('action', [''])[0]
+        server = self.server
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+        if url.path == '/_reset':
+            with server.lock:
+                server.requests = 0
+                server.bytes_received = 0
+                server.rejections = 0
+                server.mces.clear()
+                server.mcps.clear()
+            self._reply({})
+            return
+        if url.path == '/_fail':
+            with server.lock:
+                server.rejections = int(parse_qs(url.query).get('count', ['-1'])[0])
+            self._reply({})
+            return
+
+        if server.latency:
+            time.sleep(server.latency)
+        payload = json.loads(body or b'{}')
+        if url.path == '/entities' and action == 'ingest':
+            items, target = [payload['entity']], server.mces
+        elif url.path == '/aspects' and action == 'ingestProposal':
+            items, target = [payload['proposal']], server.mcps
+        elif url.path == '/aspects' and action == 'ingestProposalBatch':
+            items, target = payload['proposals'], server.mcps
+        else:
+            self._reply({'message': f'Unsupported endpoint {url.path}?action={action}'}, status=404)
+            return
+        with server.lock:
+            rejected = server.rejections != 0
+            if server.rejections > 0:
+                server.rejections -= 1
+            if not rejected:
+                server.requests += 1
+                server.bytes_received += len(body)
+                target.extend(items)
+        if rejected:
+            self._reply({'message': 'Rejected by StubGMS'}, status=400)
+            return
+        self._reply({'value': None})
+
+
+def serve_gms(port=0, latency=0.0, announce=False):
+    server = ThreadingHTTPServer(('127.0.0.1', port), _GMSHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.latency = latency
+    server.requests = 0
+    server.bytes_received = 0
+    server.rejections = 0
+    server.mces = []
+    server.mcps = []
+    if announce:
+        print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+class StubGMS:
+    """Stub DataHub GMS running in a child process; use as a context manager"""
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.process = None
+        self.url = None
+
+    def start(self):
+        self.process = subprocess.Popen(
+            [sys.executable, __file__, 'gms', '--port', '0', '--latency-ms', str(self.latency * 1000)],
+            stdout=subprocess.PIPE, text=True
+        )
+        port = int(self.process.stdout.readline())
+        self.url = f"http://127.0.0.1:{port}"
+        return self
+
+    def stop(self):
+        if self.process:
+            self.process.terminate()
+            self.process.wait()
+            self.process.stdout.close()
+            self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _request(self, path, method='GET'):
+        request = urllib.request.Request(self.url + path, method=method, data=b'' if method == 'POST' else None)
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def recorded(self, full=False):
+        return self._request('/_recorded?full=1' if full else '/_recorded')
+
+    def reset(self):
+        self._request('/_reset', method='POST')
+
+    def fail(self, count=-1):
+        """Reject the next `count` ingest requests with a 400; -1 rejects all of them until reset()"""
+        self._request(f'/_fail?count={count}', method='POST')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('service', choices=['gms'])
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    args = parser.parse_args()
+    serve_gms(args.port, args.latency_ms / 1000, announce=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,11 @@ TRINO_HOST = os.getenv('TRINO_HOST')
 TRINO_PORT = int(os.getenv('TRINO_PORT'))
 TRINO_USER = os.getenv('TRINO_USER')
 
+# Trino Connection Pool Configuration
+TRINO_POOL_SIZE = int(os.getenv('TRINO_POOL_SIZE', '8'))  # Idle connections kept per catalog/schema
+TRINO_POOL_IDLE_TIMEOUT = int(os.getenv('TRINO_POOL_IDLE_TIMEOUT', '300'))  # Seconds
+TRINO_POOL_HEALTH_CHECK_INTERVAL = int(os.getenv('TRINO_POOL_HEALTH_CHECK_INTERVAL', '60'))  # Seconds
+
 # DataHub Configuration
 DATAHUB_GMS = os.getenv('DATAHUB_GMS')
 PLATFORM = os.getenv('DATAHUB_PLATFORM')
@@ -21,9 +26,64 @@ FLASK_PORT = int(os.getenv('FLASK_PORT'))
 FLASK_DEBUG = os.getenv('FLASK_DEBUG').lower() == 'true'
 SECRET_KEY = os.getenv('SECRET_KEY')
 
+# HTTP Response Configuration
+COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))  # Bytes; smaller responses are sent uncompressed
+COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', '6'))  # gzip/deflate level 1-9, 0 disables compression
+
 # Upload Configuration
 UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER')
 MAX_CONTENT_LENGTH = int(os.getenv('MAX_CONTENT_LENGTH'))  # 16MB
+UPLOAD_PART_SIZE = int(os.getenv('UPLOAD_PART_SIZE', '8388608'))  # Bytes per part of a chunked upload, 8MB; capped at MAX_CONTENT_LENGTH
+UPLOAD_CSV_CHUNK_ROWS = int(os.getenv('UPLOAD_CSV_CHUNK_ROWS', '50000'))  # CSV rows parsed and stored at a time
+UPLOAD_EXPIRY = int(os.getenv('UPLOAD_EXPIRY', '86400'))  # Seconds an unfinished chunked upload can still be resumed
+UPLOAD_MAX_SIZE = int(os.getenv('UPLOAD_MAX_SIZE', '1073741824'))  # Largest chunked upload in bytes (1GB)
+UPLOAD_MAX_OPEN = int(os.getenv('UPLOAD_MAX_OPEN', '3'))  # Unfinished chunked uploads a session can have at once
+VALIDATION_MAX_ISSUES = int(os.getenv('VALIDATION_MAX_ISSUES', '1000'))  # Row-level issues listed in a CSV validation report
+
+# Trino Metadata Loading Configuration
+COLUMN_FETCH_BATCH_SIZE = int(os.getenv('COLUMN_FETCH_BATCH_SIZE', '5000'))  # Rows per fetchmany() call
+TRINO_COUNT_TIMEOUT = int(os.getenv('TRINO_COUNT_TIMEOUT', '30'))  # Deadline in seconds for exact COUNT(*) queries
+DISCOVERY_SCHEMAS_PER_QUERY = int(os.getenv('DISCOVERY_SCHEMAS_PER_QUERY', '10'))  # Schemas per information_schema query during CSV discovery
+DISCOVERY_CONCURRENCY = int(os.getenv('DISCOVERY_CONCURRENCY', '4'))  # Parallel information_schema queries during CSV discovery
+
+# Metadata Cache Configuration
+METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', '300'))  # Seconds, 0 disables caching
+METADATA_CACHE_MAX_ENTRIES = int(os.getenv('METADATA_CACHE_MAX_ENTRIES', '10000'))
+
+# Background Catalog Crawler Configuration (pre-warms the metadata cache)
+CRAWLER_ENABLED = os.getenv('CRAWLER_ENABLED', 'false').lower() == 'true'
+CRAWLER_CATALOGS = [c.strip() for c in os.getenv('CRAWLER_CATALOGS', '').split(',') if c.strip()]  # Empty crawls every catalog but system
+CRAWLER_SCHEMAS = [s.strip() for s in os.getenv('CRAWLER_SCHEMAS', '').split(',') if s.strip()]  # Empty crawls every schema
+CRAWLER_INTERVAL = int(os.getenv('CRAWLER_INTERVAL', '600'))  # Seconds between crawl passes
+CRAWLER_CONCURRENCY = int(os.getenv('CRAWLER_CONCURRENCY', '2'))  # Parallel information_schema queries per catalog
+
+# Startup Configuration
+PRELOAD_MODULES = os.getenv('PRELOAD_MODULES', 'false').lower() == 'true'  # Import pandas/trino/DataHub in the background at startup instead of on first use
+
+# DataHub Emission Configuration
+EMIT_CONCURRENT = os.getenv('EMIT_CONCURRENT', 'true').lower() == 'true'
+EMIT_TRINO_CONCURRENCY = int(os.getenv('EMIT_TRINO_CONCURRENCY', '4'))  # Parallel Trino fetches
+EMIT_GMS_CONCURRENCY = int(os.getenv('EMIT_GMS_CONCURRENCY', '4'))  # Parallel GMS posts
+EMISSION_LEDGER_PATH = os.getenv('EMISSION_LEDGER_PATH', 'emission_ledger.db')  # Relative to the app directory
+EMIT_MODE = os.getenv('EMIT_MODE', 'mce')  # 'mce' (full snapshot) or 'mcp' (changed aspects only)
+EMIT_JOB_RETENTION = int(os.getenv('EMIT_JOB_RETENTION', '3600'))  # Seconds finished emission jobs stay pollable
+
+# Retry Configuration (transient Trino and DataHub GMS errors)
+RETRY_ATTEMPTS = int(os.getenv('RETRY_ATTEMPTS', '3'))  # Tries per query/post, 1 disables retrying
+RETRY_BACKOFF = float(os.getenv('RETRY_BACKOFF', '0.5'))  # Base delay in seconds, doubled per retry with full jitter
+RETRY_MAX_BACKOFF = float(os.getenv('RETRY_MAX_BACKOFF', '10'))  # Cap on a single retry delay in seconds
+DEAD_LETTER_PATH = os.getenv('DEAD_LETTER_PATH', 'dead_letters.db')  # SQLite file, relative to the app directory
+
+# Metadata Store Configuration
+METADATA_DB_PATH = os.getenv('METADATA_DB_PATH', 'metadata_store.db')  # SQLite file, relative to the app directory
+METADATA_WRITE_BATCH_SIZE = int(os.getenv('METADATA_WRITE_BATCH_SIZE', '5000'))  # Rows per executemany() batch
+METADATA_WORKSPACE_TTL = int(os.getenv('METADATA_WORKSPACE_TTL', '2592000'))  # Seconds a session's stored metadata outlives its last use (30 days), 0 keeps it forever
+METADATA_SWEEP_INTERVAL = int(os.getenv('METADATA_SWEEP_INTERVAL', '3600'))  # Seconds between sweeps for expired sessions' metadata
+
+# Session State Configuration
+SESSION_IDLE_TIMEOUT = int(os.getenv('SESSION_IDLE_TIMEOUT', '3600'))  # Seconds before an idle session's state is dropped
+SESSION_MAX_COUNT = int(os.getenv('SESSION_MAX_COUNT', '100'))  # Least recently used sessions are evicted beyond this
+SESSION_MAX_BYTES = int(os.getenv('SESSION_MAX_BYTES', '52428800'))  # Approximate per-session state limit, 50MB
 
 # Predefined tags
 TABLE_TAGS = [
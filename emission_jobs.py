@@ -0,0 +1,118 @@
+"""
+Background emission jobs for DataHub Metadata Manager
+"""
+import logging
+import threading
+import time
+import uuid
+
+from config import EMIT_JOB_RETENTION
+
+logger = logging.getLogger(__name__)
+
+class EmissionJob:
+    """Background emission run with per-table progress tracking and cancellation.
+    
+    runner(settings, on_result, is_cancelled) does the emitting and returns the
+    response body stored as the job result.
+    """
+    
+    def __init__(self, settings, workspace, runner):
+        self.job_id = uuid.uuid4().hex
+        self.settings = settings
+        self.runner = runner
+        self.workspace = workspace  # session that started the job; only it may see or cancel it
+        self.table_status = {table_name: 'pending' for table_name in settings['table_names']}
+        self.errors = {}
+        self.status = 'queued'
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+        self._cancel_event = threading.Event()
+    
+    def cancel(self):
+        self._cancel_event.set()
+    
+    def record(self, table_name, status, error):
+        with self._lock:
+            self.table_status[table_name] = status
+            if error:
+                self.errors[table_name] = error
+    
+    def run(self):
+        self.started_at = time.time()
+        self.status = 'running'
+        try:
+            self.result = self.runner(self.settings, self.record, self._cancel_event.is_set)
+            self.status = 'cancelled' if self._cancel_event.is_set() else 'completed'
+        except Exception as e:
+            logger.error(f"Emission job {self.job_id} failed: {str(e)}")
+            self.result = {'success': False, 'message': str(e)}
+            self.status = 'failed'
+        finally:
+            self.finished_at = time.time()
+            # The emitter and metadata snapshot are no longer needed once the run is over
+            self.settings = {'table_names': self.settings['table_names']}
+            logger.info(f"Emission job {self.job_id} finished with status {self.status}")
+    
+    @property
+    def finished(self):
+        return self.finished_at is not None
+    
+    def to_dict(self):
+        with self._lock:
+            table_status = dict(self.table_status)
+            errors = dict(self.errors)
+        
+        counts = {'pending': 0, 'success': 0, 'skipped': 0, 'failed': 0, 'cancelled': 0}
+        for status in table_status.values():
+            counts[status] += 1
+        total = len(table_status)
+        processed = counts['success'] + counts['skipped'] + counts['failed']
+        
+        throughput = None
+        eta_seconds = None
+        if self.started_at:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+            if elapsed > 0 and processed:
+                throughput = processed / elapsed
+                if not self.finished:
+                    eta_seconds = round(counts['pending'] / throughput, 1)
+        
+        return {
+            'job_id': self.job_id,
+            'status': self.status,
+            'total': total,
+            'processed': processed,
+            'percent': round(100.0 * (total - counts['pending']) / total, 1) if total else 100.0,
+            'counts': counts,
+            'throughput': round(throughput, 2) if throughput else None,
+            'eta_seconds': eta_seconds,
+            'tables': table_status,
+            'errors': errors,
+            'result': self.result
+        }
+
+emission_jobs = {}
+emission_jobs_lock = threading.Lock()
+
+def submit_emission_job(settings, workspace, runner):
+    job = EmissionJob(settings, workspace, runner)
+    with emission_jobs_lock:
+        # Forget finished jobs nobody polled for a while
+        cutoff = time.time() - EMIT_JOB_RETENTION
+        for job_id in [job_id for job_id, old_job in emission_jobs.items()
+                       if old_job.finished and old_job.finished_at < cutoff]:
+            del emission_jobs[job_id]
+        emission_jobs[job.job_id] = job
+    threading.Thread(target=job.run, name=f"emission-job-{job.job_id[:8]}", daemon=True).start()
+    return job
+
+def find_emission_job(job_id, workspace):
+    """The job with this ID if the given workspace (session) started it, otherwise None"""
+    job = emission_jobs.get(job_id)
+    if job is None or job.workspace != workspace:
+        return None
+    return job
\ No newline at end of file
@@ -0,0 +1,44 @@
+"""
+Lazily imported third-party modules for DataHub Metadata Manager
+"""
+import importlib
+import logging
+import threading
+import time
+
+class LazyModule:
+    """Stands in for a heavy module and imports it on first attribute access.
+    
+    pandas, trino, requests and the DataHub SDK take most of a second to import, and
+    most requests (the index page, session and cache endpoints) never touch them, so
+    they load on first use instead of at startup. Load times are kept for
+    /get_import_stats; preload_modules() imports everything ahead of time.
+    """
+    
+    def __init__(self, name):
+        self.__dict__.update(name=name, module=None, load_seconds=None, _lock=threading.Lock())
+    
+    def load(self):
+        module = self.module
+        if module is None:
+            with self._lock:
+                if self.module is None:
+                    started = time.perf_counter()
+                    self.__dict__['module'] = importlib.import_module(self.name)
+                    self.__dict__['load_seconds'] = time.perf_counter() - started
+                    logging.getLogger(__name__).info(f"Imported {self.name} in {self.load_seconds:.3f}s")
+                module = self.module
+        return module
+    
+    def __getattr__(self, attribute):
+        return getattr(self.load(), attribute)
+
+np = LazyModule('numpy')
+pd = LazyModule('pandas')
+trino_dbapi = LazyModule('trino.dbapi')
+trino_exceptions = LazyModule('trino.exceptions')
+requests_exceptions = LazyModule('requests.exceptions')
+datahub_mcp = LazyModule('datahub.emitter.mcp')
+datahub_rest_emitter = LazyModule('datahub.emitter.rest_emitter')
+schema_classes = LazyModule('datahub.metadata.schema_classes')
+LAZY_MODULES = (np, pd, trino_dbapi, trino_exceptions, requests_exceptions, datahub_mcp, datahub_rest_emitter, schema_classes)
\ No newline at end of file
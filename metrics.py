@@ -0,0 +1,159 @@
+"""
+Prometheus-style metrics for DataHub Metadata Manager
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+PAYLOAD_BUCKETS = (1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+def _format_labels(names, values):
+    if not names:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in values)
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(names, escaped)) + '}'
+
+class Counter:
+    """Monotonic counter, optionally split by labels"""
+    
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> count
+    
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+    
+    def render(self):
+        with self._lock:
+            values = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for key, value in values:
+            lines.append(f"{self.name}{_format_labels(self.label_names, key)} {value}")
+        return lines
+
+class Histogram:
+    """Cumulative-bucket histogram, optionally split by labels"""
+    
+    def __init__(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._values = {}  # label values -> [per-bucket counts, sum, count]
+    
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            if index < len(self.buckets):
+                entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+    
+    @contextmanager
+    def time(self, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+    
+    def render(self):
+        with self._lock:
+            values = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items())
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        names = self.label_names + ('le',)
+        for key, (counts, total, count) in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (bound,))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, key + ('+Inf',))} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, key)} {count}")
+        return lines
+
+class MetricsRegistry:
+    """Process-wide metrics rendered in the Prometheus text exposition format.
+    
+    Counters and histograms are updated on the hot paths; collectors are called at
+    scrape time to report the counters components already keep (cache, pool, sessions).
+    """
+    
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+    
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self._metrics.append(metric)
+        return metric
+    
+    def histogram(self, name, documentation, label_names=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(metric)
+        return metric
+    
+    def collector(self, func):
+        """Register func() -> iterable of (name, type, documentation, value); usable as a decorator"""
+        self._collectors.append(func)
+        return func
+    
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collect in self._collectors:
+            try:
+                samples = list(collect())
+            except Exception as e:
+                logger.warning(f"Metrics collector {collect.__name__} failed: {str(e)}")
+                continue
+            for name, metric_type, documentation, value in samples:
+                lines.extend([f"# HELP {name} {documentation}", f"# TYPE {name} {metric_type}", f"{name} {value}"])
+        return '\n'.join(lines) + '\n'
+
+metrics = MetricsRegistry()
+http_request_latency = metrics.histogram(
+    'http_request_duration_seconds', 'Flask request latency by route', ('route', 'method', 'status'))
+trino_query_latency = metrics.histogram(
+    'trino_query_duration_seconds', 'Trino query latency including result fetch, by query kind', ('kind',))
+trino_query_failures = metrics.counter(
+    'trino_query_failures_total', 'Trino queries that raised, by query kind', ('kind',))
+datahub_emit_latency = metrics.histogram(
+    'datahub_emit_duration_seconds', 'DataHub emitter call latency by method', ('method',))
+datahub_emit_payload_bytes = metrics.histogram(
+    'datahub_emit_payload_bytes', 'Serialized size of a sample of DataHub emitter calls', ('method',), PAYLOAD_BUCKETS)
+datahub_emit_failures = metrics.counter(
+    'datahub_emit_failures_total', 'DataHub emitter calls that raised, by method', ('method',))
+emission_tables = metrics.counter(
+    'emission_tables_total', 'Tables processed by emission runs, by outcome', ('outcome',))
+csv_upload_latency = metrics.histogram(
+    'csv_upload_duration_seconds', 'Metadata CSV upload time by stage (read, transform, validate, store)', ('stage',))
+csv_upload_rows = metrics.histogram(
+    'csv_upload_rows', 'Rows per uploaded metadata CSV', buckets=ROW_BUCKETS)
+
+@contextmanager
+def track_trino_query(kind):
+    """Time a Trino query and its fetch, counting it as failed if it raises"""
+    try:
+        with trino_query_latency.time(kind=kind):
+            yield
+    except Exception:
+        trino_query_failures.inc(kind=kind)
+        raise
\ No newline at end of file
@@ -0,0 +1,58 @@
+"""
+Retries with backoff for transient Trino and DataHub errors
+"""
+import functools
+import logging
+import random
+import time
+
+from config import RETRY_ATTEMPTS, RETRY_BACKOFF, RETRY_MAX_BACKOFF
+from lazy_imports import requests_exceptions, trino_exceptions
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+retries = metrics.counter(
+    'retries_total', 'Trino queries and DataHub emitter calls retried after a transient error', ('operation',))
+
+# A 500 usually means GMS rejected this payload, so sending it again would fail the same way
+TRANSIENT_STATUS_CODES = {429, 502, 503, 504}
+
+@functools.lru_cache(maxsize=None)
+def transient_errors():
+    """Exception classes retried as transient; resolved on first use so the clients load lazily"""
+    return (
+        ConnectionError, TimeoutError, requests_exceptions.ConnectionError, requests_exceptions.Timeout,
+        trino_exceptions.TrinoConnectionError, trino_exceptions.TrinoExternalError,
+        trino_exceptions.Http502Error, trino_exceptions.Http503Error, trino_exceptions.Http504Error
+    )
+
+def is_transient_error(error):
+    """Connection drops, timeouts and 429/502/503/504 responses, including when wrapped by the DataHub client"""
+    seen = set()
+    while error is not None and id(error) not in seen:
+        seen.add(id(error))
+        if isinstance(error, transient_errors()):
+            return True
+        response = getattr(error, 'response', None)
+        if isinstance(error, requests_exceptions.HTTPError) and response is not None and response.status_code in TRANSIENT_STATUS_CODES:
+            return True
+        error = error.__cause__ or error.__context__
+    return False
+
+def call_with_retry(operation, func, attempts=RETRY_ATTEMPTS, on_retry=None):
+    """Call func, retrying transient errors with exponential backoff and full jitter"""
+    attempt = 1
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            if attempt >= attempts or not is_transient_error(e):
+                raise
+            delay = random.uniform(0, min(RETRY_MAX_BACKOFF, RETRY_BACKOFF * 2 ** (attempt - 1)))
+            retries.inc(operation=operation)
+            logger.warning(f"Transient {operation} error (attempt {attempt}/{attempts}), retrying in {delay:.2f}s: {str(e)}")
+            time.sleep(delay)
+            if on_retry:
+                on_retry()
+            attempt += 1
\ No newline at end of file
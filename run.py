@@ -2,7 +2,7 @@
 """
 DataHub Metadata Manager - Main Entry Point
 """
-from app import app
+from app import create_app, start_catalog_crawler, start_module_preload
 from config import FLASK_HOST, FLASK_PORT, FLASK_DEBUG
 
 if __name__ == '__main__':
@@ -17,6 +17,14 @@ if __name__ == '__main__':
     print("   • Session management and data validation")
     print()
     
+    app = create_app()
+    
+    if start_module_preload():
+        print("📦 Preloading pandas, Trino and DataHub libraries in the background")
+    
+    if start_catalog_crawler():
+        print("🕸️  Background catalog crawler is warming the metadata cache")
+    
     app.run(
         debug=FLASK_DEBUG,
         host=FLASK_HOST,
@@ -0,0 +1,926 @@
+"""
+SQLite stores for DataHub Metadata Manager: workspace metadata, the emission ledger
+and the dead-letter queue. Nothing is opened at import time; the app builds the
+stores in create_app().
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+from config import METADATA_WRITE_BATCH_SIZE
+from lazy_imports import datahub_mcp, schema_classes
+
+logger = logging.getLogger(__name__)
+
+def _blank(value):
+    return value is None or value == '' or (isinstance(value, float) and value != value)
+
+def _nan_if_null(value):
+    return float('nan') if value is None else value
+
+def _lookup_id(ids, value):
+    return None if _blank(value) else ids.get(str(value))
+
+def merge_metadata_entries(manual, uploaded):
+    """Merge one table's manual and CSV entries, recording where each field came from.
+    
+    A manual entry's table_info is kept as is, even where a field is empty; the CSV
+    only supplies fields manual entries do not have (domain, owner). Column entries
+    from the CSV replace manual ones.
+    """
+    table_info = {}
+    field_sources = {}
+    for source, entry in (('csv', uploaded), ('manual', manual)):
+        for field, value in ((entry or {}).get('table_info') or {}).items():
+            table_info[field] = value
+            field_sources[field] = source
+    
+    columns = {}
+    column_sources = {}
+    for source, entry in (('manual', manual), ('csv', uploaded)):
+        for col_name, col_data in ((entry or {}).get('columns') or {}).items():
+            columns[col_name] = col_data
+            column_sources[col_name] = source
+    
+    return {
+        'table_info': table_info,
+        'columns': columns,
+        'sources': {
+            'table': 'csv' if manual is None else 'manual',
+            'table_fields': field_sources,
+            'columns': column_sources
+        }
+    }
+
+def _sha256_json(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+class MetadataStore:
+    """SQLite (WAL) store for manual and CSV metadata, partitioned by workspace.
+    
+    Each browser session is a workspace. Tags, owners and domains are normalized into
+    lookup tables, and columns are indexed by (schema, table, column). Writes are
+    batched into one transaction under a lock; reads use a per-thread connection so
+    they never wait on a writer and can be streamed table by table. Every write
+    bumps the workspace version, records which tables it changed or removed, and
+    re-merges those tables into metadata_merged, so reads of the merged view never
+    merge anything themselves.
+    """
+    
+    LOOKUPS = {
+        'tag': ('metadata_tags', 'tag_id'),
+        'domain': ('metadata_domains', 'domain_id'),
+        'owner': ('metadata_owners', 'owner_id'),
+    }
+    TABLE_FIELDS = {
+        'manual': ('schema', 'description', 'tag'),
+        'csv': ('schema', 'domain', 'owner', 'description', 'tag'),
+    }
+    
+    def __init__(self, path, batch_size=METADATA_WRITE_BATCH_SIZE):
+        self.path = path
+        self.batch_size = max(batch_size, 1)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._touched = {}  # workspace -> when touch() last recorded it
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self._lock, self._conn:
+            for table, id_column in self.LOOKUPS.values():
+                self._conn.execute(f"""
+                    CREATE TABLE IF NOT EXISTS {table} (
+                        {id_column} INTEGER PRIMARY KEY,
+                        name TEXT NOT NULL UNIQUE
+                    )
+                """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_tables (
+                    workspace TEXT NOT NULL,
+                    table_key TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    schema_name,
+                    table_name TEXT NOT NULL,
+                    description,
+                    tag_id INTEGER REFERENCES metadata_tags (tag_id),
+                    domain_id INTEGER REFERENCES metadata_domains (domain_id),
+                    owner_id INTEGER REFERENCES metadata_owners (owner_id),
+                    content_hash TEXT,
+                    version INTEGER NOT NULL,
+                    PRIMARY KEY (workspace, table_key, source)
+                )
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_metadata_tables_name
+                ON metadata_tables (workspace, schema_name, table_name)
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_columns (
+                    workspace TEXT NOT NULL,
+                    table_key TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    column_name NOT NULL,
+                    schema_name,
+                    table_name TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    description,
+                    tag_id INTEGER REFERENCES metadata_tags (tag_id),
+                    data_type,
+                    PRIMARY KEY (workspace, table_key, source, column_name)
+                )
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_metadata_columns_name
+                ON metadata_columns (workspace, schema_name, table_name, column_name)
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_metadata_columns_order
+                ON metadata_columns (workspace, table_key, source, position)
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_workspaces (
+                    workspace TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    last_used REAL
+                )
+            """)
+            # Databases created before workspaces expired have no last_used column
+            workspace_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(metadata_workspaces)")}
+            if 'last_used' not in workspace_columns:
+                self._conn.execute("ALTER TABLE metadata_workspaces ADD COLUMN last_used REAL")
+                self._conn.execute("UPDATE metadata_workspaces SET last_used = updated_at")
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_changes (
+                    workspace TEXT NOT NULL,
+                    table_key TEXT NOT NULL,
+                    version INTEGER NOT NULL,
+                    removed INTEGER NOT NULL,
+                    PRIMARY KEY (workspace, table_key)
+                )
+            """)
+            # Chunked CSV uploads are merged here chunk by chunk, then swapped in by commit_staged()
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_upload_tables (
+                    upload_id TEXT NOT NULL,
+                    table_key TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    table_info TEXT NOT NULL,
+                    PRIMARY KEY (upload_id, table_key)
+                )
+            """)
+            self._conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_metadata_upload_tables_seq
+                ON metadata_upload_tables (upload_id, seq)
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_upload_columns (
+                    upload_id TEXT NOT NULL,
+                    table_key TEXT NOT NULL,
+                    column_name NOT NULL,
+                    position INTEGER NOT NULL,
+                    description,
+                    tag,
+                    data_type,
+                    PRIMARY KEY (upload_id, table_key, column_name)
+                )
+            """)
+            # Uploads do not survive a restart, so neither does anything they staged
+            self._conn.execute("DELETE FROM metadata_upload_columns")
+            self._conn.execute("DELETE FROM metadata_upload_tables")
+            # Merged manual + CSV entry of every table, stored as the JSON the API returns
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS metadata_merged (
+                    workspace TEXT NOT NULL,
+                    table_key TEXT NOT NULL,
+                    table_info TEXT NOT NULL,
+                    columns TEXT NOT NULL,
+                    sources TEXT NOT NULL,
+                    PRIMARY KEY (workspace, table_key)
+                )
+            """)
+            # Databases created before the merged view was stored need it built once
+            missing = {}
+            for workspace, table_key in self._conn.execute("""
+                SELECT DISTINCT t.workspace, t.table_key FROM metadata_tables t
+                WHERE NOT EXISTS (SELECT 1 FROM metadata_merged m
+                                  WHERE m.workspace = t.workspace AND m.table_key = t.table_key)
+            """).fetchall():
+                missing.setdefault(workspace, []).append(table_key)
+            for workspace, table_keys in missing.items():
+                self._refresh_merged(workspace, table_keys)
+    
+    def _reader(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+        return conn
+    
+    def _bump_version(self, workspace):
+        now = time.time()
+        self._conn.execute("""
+            INSERT INTO metadata_workspaces (workspace, version, updated_at, last_used) VALUES (?, ?, ?, ?)
+            ON CONFLICT (workspace) DO UPDATE SET
+                version = version + 1, updated_at = excluded.updated_at, last_used = excluded.last_used
+        """, (workspace, self._initial_version(now), now, now))
+        return self._conn.execute(
+            "SELECT version FROM metadata_workspaces WHERE workspace = ?", (workspace,)
+        ).fetchone()[0]
+    
+    @staticmethod
+    def _initial_version(now):
+        # Versions of a new workspace start from the clock, so a session whose workspace
+        # expired never reuses versions (and ETags) from before
+        return int(now)
+    
+    def touch(self, workspace, interval=60):
+        """Record that a workspace is in use, at most once per interval seconds, so it does not expire"""
+        now = time.time()
+        if now - self._touched.get(workspace, 0) < interval:
+            return
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO metadata_workspaces (workspace, version, updated_at, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT (workspace) DO UPDATE SET last_used = excluded.last_used
+            """, (workspace, self._initial_version(now), now, now))
+        self._touched[workspace] = now
+    
+    def expire_workspaces(self, cutoff):
+        """Delete every row of workspaces last used before cutoff, one transaction each; returns their IDs"""
+        with self._lock:
+            candidates = [row[0] for row in self._conn.execute(
+                "SELECT workspace FROM metadata_workspaces WHERE last_used < ?", (cutoff,)
+            )]
+        expired = []
+        for workspace in candidates:
+            with self._lock, self._conn:
+                # Skip workspaces that were used again since they were selected
+                if not self._conn.execute(
+                    "DELETE FROM metadata_workspaces WHERE workspace = ? AND last_used < ?", (workspace, cutoff)
+                ).rowcount:
+                    continue
+                for table in ('metadata_columns', 'metadata_tables', 'metadata_changes', 'metadata_merged'):
+                    self._conn.execute(f"DELETE FROM {table} WHERE workspace = ?", (workspace,))
+            self._touched.pop(workspace, None)
+            expired.append(workspace)
+        if expired:
+            logger.info(f"Deleted the stored metadata of {len(expired)} expired workspaces")
+        return expired
+    
+    def _lookup_ids(self, kind, values):
+        """Map tag/domain/owner names to their lookup-table IDs, adding new names"""
+        table, id_column = self.LOOKUPS[kind]
+        names = {str(value) for value in values if not _blank(value)}
+        if not names:
+            return {}
+        self._conn.executemany(f"INSERT OR IGNORE INTO {table} (name) VALUES (?)", [(name,) for name in names])
+        ids = {}
+        names = list(names)
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            ids.update(self._conn.execute(
+                f"SELECT name, {id_column} FROM {table} WHERE name IN ({placeholders})", chunk
+            ).fetchall())
+        return ids
+    
+    def _record_changes(self, workspace, table_keys, version):
+        self._conn.executemany("""
+            INSERT INTO metadata_changes (workspace, table_key, version, removed)
+            VALUES (?, ?, ?, NOT EXISTS (SELECT 1 FROM metadata_tables WHERE workspace = ? AND table_key = ?))
+            ON CONFLICT (workspace, table_key) DO UPDATE SET version = excluded.version, removed = excluded.removed
+        """, [(workspace, table_key, version, workspace, table_key) for table_key in table_keys])
+    
+    def _refresh_merged(self, workspace, table_keys):
+        """Re-merge the given tables into metadata_merged; call inside the write transaction"""
+        table_keys = list(dict.fromkeys(table_keys))
+        rows = []
+        for start in range(0, len(table_keys), 500):
+            chunk = table_keys[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            for table_key, entries in self._iter_entries(
+                self._conn, f"{{alias}}.workspace = ? AND {{alias}}.table_key IN ({placeholders})", [workspace] + chunk
+            ):
+                merged = merge_metadata_entries(entries['manual'], entries['csv'])
+                rows.append((
+                    workspace, table_key, json.dumps(merged['table_info'], default=str),
+                    json.dumps(merged['columns'], default=str), json.dumps(merged['sources'])
+                ))
+        self._conn.executemany(
+            "DELETE FROM metadata_merged WHERE workspace = ? AND table_key = ?",
+            [(workspace, table_key) for table_key in table_keys]
+        )
+        self._insert_batches("""
+            INSERT INTO metadata_merged (workspace, table_key, table_info, columns, sources)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+    
+    def _delete_tables(self, workspace, source, table_keys):
+        rows = [(workspace, table_key, source) for table_key in table_keys]
+        self._conn.executemany(
+            "DELETE FROM metadata_columns WHERE workspace = ? AND table_key = ? AND source = ?", rows
+        )
+        self._conn.executemany(
+            "DELETE FROM metadata_tables WHERE workspace = ? AND table_key = ? AND source = ?", rows
+        )
+    
+    def _insert_batches(self, query, rows):
+        for start in range(0, len(rows), self.batch_size):
+            self._conn.executemany(query, rows[start:start + self.batch_size])
+    
+    @staticmethod
+    def _split_key(table_key, schema_name=None):
+        if '.' in str(table_key):
+            key_schema, table_name = str(table_key).split('.', 1)
+            return (key_schema if schema_name is None else schema_name), table_name
+        return (schema_name or ''), str(table_key)
+    
+    def _insert_uploaded(self, workspace, entries, hashes, version):
+        """Insert CSV table and column rows for (table_key, entry) pairs"""
+        infos = [entry.get('table_info') or {} for _, entry in entries]
+        all_columns = [entry.get('columns') or {} for _, entry in entries]
+        tag_ids = self._lookup_ids(
+            'tag', [info.get('tag') for info in infos] +
+            [col.get('tag') for columns in all_columns for col in columns.values()]
+        )
+        domain_ids = self._lookup_ids('domain', [info.get('domain') for info in infos])
+        owner_ids = self._lookup_ids('owner', [info.get('owner') for info in infos])
+        
+        table_rows = []
+        column_rows = []
+        for (table_key, entry), info, columns in zip(entries, infos, all_columns):
+            schema_name, table_name = self._split_key(table_key, info.get('schema'))
+            table_rows.append((
+                workspace, table_key, 'csv', schema_name, table_name, info.get('description'),
+                _lookup_id(tag_ids, info.get('tag')), _lookup_id(domain_ids, info.get('domain')),
+                _lookup_id(owner_ids, info.get('owner')), hashes[table_key], version
+            ))
+            for position, (column_name, col) in enumerate(columns.items()):
+                column_rows.append((
+                    workspace, table_key, 'csv', column_name, schema_name, table_name, position,
+                    col.get('description'), _lookup_id(tag_ids, col.get('tag')), col.get('data_type')
+                ))
+        
+        self._insert_batches("""
+            INSERT INTO metadata_tables (workspace, table_key, source, schema_name, table_name, description,
+                                         tag_id, domain_id, owner_id, content_hash, version)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, table_rows)
+        self._insert_batches("""
+            INSERT INTO metadata_columns (workspace, table_key, source, column_name, schema_name, table_name,
+                                          position, description, tag_id, data_type)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, column_rows)
+    
+    def set_uploaded(self, workspace, uploaded):
+        """Replace a workspace's CSV metadata, rewriting only tables whose content changed"""
+        hashes = {
+            table_key: _sha256_json(entry)
+            for table_key, entry in uploaded.items()
+        }
+        with self._lock, self._conn:
+            existing = dict(self._conn.execute(
+                "SELECT table_key, content_hash FROM metadata_tables WHERE workspace = ? AND source = 'csv'",
+                (workspace,)
+            ).fetchall())
+            changed = [table_key for table_key, content_hash in hashes.items() if existing.get(table_key) != content_hash]
+            removed = [table_key for table_key in existing if table_key not in hashes]
+            if not changed and not removed:
+                return 0
+            
+            version = self._bump_version(workspace)
+            self._delete_tables(workspace, 'csv', [table_key for table_key in changed + removed if table_key in existing])
+            
+            self._insert_uploaded(workspace, [(table_key, uploaded[table_key]) for table_key in changed], hashes, version)
+            self._record_changes(workspace, changed + removed, version)
+            self._refresh_merged(workspace, changed + removed)
+        
+        logger.info(f"Stored CSV metadata for workspace {workspace[:8]}: {len(changed)} tables changed, {len(removed)} removed")
+        return len(changed) + len(removed)
+    
+    def stage_uploaded(self, upload_id, uploaded):
+        """Merge one parsed chunk of a CSV upload into its staging rows.
+
+        A table keeps the table_info of the first chunk it appears in and a column the
+        entry of the last, in order of first appearance, which is what
+        build_uploaded_metadata() gives for the whole file at once.
+        """
+        with self._lock, self._conn:
+            seq, position = self._conn.execute("""
+                SELECT (SELECT COALESCE(MAX(seq) + 1, 0) FROM metadata_upload_tables WHERE upload_id = ?),
+                       (SELECT COALESCE(MAX(position) + 1, 0) FROM metadata_upload_columns WHERE upload_id = ?)
+            """, (upload_id, upload_id)).fetchone()
+            table_rows = []
+            column_rows = []
+            for table_key, entry in uploaded.items():
+                table_rows.append((upload_id, table_key, seq, json.dumps(entry['table_info'], default=str)))
+                seq += 1
+                for column_name, col in entry['columns'].items():
+                    column_rows.append((upload_id, table_key, column_name, position,
+                                        col['description'], col['tag'], col['data_type']))
+                    position += 1
+            self._insert_batches("""
+                INSERT OR IGNORE INTO metadata_upload_tables (upload_id, table_key, seq, table_info)
+                VALUES (?, ?, ?, ?)
+            """, table_rows)
+            self._insert_batches("""
+                INSERT INTO metadata_upload_columns (upload_id, table_key, column_name, position,
+                                                     description, tag, data_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (upload_id, table_key, column_name) DO UPDATE SET
+                    description = excluded.description, tag = excluded.tag, data_type = excluded.data_type
+            """, column_rows)
+    
+    def commit_staged(self, workspace, upload_id, page_size=500):
+        """set_uploaded() for a staged upload, page_size tables per transaction.
+        
+        The store lock is released between pages so other sessions' writes are not
+        held up by a large upload. Tables missing from the upload are removed last.
+        """
+        changed_count = 0
+        last_seq = -1
+        while True:
+            with self._lock, self._conn:
+                rows = self._conn.execute("""
+                    SELECT seq, table_key, table_info FROM metadata_upload_tables
+                    WHERE upload_id = ? AND seq > ? ORDER BY seq LIMIT ?
+                """, (upload_id, last_seq, page_size)).fetchall()
+                if not rows:
+                    break
+                last_seq = rows[-1][0]
+                changed_count += self._commit_staged_page(workspace, upload_id, rows)
+        
+        with self._lock, self._conn:
+            removed = [row[0] for row in self._conn.execute("""
+                SELECT table_key FROM metadata_tables
+                WHERE workspace = ? AND source = 'csv'
+                  AND table_key NOT IN (SELECT table_key FROM metadata_upload_tables WHERE upload_id = ?)
+            """, (workspace, upload_id))]
+            if removed:
+                version = self._bump_version(workspace)
+                self._delete_tables(workspace, 'csv', removed)
+                self._record_changes(workspace, removed, version)
+                self._refresh_merged(workspace, removed)
+            self._delete_staged(upload_id)
+        
+        logger.info(f"Stored CSV metadata for workspace {workspace[:8]}: {changed_count} tables changed, {len(removed)} removed")
+        return changed_count + len(removed)
+    
+    def _commit_staged_page(self, workspace, upload_id, rows):
+        """Rewrite the changed tables among one page of staged (seq, table_key, table_info) rows"""
+        entries = {table_key: {'table_info': json.loads(table_info), 'columns': {}} for _, table_key, table_info in rows}
+        placeholders = ', '.join('?' * len(entries))
+        for table_key, column_name, description, tag, data_type in self._conn.execute(f"""
+            SELECT table_key, column_name, description, tag, data_type FROM metadata_upload_columns
+            WHERE upload_id = ? AND table_key IN ({placeholders}) ORDER BY table_key, position
+        """, (upload_id, *entries)):
+            # SQLite stores the NaN of an empty CSV cell as NULL; restoring it keeps
+            # content hashes identical to set_uploaded() for the same file
+            entries[table_key]['columns'][column_name] = {
+                'description': _nan_if_null(description),
+                'tag': _nan_if_null(tag),
+                'data_type': _nan_if_null(data_type)
+            }
+        
+        hashes = {table_key: _sha256_json(entry) for table_key, entry in entries.items()}
+        existing = dict(self._conn.execute(f"""
+            SELECT table_key, content_hash FROM metadata_tables
+            WHERE workspace = ? AND source = 'csv' AND table_key IN ({placeholders})
+        """, (workspace, *entries)).fetchall())
+        changed = [table_key for table_key, content_hash in hashes.items() if existing.get(table_key) != content_hash]
+        if not changed:
+            return 0
+        version = self._bump_version(workspace)
+        self._delete_tables(workspace, 'csv', [table_key for table_key in changed if table_key in existing])
+        self._insert_uploaded(workspace, [(table_key, entries[table_key]) for table_key in changed], hashes, version)
+        self._record_changes(workspace, changed, version)
+        self._refresh_merged(workspace, changed)
+        return len(changed)
+    
+    def _delete_staged(self, upload_id):
+        self._conn.execute("DELETE FROM metadata_upload_columns WHERE upload_id = ?", (upload_id,))
+        self._conn.execute("DELETE FROM metadata_upload_tables WHERE upload_id = ?", (upload_id,))
+    
+    def discard_staged(self, upload_id):
+        with self._lock, self._conn:
+            self._delete_staged(upload_id)
+    
+    def add_manual_column(self, workspace, table_key, table_info, column_name, column_entry):
+        """Add or replace one manual column; table_info is only used for a table's first entry"""
+        self.apply_manual_edits(workspace, [{
+            'op': 'set', 'table_key': table_key, 'schema': table_info.get('schema'), 'column': column_name,
+            'table': {'description': table_info.get('description'), 'tag': table_info.get('tag')},
+            'column_values': column_entry
+        }])
+    
+    def apply_manual_edits(self, workspace, edits):
+        """Apply set/patch/delete edits to a workspace's manual metadata in one transaction.
+        
+        Each edit is a dict with op, table_key, schema, column (None for a table-level
+        edit) and the table and column_values fields to write. Edits run in order and
+        are all-or-nothing: the returned list holds an error message (or None) per
+        edit, and if any is set nothing is kept and the version does not change.
+        """
+        with self._lock, self._conn:
+            version = self._bump_version(workspace)
+            tag_ids = self._lookup_ids(
+                'tag', [edit['table'].get('tag') for edit in edits] + [edit['column_values'].get('tag') for edit in edits]
+            )
+            errors = [self._apply_manual_edit(workspace, edit, tag_ids, version) for edit in edits]
+            if any(errors):
+                self._conn.rollback()
+                return errors
+            table_keys = list(dict.fromkeys(edit['table_key'] for edit in edits))
+            self._record_changes(workspace, table_keys, version)
+            self._refresh_merged(workspace, table_keys)
+        logger.info(f"Applied {len(edits)} manual metadata edits for workspace {workspace[:8]}")
+        return errors
+    
+    @staticmethod
+    def _manual_assignments(values, tag_ids):
+        """SQL column -> value for the fields present in an edit's table or column values"""
+        assignments = {}
+        for field, value in values.items():
+            if field == 'tag':
+                assignments['tag_id'] = _lookup_id(tag_ids, value)
+            else:
+                assignments[field] = value
+        return assignments
+    
+    def _update_manual(self, table, assignments, where, params):
+        if assignments:
+            self._conn.execute(
+                f"UPDATE {table} SET {', '.join(f'{name} = ?' for name in assignments)} WHERE {where}",
+                (*assignments.values(), *params)
+            )
+    
+    def _apply_manual_edit(self, workspace, edit, tag_ids, version):
+        """Run one edit inside apply_manual_edits(); returns an error message or None"""
+        op, table_key, column_name = edit['op'], edit['table_key'], edit['column']
+        schema_name, table_name = self._split_key(table_key, edit['schema'] or None)
+        table_where = "workspace = ? AND table_key = ? AND source = 'manual'"
+        column_where = table_where + " AND column_name = ?"
+        has_table = self._conn.execute(
+            f"SELECT 1 FROM metadata_tables WHERE {table_where}", (workspace, table_key)
+        ).fetchone() is not None
+        has_column = column_name is not None and self._conn.execute(
+            f"SELECT 1 FROM metadata_columns WHERE {column_where}", (workspace, table_key, column_name)
+        ).fetchone() is not None
+        
+        if op == 'delete':
+            if column_name is None and not has_table:
+                return f"No manual metadata for table {table_key}"
+            if column_name is not None and not has_column:
+                return f"No manual metadata for column {column_name} of {table_key}"
+            if column_name is None:
+                self._delete_tables(workspace, 'manual', [table_key])
+                return None
+            self._conn.execute(f"DELETE FROM metadata_columns WHERE {column_where}", (workspace, table_key, column_name))
+        elif op == 'patch':
+            if not (has_column if column_name is not None else has_table):
+                target = table_key if column_name is None else f"column {column_name} of {table_key}"
+                return f"No manual metadata for {target} to patch"
+            self._update_manual('metadata_tables', self._manual_assignments(edit['table'], tag_ids),
+                                table_where, (workspace, table_key))
+            if column_name is not None:
+                self._update_manual('metadata_columns', self._manual_assignments(edit['column_values'], tag_ids),
+                                    column_where, (workspace, table_key, column_name))
+        elif column_name is None or not has_table:
+            # A column 'set' only describes the table when it creates the table's entry
+            table_values = edit['table']
+            self._conn.execute("""
+                INSERT INTO metadata_tables (workspace, table_key, source, schema_name, table_name,
+                                             description, tag_id, version)
+                VALUES (?, ?, 'manual', ?, ?, ?, ?, ?)
+                ON CONFLICT (workspace, table_key, source) DO UPDATE SET
+                    description = excluded.description, tag_id = excluded.tag_id
+            """, (workspace, table_key, edit['schema'], table_name, table_values.get('description'),
+                  _lookup_id(tag_ids, table_values.get('tag')), version))
+        
+        if op == 'set' and column_name is not None:
+            column_values = edit['column_values']
+            self._conn.execute("""
+                INSERT INTO metadata_columns (workspace, table_key, source, column_name, schema_name, table_name,
+                                              position, description, tag_id, data_type)
+                VALUES (?, ?, 'manual', ?, ?, ?,
+                        (SELECT COALESCE(MAX(position) + 1, 0) FROM metadata_columns
+                         WHERE workspace = ? AND table_key = ? AND source = 'manual'),
+                        ?, ?, ?)
+                ON CONFLICT (workspace, table_key, source, column_name) DO UPDATE SET
+                    description = excluded.description, tag_id = excluded.tag_id, data_type = excluded.data_type
+            """, (workspace, table_key, column_name, schema_name, table_name, workspace, table_key,
+                  column_values.get('description'), _lookup_id(tag_ids, column_values.get('tag')),
+                  column_values.get('data_type')))
+        self._conn.execute(f"UPDATE metadata_tables SET version = ? WHERE {table_where}", (version, workspace, table_key))
+        return None
+    
+    def clear(self, workspace):
+        with self._lock, self._conn:
+            table_keys = [row[0] for row in self._conn.execute(
+                "SELECT DISTINCT table_key FROM metadata_tables WHERE workspace = ?", (workspace,)
+            )]
+            if not table_keys:
+                return 0
+            version = self._bump_version(workspace)
+            self._conn.execute("DELETE FROM metadata_columns WHERE workspace = ?", (workspace,))
+            self._conn.execute("DELETE FROM metadata_tables WHERE workspace = ?", (workspace,))
+            self._conn.execute("DELETE FROM metadata_merged WHERE workspace = ?", (workspace,))
+            self._record_changes(workspace, table_keys, version)
+        logger.info(f"Cleared metadata for workspace {workspace[:8]} ({len(table_keys)} tables)")
+        return len(table_keys)
+    
+    def version(self, workspace):
+        row = self._reader().execute(
+            "SELECT version FROM metadata_workspaces WHERE workspace = ?", (workspace,)
+        ).fetchone()
+        return row[0] if row else 0
+    
+    def changes_since(self, workspace, version):
+        """(changed, removed) table keys after the given version"""
+        changed = []
+        removed = []
+        for table_key, is_removed in self._reader().execute(
+            "SELECT table_key, removed FROM metadata_changes WHERE workspace = ? AND version > ? ORDER BY table_key",
+            (workspace, version)
+        ):
+            (removed if is_removed else changed).append(table_key)
+        return changed, removed
+    
+    def table_keys(self, workspace, schema_name=None, source=None):
+        where, params = "workspace = ?", [workspace]
+        if schema_name is not None:
+            where, params = where + " AND schema_name = ?", params + [schema_name]
+        if source is not None:
+            where, params = where + " AND source = ?", params + [source]
+        return [row[0] for row in self._reader().execute(
+            f"SELECT DISTINCT table_key FROM metadata_tables WHERE {where} ORDER BY table_key", params
+        )]
+    
+    def _iter_entries(self, conn, where, params):
+        """Merge-join table and column rows (both ordered by table_key) into per-table entries"""
+        table_rows = conn.execute(f"""
+            SELECT t.table_key, t.source, t.schema_name, t.description, tg.name, d.name, o.name
+            FROM metadata_tables t
+            LEFT JOIN metadata_tags tg ON tg.tag_id = t.tag_id
+            LEFT JOIN metadata_domains d ON d.domain_id = t.domain_id
+            LEFT JOIN metadata_owners o ON o.owner_id = t.owner_id
+            WHERE {where.format(alias='t')}
+            ORDER BY t.table_key, t.source
+        """, params)
+        column_rows = conn.cursor().execute(f"""
+            SELECT c.table_key, c.source, c.column_name, c.description, tg.name, c.data_type
+            FROM metadata_columns c
+            LEFT JOIN metadata_tags tg ON tg.tag_id = c.tag_id
+            WHERE {where.format(alias='c')}
+            ORDER BY c.table_key, c.source, c.position
+        """, params)
+        
+        pending_column = next(column_rows, None)
+        current_key = None
+        entries = None
+        for table_key, source, schema_name, description, tag, domain, owner in table_rows:
+            if table_key != current_key:
+                if entries is not None:
+                    yield current_key, entries
+                current_key = table_key
+                entries = {'manual': None, 'csv': None}
+            values = {'schema': schema_name, 'description': description or '', 'tag': tag or '',
+                      'domain': domain or '', 'owner': owner or ''}
+            entries[source] = {
+                'table_info': {field: values[field] for field in self.TABLE_FIELDS[source]},
+                'columns': {}
+            }
+            # Columns of this table come before any later table's in the column cursor
+            while pending_column is not None and pending_column[0] <= table_key:
+                column_key, column_source, column_name, column_description, column_tag, data_type = pending_column
+                if column_key == table_key and entries[column_source] is not None:
+                    entries[column_source]['columns'][column_name] = {
+                        'description': '' if column_description is None else column_description,
+                        'tag': column_tag or '',
+                        'data_type': data_type or 'string'
+                    }
+                elif column_key == table_key:
+                    break  # the other source's table row has not been read yet
+                pending_column = next(column_rows, None)
+        if entries is not None:
+            yield current_key, entries
+    
+    def iter_tables(self, workspace, table_keys=None):
+        """Yield (table_key, {'manual': ..., 'csv': ...}) one table at a time, streaming from disk"""
+        conn = self._reader()
+        if table_keys is None:
+            yield from self._iter_entries(conn, "{alias}.workspace = ?", (workspace,))
+            return
+        for table_key in table_keys:
+            yield from self._iter_entries(conn, "{alias}.workspace = ? AND {alias}.table_key = ?", (workspace, table_key))
+    
+    def iter_merged(self, workspace, table_keys=None, with_sources=False):
+        """Yield (table_key, merged entry as JSON text) from the stored merged view"""
+        conn = self._reader()
+        if table_keys is None:
+            batches = [("", [])]
+        else:
+            table_keys = list(table_keys)
+            batches = [
+                (f" AND table_key IN ({', '.join('?' * len(chunk))})", chunk)
+                for chunk in (table_keys[start:start + 500] for start in range(0, len(table_keys), 500))
+            ]
+        for where, params in batches:
+            for table_key, table_info, columns, sources in conn.execute(f"""
+                SELECT table_key, table_info, columns, sources FROM metadata_merged
+                WHERE workspace = ?{where} ORDER BY table_key
+            """, [workspace] + params):
+                text = '{"table_info": ' + table_info + ', "columns": ' + columns
+                if with_sources:
+                    text += ', "sources": ' + sources
+                yield table_key, text + '}'
+    
+    def get_combined(self, workspace, table_keys):
+        """Merged table_info/columns for the given tables"""
+        return {
+            table_key: json.loads(text)
+            for table_key, text in self.iter_merged(workspace, table_keys)
+        }
+    
+    def stats(self, workspace=None):
+        conn = self._reader()
+        where, params = ("WHERE workspace = ?", (workspace,)) if workspace else ("", ())
+        return {
+            'tables': conn.execute(f"SELECT COUNT(DISTINCT table_key) FROM metadata_tables {where}", params).fetchone()[0],
+            'columns': conn.execute(f"SELECT COUNT(*) FROM metadata_columns {where}", params).fetchone()[0],
+            'version': self.version(workspace) if workspace else None
+        }
+
+class EmissionLedger:
+    """SQLite record of the content hash last emitted for each dataset URN"""
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS emissions (
+                    urn TEXT PRIMARY KEY,
+                    content_hash TEXT NOT NULL,
+                    emitted_at REAL NOT NULL
+                )
+            """)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS emitted_aspects (
+                    urn TEXT NOT NULL,
+                    aspect_name TEXT NOT NULL,
+                    content_hash TEXT NOT NULL,
+                    emitted_at REAL NOT NULL,
+                    PRIMARY KEY (urn, aspect_name)
+                )
+            """)
+    
+    def get_hash(self, urn):
+        with self._lock:
+            row = self._conn.execute("SELECT content_hash FROM emissions WHERE urn = ?", (urn,)).fetchone()
+        return row[0] if row else None
+    
+    def record(self, urn, content_hash):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO emissions (urn, content_hash, emitted_at) VALUES (?, ?, ?)",
+                (urn, content_hash, time.time())
+            )
+    
+    def get_aspect_hashes(self, urn):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT aspect_name, content_hash FROM emitted_aspects WHERE urn = ?", (urn,)
+            ).fetchall()
+        return dict(rows)
+    
+    def record_aspects(self, urn, aspect_hashes):
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO emitted_aspects (urn, aspect_name, content_hash, emitted_at) VALUES (?, ?, ?, ?)",
+                [(urn, aspect_name, content_hash, now) for aspect_name, content_hash in aspect_hashes.items()]
+            )
+    
+    def forget(self, urn=None):
+        """Drop one URN (or every URN) so the next run re-emits it"""
+        with self._lock, self._conn:
+            if urn is None:
+                self._conn.execute("DELETE FROM emissions")
+                self._conn.execute("DELETE FROM emitted_aspects")
+            else:
+                self._conn.execute("DELETE FROM emissions WHERE urn = ?", (urn,))
+                self._conn.execute("DELETE FROM emitted_aspects WHERE urn = ?", (urn,))
+
+def _gms_items_to_obj(items):
+    return [[kind, payload.to_obj() if kind == 'mce' else [mcp.to_obj() for mcp in payload]] for kind, payload in items]
+
+def _gms_items_from_obj(objs):
+    return [
+        (kind, schema_classes.MetadataChangeEventClass.from_obj(payload) if kind == 'mce'
+         else [datahub_mcp.MetadataChangeProposalWrapper.from_obj(mcp) for mcp in payload])
+        for kind, payload in objs
+    ]
+
+class DeadLetterQueue:
+    """Built MCEs/MCPs that GMS still rejected after retrying, kept in SQLite so they can be
+    replayed later without fetching anything from Trino again.
+
+    Entries are per workspace (browser session) and table; a newer failure of the same
+    table replaces its entry and bumps the attempt count.
+    """
+    
+    COLUMNS = ('catalog', 'schema_name', 'table_name', 'urn', 'mode', 'error', 'attempts', 'failed_at')
+    
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS dead_letters (
+                    workspace TEXT NOT NULL,
+                    catalog TEXT NOT NULL,
+                    schema_name TEXT NOT NULL,
+                    table_name TEXT NOT NULL,
+                    urn TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    items TEXT NOT NULL,
+                    content_hash TEXT,
+                    aspect_hashes TEXT NOT NULL,
+                    error TEXT NOT NULL,
+                    attempts INTEGER NOT NULL,
+                    failed_at REAL NOT NULL,
+                    PRIMARY KEY (workspace, catalog, schema_name, table_name)
+                )
+            """)
+    
+    def add(self, workspace, catalog, schema, table_name, urn, mode, items, content_hash, aspect_hashes, error):
+        payload = json.dumps(_gms_items_to_obj(items))
+        with self._lock, self._conn:
+            self._conn.execute("""
+                INSERT INTO dead_letters (workspace, catalog, schema_name, table_name, urn, mode, items,
+                                          content_hash, aspect_hashes, error, attempts, failed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 1, ?)
+                ON CONFLICT (workspace, catalog, schema_name, table_name) DO UPDATE SET
+                    urn = excluded.urn, mode = excluded.mode, items = excluded.items,
+                    content_hash = excluded.content_hash, aspect_hashes = excluded.aspect_hashes,
+                    error = excluded.error, attempts = dead_letters.attempts + 1, failed_at = excluded.failed_at
+            """, (workspace, catalog, schema, table_name, urn, mode, payload,
+                  content_hash, json.dumps(aspect_hashes), error, time.time()))
+    
+    def entries(self, workspace, urns=None, with_items=False):
+        """Entries of a workspace, oldest failure first; with_items adds what is needed to replay them"""
+        columns = self.COLUMNS + (('items', 'content_hash', 'aspect_hashes') if with_items else ())
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {', '.join(columns)} FROM dead_letters WHERE workspace = ? ORDER BY failed_at",
+                (workspace,)
+            ).fetchall()
+        entries = []
+        for row in rows:
+            entry = dict(zip(columns, row))
+            if urns is not None and entry['urn'] not in urns:
+                continue
+            entry['schema'] = entry.pop('schema_name')
+            if with_items:
+                entry['items'] = _gms_items_from_obj(json.loads(entry['items']))
+                entry['aspect_hashes'] = json.loads(entry['aspect_hashes'])
+            entries.append(entry)
+        return entries
+    
+    def count(self, workspace):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM dead_letters WHERE workspace = ?", (workspace,)).fetchone()[0]
+    
+    def remove(self, workspace, tables):
+        """Drop entries for (catalog, schema, table_name) keys, e.g. once they were emitted"""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM dead_letters WHERE workspace = ? AND catalog = ? AND schema_name = ? AND table_name = ?",
+                [(workspace, catalog, schema, table_name) for catalog, schema, table_name in tables]
+            )
+    
+    def clear(self, workspace, urns=None):
+        with self._lock, self._conn:
+            if urns is None:
+                cursor = self._conn.execute("DELETE FROM dead_letters WHERE workspace = ?", (workspace,))
+            else:
+                cursor = self._conn.executemany(
+                    "DELETE FROM dead_letters WHERE workspace = ? AND urn = ?", [(workspace, urn) for urn in urns]
+                )
+            return cursor.rowcount
+    
+    def clear_workspaces(self, workspaces):
+        with self._lock, self._conn:
+            return self._conn.executemany(
+                "DELETE FROM dead_letters WHERE workspace = ?", [(workspace,) for workspace in workspaces]
+            ).rowcount
\ No newline at end of file
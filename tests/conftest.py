@@ -0,0 +1,75 @@
+"""
+Fixtures for the test suite. The app runs offline against the benchmark fakes
+(FakeTrino behind trino_catalog.connect, StubGMS as DataHub GMS), with its
+stores and uploads in a temporary directory.
+"""
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, os.path.join(REPO_DIR, 'benchmarks'))
+
+from bench_hot_paths import configure_environment  # noqa: E402
+from fakes import FakeTrino, StubGMS  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def gms():
+    with StubGMS() as stub:
+        yield stub
+
+
+@pytest.fixture(scope='session')
+def app_module(gms, tmp_path_factory):
+    """app.py, imported once with offline settings and its stores opened in a temp dir"""
+    work_dir = str(tmp_path_factory.mktemp('datahub'))
+    configure_environment(work_dir, gms.url)
+    # Small parts and CSV chunks, so uploads span several parts and are parsed in several chunks
+    os.environ.update({'UPLOAD_PART_SIZE': '1024', 'UPLOAD_CSV_CHUNK_ROWS': '50'})
+    original_dir = os.getcwd()
+    # app.py logs to datahub_app.log in the working directory
+    os.chdir(work_dir)
+    try:
+        import app
+    finally:
+        os.chdir(original_dir)
+    app.create_app()
+    return app
+
+
+@pytest.fixture
+def trino(app_module, monkeypatch):
+    """A fake 'hive' catalog of 2 schemas x 6 tables x 5 columns, with a cold pool and cache"""
+    import trino_catalog
+    fake = FakeTrino(schemas=2, tables=6, columns=5)
+    monkeypatch.setattr(trino_catalog, 'connect', fake.connect)
+    trino_catalog.trino_pool.clear()
+    trino_catalog.metadata_cache.invalidate()
+    yield fake
+    trino_catalog.trino_pool.clear()
+
+
+@pytest.fixture
+def client(app_module):
+    """A test client with its own cookie jar, so its own session and workspace"""
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def loaded_client(client, trino):
+    """A client that has selected hive.schema_0 and loaded its tables"""
+    assert client.post('/load_catalogs').get_json()['success']
+    assert client.post('/load_schemas', json={'catalog': trino.catalog}).get_json()['success']
+    assert client.post('/load_tables', json={'schema': trino.schema_names[0]}).get_json()['success']
+    return client
+
+
+@pytest.fixture
+def workspace(client):
+    """The workspace (session ID) behind `client`"""
+    client.get('/get_session_stats')
+    with client.session_transaction() as flask_session:
+        return flask_session['session_id']
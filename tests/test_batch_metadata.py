@@ -0,0 +1,102 @@
+"""/batch_metadata: set, patch and delete edits, applied all or nothing"""
+
+
+def batch(client, *edits):
+    return client.post('/batch_metadata', json={'edits': list(edits)}).get_json()
+
+
+def metadata(client):
+    return client.get('/get_metadata').get_json()['metadata']
+
+
+def test_set_creates_tables_and_columns(loaded_client):
+    result = batch(
+        loaded_client,
+        {'table_name': 'table_0', 'table_description': 'First table', 'table_tag': 'Gold'},
+        {'table_name': 'table_1', 'column_name': 'column_0', 'column_description': 'Key', 'column_tag': 'PII'},
+        {'schema': 'schema_1', 'table_name': 'table_2', 'column_name': 'column_1', 'column_description': 'Other'},
+    )
+    assert result['success'] and result['applied'] == 3 and result['failed'] == 0
+    assert [r['status'] for r in result['results']] == ['applied'] * 3
+    assert [r['table'] for r in result['results']] == ['schema_0.table_0', 'schema_0.table_1', 'schema_1.table_2']
+
+    stored = metadata(loaded_client)
+    assert stored['schema_0.table_0']['table_info']['description'] == 'First table'
+    assert stored['schema_0.table_0']['columns'] == {}
+    assert stored['schema_0.table_1']['columns']['column_0'] == {'description': 'Key', 'tag': 'PII', 'data_type': 'string'}
+    assert stored['schema_1.table_2']['table_info']['schema'] == 'schema_1'
+
+
+def test_patch_changes_only_given_fields(loaded_client):
+    batch(loaded_client, {'table_name': 'table_0', 'column_name': 'column_0', 'column_description': 'Key',
+                          'column_tag': 'PII', 'data_type': 'bigint', 'table_description': 'Orders'})
+    result = batch(
+        loaded_client,
+        {'op': 'patch', 'table_name': 'table_0', 'column_name': 'column_0', 'column_description': 'Order key'},
+        {'op': 'patch', 'table_name': 'table_0', 'table_tag': 'Gold'},
+    )
+    assert result['success'], result
+
+    entry = metadata(loaded_client)['schema_0.table_0']
+    assert entry['columns']['column_0'] == {'description': 'Order key', 'tag': 'PII', 'data_type': 'bigint'}
+    assert entry['table_info']['description'] == 'Orders'
+    assert entry['table_info']['tag'] == 'Gold'
+
+
+def test_delete_columns_and_tables(loaded_client):
+    batch(
+        loaded_client,
+        {'table_name': 'table_0', 'column_name': 'column_0', 'column_description': 'Key'},
+        {'table_name': 'table_0', 'column_name': 'column_1', 'column_description': 'Value'},
+        {'table_name': 'table_1', 'column_name': 'column_0', 'column_description': 'Key'},
+    )
+    result = batch(
+        loaded_client,
+        {'op': 'delete', 'table_name': 'table_0', 'column_name': 'column_1'},
+        {'op': 'delete', 'table_name': 'table_1'},
+    )
+    assert result['success'], result
+
+    stored = metadata(loaded_client)
+    assert list(stored) == ['schema_0.table_0']
+    assert list(stored['schema_0.table_0']['columns']) == ['column_0']
+
+
+def test_invalid_edit_rejects_the_whole_batch(loaded_client):
+    version = loaded_client.get('/get_metadata').get_json()['version']
+    result = batch(
+        loaded_client,
+        {'table_name': 'table_0', 'column_name': 'column_0', 'column_description': 'Key'},
+        {'table_name': 'table_1', 'column_name': 'column_0'},
+    )
+    assert not result['success'] and result['applied'] == 0 and result['failed'] == 1
+    assert [r['status'] for r in result['results']] == ['skipped', 'failed']
+    assert result['results'][1]['message'] == 'column_description is required'
+    assert metadata(loaded_client) == {}
+    assert result['version'] == version
+
+
+def test_failed_store_edit_rolls_back_the_batch(loaded_client):
+    batch(loaded_client, {'table_name': 'table_0', 'column_name': 'column_0', 'column_description': 'Key'})
+    before = loaded_client.get('/get_metadata').get_json()
+
+    result = batch(
+        loaded_client,
+        {'op': 'patch', 'table_name': 'table_0', 'column_name': 'column_0', 'column_description': 'Changed'},
+        {'op': 'delete', 'table_name': 'table_5'},
+    )
+    assert not result['success'] and result['failed'] == 1
+    assert [r['status'] for r in result['results']] == ['skipped', 'failed']
+    assert result['results'][1]['message'] == 'No manual metadata for table schema_0.table_5'
+    assert loaded_client.get('/get_metadata').get_json() == before
+
+
+def test_malformed_requests(loaded_client):
+    assert batch(loaded_client) == {'success': False, 'message': 'No edits given'}
+    result = batch(loaded_client, 'table_0', {'op': 'upsert', 'table_name': 'table_0'},
+                   {'op': 'patch', 'table_name': 'table_0'})
+    assert [r['message'] for r in result['results']] == [
+        'Each edit must be a JSON object',
+        "Unknown op 'upsert', expected one of: set, patch, delete",
+        'Nothing to patch',
+    ]
@@ -0,0 +1,97 @@
+"""Chunked CSV upload: parts in any order, resuming after missing parts, and the stored result"""
+import io
+import os
+
+import pytest
+
+
+@pytest.fixture
+def csv_bytes(trino):
+    from bench_hot_paths import generate_csv
+    return generate_csv(trino)
+
+
+def start(client, csv_bytes, filename='metadata.csv'):
+    result = client.post('/start_metadata_upload', json={'filename': filename, 'size': len(csv_bytes)}).get_json()
+    assert result['success'], result
+    return result['upload']
+
+
+def send_part(client, upload, csv_bytes, index):
+    part_size = upload['part_size']
+    return client.post(f"/upload_metadata_part/{upload['upload_id']}/{index}",
+                       data=csv_bytes[index * part_size:(index + 1) * part_size]).get_json()
+
+
+def complete(client, upload):
+    return client.post(f"/complete_metadata_upload/{upload['upload_id']}").get_json()
+
+
+def test_out_of_order_parts_and_resume(app_module, loaded_client, csv_bytes):
+    upload = start(loaded_client, csv_bytes)
+    assert upload['part_count'] >= 4
+    parts = list(range(upload['part_count']))
+    held_back = parts[1]
+    for index in reversed(parts):
+        if index != held_back:
+            assert send_part(loaded_client, upload, csv_bytes, index)['success']
+
+    result = complete(loaded_client, upload)
+    assert not result['success'] and result['missing_parts'] == [held_back]
+    progress = loaded_client.get(f"/get_metadata_upload/{upload['upload_id']}").get_json()['upload']
+    assert progress['missing_parts'] == [held_back]
+    assert progress['received_parts'] == upload['part_count'] - 1
+
+    # Resuming sends only what is missing; a part sent twice is simply rewritten
+    assert send_part(loaded_client, upload, csv_bytes, held_back)['missing_parts'] == 0
+    assert send_part(loaded_client, upload, csv_bytes, parts[-1])['success']
+    result = complete(loaded_client, upload)
+    assert result['success'], result
+    assert result['rows'] == csv_bytes.count(b'\n') - 1 == 60
+    assert result['tables'] == 12
+    assert not os.path.exists(os.path.join(app_module.app.config['UPLOAD_FOLDER'], f"{upload['upload_id']}.part"))
+
+
+def test_chunked_upload_stores_the_same_metadata_as_a_single_upload(app_module, trino, csv_bytes):
+    chunked = app_module.app.test_client()
+    upload = start(chunked, csv_bytes)
+    for index in range(upload['part_count']):
+        send_part(chunked, upload, csv_bytes, index)
+    assert complete(chunked, upload)['success']
+
+    single = app_module.app.test_client()
+    result = single.post('/upload_metadata', data={'file': (io.BytesIO(csv_bytes), 'metadata.csv')},
+                         content_type='multipart/form-data').get_json()
+    assert result['success'], result
+
+    stored = chunked.get('/get_metadata').get_json()['metadata']
+    assert len(stored) == 12
+    assert stored == single.get('/get_metadata').get_json()['metadata']
+
+
+def test_bad_parts_are_rejected(loaded_client, csv_bytes):
+    upload = start(loaded_client, csv_bytes)
+    url = f"/upload_metadata_part/{upload['upload_id']}"
+
+    result = loaded_client.post(f"{url}/{upload['part_count']}", data=b'x').get_json()
+    assert not result['success'] and 'out of range' in result['message']
+
+    # A short part is not counted as received, even if an earlier copy of it was
+    assert send_part(loaded_client, upload, csv_bytes, 0)['success']
+    result = loaded_client.post(f"{url}/0", data=csv_bytes[:10]).get_json()
+    assert not result['success'] and 'expected' in result['message']
+    progress = loaded_client.get(f"/get_metadata_upload/{upload['upload_id']}").get_json()['upload']
+    assert 0 in progress['missing_parts']
+
+
+def test_uploads_belong_to_their_session(app_module, loaded_client, csv_bytes):
+    upload = start(loaded_client, csv_bytes)
+    other = app_module.app.test_client()
+    assert other.get(f"/get_metadata_upload/{upload['upload_id']}").get_json()['message'] == 'Upload not found'
+    assert not send_part(other, upload, csv_bytes, 0)['success']
+    assert not complete(other, upload)['success']
+
+    path = os.path.join(app_module.app.config['UPLOAD_FOLDER'], f"{upload['upload_id']}.part")
+    assert os.path.exists(path)
+    assert loaded_client.post(f"/cancel_metadata_upload/{upload['upload_id']}").get_json()['success']
+    assert not os.path.exists(path)
@@ -0,0 +1,42 @@
+"""build_uploaded_metadata() against the row-by-row iterrows transform it replaced"""
+import os
+
+import pandas as pd
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope='module')
+def reference(app_module):
+    # Imported after the app, so the offline defaults it sets change nothing
+    import bench_csv_ingest
+    return bench_csv_ingest
+
+
+def assert_same_as_iterrows(app_module, reference, df):
+    expected = reference.canonical(reference.legacy_build_uploaded_metadata(df))
+    assert reference.canonical(app_module.build_uploaded_metadata(df)) == expected
+
+
+def test_generated_csv(app_module, reference):
+    # Blanks in every optional field, and some columns repeated within a table
+    df = reference.generate_csv(3000, columns_per_table=20, schemas=4)
+    assert_same_as_iterrows(app_module, reference, df)
+
+
+def test_sample_csv(app_module, reference):
+    df = pd.read_csv(os.path.join(REPO_DIR, 'sample_metadata.csv'))
+    assert_same_as_iterrows(app_module, reference, df)
+
+
+def test_required_columns_only(app_module, reference):
+    df = reference.generate_csv(500, columns_per_table=10, schemas=2)[app_module.REQUIRED_CSV_COLUMNS]
+    assert_same_as_iterrows(app_module, reference, df)
+
+
+def test_discovered_schemas_and_tables(app_module, reference):
+    df = reference.generate_csv(200, columns_per_table=10, schemas=3)
+    uploaded, schemas, tables = app_module.build_uploaded_metadata(df)
+    assert schemas == {'schema_0', 'schema_1', 'schema_2'}
+    assert tables == set(uploaded) and len(tables) == 20
@@ -0,0 +1,74 @@
+"""Dead-letter queue: emissions GMS rejects are kept and replayed without going back to Trino"""
+import pytest
+
+
+@pytest.fixture
+def failing_gms(gms):
+    gms.reset()
+    gms.fail()
+    yield gms
+    gms.reset()
+
+
+def emit(client, tables, force=True):
+    return client.post('/emit_to_datahub', json={'tables': tables, 'mode': 'mcp', 'force': force}).get_json()
+
+
+def failed_emissions(client):
+    return client.get('/get_failed_emissions').get_json()['failed']
+
+
+def test_rejected_emissions_are_replayed(loaded_client, trino, failing_gms):
+    result = emit(loaded_client, ['table_0', 'table_1'])
+    assert result['successful'] == [] and len(result['failed']) == 2
+    failed = failed_emissions(loaded_client)
+    assert sorted(entry['table_name'] for entry in failed) == ['table_0', 'table_1']
+    assert all(entry['attempts'] == 1 and entry['mode'] == 'mcp' and 'Rejected by StubGMS' in entry['error']
+               for entry in failed)
+
+    # Still rejected: the entries stay queued and count another attempt
+    result = loaded_client.post('/retry_failed_emissions').get_json()
+    assert not result['success'] and result['remaining'] == 2
+    assert [entry['attempts'] for entry in failed_emissions(loaded_client)] == [2, 2]
+
+    failing_gms.reset()
+    trino.reset_counters()
+    result = loaded_client.post('/retry_failed_emissions').get_json()
+    assert result['success'] and sorted(result['successful']) == ['table_0', 'table_1']
+    assert result['remaining'] == 0 and failed_emissions(loaded_client) == []
+    assert failing_gms.recorded()['mcps'] > 0
+    # The stored MCPs were sent as they were built, without querying Trino again
+    assert trino.queries == 0
+
+    # The replay recorded what was emitted, so an unforced emission has nothing new to send
+    assert emit(loaded_client, ['table_0', 'table_1'], force=False)['skipped'] == ['table_0', 'table_1']
+
+
+def test_replay_of_selected_urns(loaded_client, failing_gms):
+    emit(loaded_client, ['table_2', 'table_3'])
+    urns = {entry['table_name']: entry['urn'] for entry in failed_emissions(loaded_client)}
+
+    failing_gms.reset()
+    result = loaded_client.post('/retry_failed_emissions', json={'urns': [urns['table_3']]}).get_json()
+    assert result['successful'] == ['table_3'] and result['remaining'] == 1
+    assert [entry['table_name'] for entry in failed_emissions(loaded_client)] == ['table_2']
+
+
+def test_successful_emission_clears_dead_letters(loaded_client, failing_gms):
+    emit(loaded_client, ['table_4'])
+    assert len(failed_emissions(loaded_client)) == 1
+
+    failing_gms.reset()
+    assert emit(loaded_client, ['table_4'])['successful'] == ['table_4']
+    assert failed_emissions(loaded_client) == []
+
+
+def test_dead_letters_belong_to_their_session(app_module, loaded_client, failing_gms):
+    emit(loaded_client, ['table_5'])
+    other = app_module.app.test_client()
+    assert failed_emissions(other) == []
+    assert other.post('/retry_failed_emissions').get_json()['message'] == 'No failed emissions to retry'
+    assert other.post('/clear_failed_emissions').get_json()['message'] == 'Discarded 0 failed emissions'
+
+    assert loaded_client.post('/clear_failed_emissions').get_json()['message'] == 'Discarded 1 failed emissions'
+    assert failed_emissions(loaded_client) == []
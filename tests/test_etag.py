@@ -0,0 +1,89 @@
+"""Version-based ETags: unchanged state answers If-None-Match with a 304, any change with a new body"""
+import gzip
+import json
+
+import pytest
+
+
+def add_metadata(client, table_name, column_name='column_0'):
+    result = client.post('/add_metadata', json={
+        'table_name': table_name, 'column_name': column_name, 'column_description': f'{column_name} of {table_name}'
+    }).get_json()
+    assert result['success'], result
+
+
+def revalidate(client, path, etag, **headers):
+    return client.get(path, headers={'If-None-Match': etag, **headers})
+
+
+@pytest.mark.parametrize('path', ['/get_metadata', '/get_metadata_with_source', '/get_tables'])
+def test_unchanged_state_is_not_modified(loaded_client, path):
+    add_metadata(loaded_client, 'table_0')
+    response = loaded_client.get(path)
+    assert response.status_code == 200 and response.headers['ETag']
+    assert response.cache_control.private and response.cache_control.no_cache
+
+    cached = revalidate(loaded_client, path, response.headers['ETag'])
+    assert cached.status_code == 304 and cached.data == b''
+    assert cached.headers['ETag'] == response.headers['ETag']
+
+    assert revalidate(loaded_client, path, '"stale"').status_code == 200
+
+
+@pytest.mark.parametrize('path', ['/get_metadata', '/get_metadata_with_source'])
+def test_metadata_changes_invalidate_the_etag(loaded_client, path):
+    add_metadata(loaded_client, 'table_0')
+    etag = loaded_client.get(path).headers['ETag']
+
+    add_metadata(loaded_client, 'table_1')
+    response = revalidate(loaded_client, path, etag)
+    assert response.status_code == 200 and response.headers['ETag'] != etag
+    assert 'schema_0.table_1' in json.dumps(response.get_json())
+
+
+def test_loading_tables_invalidates_the_table_list(loaded_client, trino):
+    response = loaded_client.get('/get_tables')
+    assert response.get_json()['selected_schema'] == 'schema_0'
+
+    loaded_client.post('/load_tables', json={'schema': trino.schema_names[1]})
+    changed = revalidate(loaded_client, '/get_tables', response.headers['ETag'])
+    assert changed.status_code == 200 and changed.get_json()['selected_schema'] == 'schema_1'
+
+
+def test_etag_depends_on_the_representation(loaded_client):
+    for table in ('table_0', 'table_1', 'table_2'):
+        for column in ('column_0', 'column_1', 'column_2', 'column_3'):
+            add_metadata(loaded_client, table, column)
+    plain = loaded_client.get('/get_metadata', headers={'Accept-Encoding': 'identity'})
+    compressed = loaded_client.get('/get_metadata', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert json.loads(gzip.decompress(compressed.data)) == plain.get_json()
+    assert plain.headers['ETag'] != compressed.headers['ETag']
+    assert revalidate(loaded_client, '/get_metadata', compressed.headers['ETag'],
+                      **{'Accept-Encoding': 'gzip'}).status_code == 304
+    assert revalidate(loaded_client, '/get_metadata', compressed.headers['ETag'],
+                      **{'Accept-Encoding': 'identity'}).status_code == 200
+
+    version = plain.get_json()['version']
+    delta = loaded_client.get(f'/get_metadata?since_version={version}')
+    assert delta.headers['ETag'] != plain.headers['ETag']
+    assert delta.get_json()['metadata'] == {}
+
+
+def test_etag_is_per_session(app_module, loaded_client):
+    response = loaded_client.get('/get_metadata')
+    other = app_module.app.test_client()
+    assert revalidate(other, '/get_metadata', response.headers['ETag']).status_code == 200
+
+
+def test_since_version_returns_later_changes(loaded_client):
+    add_metadata(loaded_client, 'table_0')
+    version = loaded_client.get('/get_metadata').get_json()['version']
+    add_metadata(loaded_client, 'table_1')
+    assert loaded_client.post('/batch_metadata', json={'edits': [{'op': 'delete', 'table_name': 'table_0'}]}
+                              ).get_json()['success']
+
+    delta = loaded_client.get(f'/get_metadata?since_version={version}').get_json()
+    assert list(delta['metadata']) == ['schema_0.table_1']
+    assert delta['removed'] == ['schema_0.table_0']
+    assert delta['version'] > version
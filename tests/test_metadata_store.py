@@ -0,0 +1,134 @@
+"""MetadataStore: storage roundtrip, the stored merged view and change tracking"""
+import json
+
+import pytest
+
+
+def csv_entry(schema, description='', domain='', owner='', tag='', columns=None):
+    return {
+        'table_info': {'schema': schema, 'domain': domain, 'owner': owner, 'description': description, 'tag': tag},
+        'columns': columns if columns is not None else {
+            'id': {'description': 'Primary key', 'tag': 'PII', 'data_type': 'bigint'},
+            'name': {'description': 'Display name', 'tag': '', 'data_type': 'varchar'},
+        }
+    }
+
+
+UPLOADED = {
+    'sales.orders': csv_entry('sales', 'Orders', 'Sales', 'Data Team', 'Business'),
+    'sales.customers': csv_entry('sales', 'Customers', 'Sales', '', 'PII'),
+}
+
+
+@pytest.fixture
+def store(app_module, tmp_path):
+    from stores import MetadataStore
+    return MetadataStore(str(tmp_path / 'metadata.db'), batch_size=1)
+
+
+def test_uploaded_roundtrip(store):
+    store.set_uploaded('ws', UPLOADED)
+    tables = dict(store.iter_tables('ws'))
+    assert sorted(tables) == sorted(UPLOADED)
+    for table_key, entry in UPLOADED.items():
+        assert tables[table_key] == {'manual': None, 'csv': entry}
+    assert store.table_keys('ws', source='csv') == sorted(UPLOADED)
+    assert store.stats('ws')['columns'] == 4
+
+
+def test_manual_roundtrip(store):
+    store.add_manual_column('ws', 'sales.orders', {'schema': 'sales', 'description': 'Orders', 'tag': 'Business'},
+                            'total', {'description': 'Order total', 'tag': 'Financial', 'data_type': 'double'})
+    store.add_manual_column('ws', 'sales.orders', {'schema': 'sales', 'description': 'ignored', 'tag': ''},
+                            'placed_at', {'description': 'When it was placed', 'tag': '', 'data_type': 'timestamp'})
+    manual = dict(store.iter_tables('ws'))['sales.orders']['manual']
+    assert manual == {
+        'table_info': {'schema': 'sales', 'description': 'Orders', 'tag': 'Business'},
+        'columns': {
+            'total': {'description': 'Order total', 'tag': 'Financial', 'data_type': 'double'},
+            'placed_at': {'description': 'When it was placed', 'tag': '', 'data_type': 'timestamp'},
+        }
+    }
+
+
+def test_reopened_store_keeps_metadata(store):
+    from stores import MetadataStore
+    store.set_uploaded('ws', UPLOADED)
+    reopened = MetadataStore(store.path)
+    assert dict(reopened.iter_tables('ws')) == dict(store.iter_tables('ws'))
+    assert reopened.get_combined('ws', sorted(UPLOADED)) == store.get_combined('ws', sorted(UPLOADED))
+    assert reopened.version('ws') == store.version('ws')
+
+
+def test_workspaces_are_isolated(store):
+    store.set_uploaded('ws', UPLOADED)
+    assert list(store.iter_tables('other')) == []
+    assert list(store.iter_merged('other')) == []
+    assert store.version('other') == 0
+
+
+def test_merged_view_prefers_manual_table_info(store):
+    store.set_uploaded('ws', UPLOADED)
+    # An empty manual description still wins over the CSV's
+    store.add_manual_column('ws', 'sales.orders', {'schema': 'sales', 'description': '', 'tag': 'Gold'},
+                            'id', {'description': 'Order ID', 'tag': '', 'data_type': 'bigint'})
+    store.add_manual_column('ws', 'sales.orders', {'schema': 'sales'}, 'note',
+                            {'description': 'Free text', 'tag': '', 'data_type': 'varchar'})
+
+    merged = store.get_combined('ws', ['sales.orders'])['sales.orders']
+    assert merged['table_info'] == {
+        'schema': 'sales', 'domain': 'Sales', 'owner': 'Data Team', 'description': '', 'tag': 'Gold'
+    }
+    # CSV columns replace manual ones; manual-only columns are kept
+    assert merged['columns']['id'] == UPLOADED['sales.orders']['columns']['id']
+    assert merged['columns']['note']['description'] == 'Free text'
+
+    with_sources = {key: json.loads(text) for key, text in store.iter_merged('ws', with_sources=True)}
+    assert with_sources['sales.orders']['sources'] == {
+        'table': 'manual',
+        'table_fields': {'schema': 'manual', 'domain': 'csv', 'owner': 'csv', 'description': 'manual', 'tag': 'manual'},
+        'columns': {'id': 'csv', 'name': 'csv', 'note': 'manual'}
+    }
+    assert with_sources['sales.customers']['sources']['table'] == 'csv'
+
+
+def test_merged_view_matches_merging_on_read(store):
+    from stores import merge_metadata_entries
+    store.set_uploaded('ws', UPLOADED)
+    store.add_manual_column('ws', 'sales.orders', {'schema': 'sales', 'description': 'Manual', 'tag': ''},
+                            'id', {'description': 'Order ID', 'tag': '', 'data_type': 'bigint'})
+    store.add_manual_column('ws', 'sales.returns', {'schema': 'sales', 'description': 'Returns', 'tag': ''},
+                            'id', {'description': 'Return ID', 'tag': '', 'data_type': 'bigint'})
+    store.set_uploaded('ws', {'sales.orders': UPLOADED['sales.orders']})
+
+    merged = {key: json.loads(text) for key, text in store.iter_merged('ws', with_sources=True)}
+    expected = {
+        table_key: json.loads(json.dumps(merge_metadata_entries(entries['manual'], entries['csv'])))
+        for table_key, entries in store.iter_tables('ws')
+    }
+    assert merged == expected
+    assert sorted(merged) == ['sales.orders', 'sales.returns']
+
+
+def test_changes_since(store):
+    start = store.version('ws')
+    assert store.set_uploaded('ws', UPLOADED) == 2
+    uploaded_at = store.version('ws')
+    assert uploaded_at > start
+    assert store.changes_since('ws', start) == (['sales.customers', 'sales.orders'], [])
+
+    # Re-uploading the same content changes nothing
+    assert store.set_uploaded('ws', UPLOADED) == 0
+    assert store.version('ws') == uploaded_at
+    assert store.changes_since('ws', uploaded_at) == ([], [])
+
+    changed = dict(UPLOADED, **{'sales.orders': csv_entry('sales', 'Orders, revised', 'Sales')})
+    del changed['sales.customers']
+    store.set_uploaded('ws', changed)
+    assert store.changes_since('ws', uploaded_at) == (['sales.orders'], ['sales.customers'])
+    assert [key for key, _ in store.iter_merged('ws')] == ['sales.orders']
+
+    cleared_from = store.version('ws')
+    assert store.clear('ws') == 1
+    assert store.changes_since('ws', cleared_from) == ([], ['sales.orders'])
+    assert list(store.iter_merged('ws')) == []
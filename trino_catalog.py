@@ -0,0 +1,1016 @@
+"""
+Trino access for DataHub Metadata Manager: the connection pool, the metadata cache,
+the connector used by the routes and the background catalog crawler
+"""
+import copy
+import datetime
+import functools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from config import (
+    TRINO_HOST, TRINO_PORT, TRINO_USER,
+    COLUMN_FETCH_BATCH_SIZE, TRINO_POOL_SIZE, TRINO_POOL_IDLE_TIMEOUT,
+    TRINO_POOL_HEALTH_CHECK_INTERVAL, METADATA_CACHE_TTL, METADATA_CACHE_MAX_ENTRIES,
+    CRAWLER_ENABLED, CRAWLER_CATALOGS, CRAWLER_SCHEMAS, CRAWLER_INTERVAL, CRAWLER_CONCURRENCY,
+    TRINO_COUNT_TIMEOUT, DISCOVERY_SCHEMAS_PER_QUERY, DISCOVERY_CONCURRENCY
+)
+from lazy_imports import trino_dbapi, trino_exceptions
+from metrics import track_trino_query
+from retry import call_with_retry
+
+logger = logging.getLogger(__name__)
+
+def connect(**kwargs):
+    """trino.dbapi.connect, importing the Trino client on first use"""
+    return trino_dbapi.connect(**kwargs)
+
+class TrinoConnectionPool:
+    """Thread-safe pool of reusable Trino connections keyed by (catalog, schema)"""
+    
+    def __init__(self, max_size=TRINO_POOL_SIZE, idle_timeout=TRINO_POOL_IDLE_TIMEOUT,
+                 health_check_interval=TRINO_POOL_HEALTH_CHECK_INTERVAL):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._idle = {}  # (catalog, schema) -> list of (connection, last_used)
+        self._in_use = 0
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.health_check_failures = 0
+    
+    def _create(self, catalog, schema):
+        conn = connect(
+            host=TRINO_HOST,
+            port=TRINO_PORT,
+            user=TRINO_USER,
+            catalog=catalog,
+            schema=schema,
+        )
+        logger.info(f"Successfully Connected to Trino ({catalog}.{schema})")
+        return conn
+    
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception as e:
+            logger.debug(f"Error closing Trino connection: {str(e)}")
+    
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            with track_trino_query('health_check'):
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled Trino connection failed health check: {str(e)}")
+            return False
+    
+    def acquire(self, catalog, schema):
+        """Check out a connection for (catalog, schema), reusing an idle one when possible"""
+        key = (catalog, schema)
+        while True:
+            conn = None
+            last_used = 0
+            stale = []
+            with self._lock:
+                idle = self._idle.get(key, [])
+                now = time.monotonic()
+                while idle:
+                    candidate, candidate_last_used = idle.pop()
+                    if now - candidate_last_used > self.idle_timeout:
+                        stale.append(candidate)
+                        self.expired += 1
+                        continue
+                    conn, last_used = candidate, candidate_last_used
+                    break
+                if conn is None:
+                    self.misses += 1
+                self._in_use += 1
+            
+            for stale_conn in stale:
+                self._close(stale_conn)
+            
+            if conn is None:
+                try:
+                    return self._create(catalog, schema)
+                except Exception:
+                    with self._lock:
+                        self._in_use -= 1
+                    raise
+            
+            if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+                self._close(conn)
+                with self._lock:
+                    self._in_use -= 1
+                    self.health_check_failures += 1
+                continue
+            
+            with self._lock:
+                self.hits += 1
+            return conn
+    
+    def release(self, catalog, schema, conn, discard=False):
+        """Return a checked-out connection to the pool, closing it if the pool is full"""
+        key = (catalog, schema)
+        with self._lock:
+            self._in_use -= 1
+            idle = self._idle.setdefault(key, [])
+            if not discard and len(idle) < self.max_size:
+                idle.append((conn, time.monotonic()))
+                return
+        self._close(conn)
+    
+    def clear(self):
+        """Close every idle connection"""
+        with self._lock:
+            idle_conns = [conn for conns in self._idle.values() for conn, _ in conns]
+            self._idle = {}
+        for conn in idle_conns:
+            self._close(conn)
+    
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'expired': self.expired,
+                'health_check_failures': self.health_check_failures,
+                'in_use': self._in_use,
+                'idle': {f"{catalog}.{schema}": len(conns) for (catalog, schema), conns in self._idle.items()},
+                'max_size': self.max_size,
+                'idle_timeout': self.idle_timeout
+            }
+
+trino_pool = TrinoConnectionPool()
+
+class MetadataCache:
+    """Thread-safe TTL + LRU cache for catalog/schema/table/column lookups.
+
+    Keys are tuples starting with the lookup kind followed by catalog, schema and
+    table, e.g. ('columns', 'hive', 'sales', 'orders'). Keys naming a schema are
+    also indexed by (catalog, schema), so touching or invalidating one schema does
+    not scan the whole cache.
+    """
+    
+    def __init__(self, ttl=METADATA_CACHE_TTL, max_entries=METADATA_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (value, expires_at)
+        self._schema_keys = {}  # (catalog, schema) -> keys of that schema's entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+    
+    @property
+    def enabled(self):
+        return self.ttl > 0 and self.max_entries > 0
+    
+    def get(self, key):
+        """Return (found, value) for a key, dropping it if expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            value, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+    
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+            self._entries.move_to_end(key)
+            if len(key) >= 3:
+                self._schema_keys.setdefault(key[1:3], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+    
+    def _remove(self, key):
+        """Drop an entry and its schema index reference; the caller holds the lock"""
+        del self._entries[key]
+        if len(key) >= 3:
+            schema_keys = self._schema_keys.get(key[1:3])
+            if schema_keys is not None:
+                schema_keys.discard(key)
+                if not schema_keys:
+                    del self._schema_keys[key[1:3]]
+    
+    def touch(self, catalog, schema, ttl=None):
+        """Extend the expiry of a schema's cached entries.
+
+        Returns False (and extends nothing) when the schema's table list is no longer
+        cached, so the caller knows to fetch it again.
+        """
+        now = time.monotonic()
+        expires_at = now + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            entry = self._entries.get(('tables', catalog, schema))
+            if entry is None or entry[1] <= now:
+                return False
+            for key in self._schema_keys.get((catalog, schema), ()):
+                value, entry_expires_at = self._entries[key]
+                if entry_expires_at > now:
+                    self._entries[key] = (value, max(entry_expires_at, expires_at))
+            return True
+    
+    def invalidate(self, catalog=None, schema=None):
+        """Drop cached entries for a catalog or schema, or everything when neither is given"""
+        with self._lock:
+            if catalog is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                self._schema_keys.clear()
+            else:
+                if schema is None:
+                    stale_keys = [key for key in self._entries if key[1:2] == (catalog,)]
+                else:
+                    stale_keys = list(self._schema_keys.get((catalog, schema), ()))
+                for key in stale_keys:
+                    self._remove(key)
+                removed = len(stale_keys)
+            self.invalidations += removed
+        logger.info(f"Invalidated {removed} metadata cache entries (catalog={catalog}, schema={schema})")
+        return removed
+    
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / total, 4) if total else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'invalidations': self.invalidations,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl
+            }
+
+metadata_cache = MetadataCache()
+
+def cached_lookup(kind):
+    """Serve a TrinoConnector getter from its metadata cache; only non-empty results are cached"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(self, *args):
+            if self.cache is None or not self.cache.enabled:
+                return func(self, *args)
+            key = (kind,) + args
+            found, value = self.cache.get(key)
+            if not found:
+                value = func(self, *args)
+                if not value:
+                    return value
+                self.cache.set(key, value)
+            # Callers append to the returned lists, so never hand out the cached object
+            return copy.copy(value)
+        return wrapper
+    return decorator
+
+# Tags are now imported from config.py
+class TrinoConnector:
+    def __init__(self, pool=None, cache=None):
+        self.pool = pool or trino_pool
+        self.cache = cache
+        # Each request thread checks out its own connection and cursor
+        self._local = threading.local()
+    
+    @property
+    def conn(self):
+        return getattr(self._local, 'conn', None)
+    
+    @property
+    def cursor(self):
+        return getattr(self._local, 'cursor', None)
+    
+    def connect(self, catalog=None, schema=None):
+        catalog = catalog or "system"
+        schema = schema or "information_schema"
+        self.release()
+        try:
+            self._local.conn = self.pool.acquire(catalog, schema)
+            self._local.key = (catalog, schema)
+            self._local.cursor = self._local.conn.cursor()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to connect to Trino: {str(e)}")
+            return False
+    
+    def release(self):
+        """Return this thread's connection (if any) to the pool"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        catalog, schema = self._local.key
+        self._local.conn = None
+        self._local.cursor = None
+        self.pool.release(catalog, schema, conn)
+    
+    def _execute(self, kind, query, fetch=None):
+        """Run a query on this thread's connection and fetch its rows (fetchall() unless `fetch` is given).
+
+        Transient failures replace the connection and retry the query with backoff.
+        """
+        def attempt():
+            if self.cursor is None:
+                raise trino_exceptions.TrinoConnectionError("Trino connection lost")
+            with track_trino_query(kind):
+                self.cursor.execute(query)
+                return fetch(self.cursor) if fetch else self.cursor.fetchall()
+        return call_with_retry('trino', attempt, on_retry=self._reconnect)
+    
+    def _reconnect(self):
+        """Discard this thread's connection and open a new one for the same catalog/schema"""
+        conn = self.conn
+        catalog, schema = self._local.key
+        if conn is not None:
+            self._local.conn = None
+            self._local.cursor = None
+            self.pool.release(catalog, schema, conn, discard=True)
+        self.connect(catalog, schema)
+    
+    @staticmethod
+    def _literal_list(values):
+        """Quoted, comma-separated SQL string literals for an IN (...) list"""
+        return ', '.join("'" + value.replace("'", "''") + "'" for value in values)
+    
+    def _cached(self, key):
+        """Return (found, copy of value) for a metadata cache key"""
+        if self.cache is None:
+            return False, None
+        found, value = self.cache.get(key)
+        return found, copy.copy(value) if found else None
+    
+    @staticmethod
+    def _fetch_columns_by_schema_table(cursor):
+        """Read (table_schema, table_name, column_name, data_type) rows into a (schema, table) -> columns map"""
+        table_columns = {}
+        while True:
+            rows = cursor.fetchmany(COLUMN_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for schema_name, table_name, column_name, data_type in rows:
+                table_columns.setdefault((schema_name, table_name), []).append({'name': column_name, 'type': data_type})
+        return table_columns
+    
+    @staticmethod
+    def _fetch_columns_by_table(cursor):
+        """Read (table_name, column_name, data_type) rows in batches into a table -> columns map"""
+        table_columns = {}
+        while True:
+            rows = cursor.fetchmany(COLUMN_FETCH_BATCH_SIZE)
+            if not rows:
+                break
+            for table_name, column_name, data_type in rows:
+                table_columns.setdefault(table_name, []).append({'name': column_name, 'type': data_type})
+        return table_columns
+    
+    @cached_lookup('catalogs')
+    def get_catalogs(self):
+        try:
+            if not self.connect():
+                return []
+            query = "SHOW CATALOGS"
+            catalogs = [row[0] for row in self._execute('show_catalogs', query)]
+            logger.info(f"Found {len(catalogs)} catalogs")
+            return catalogs
+        except Exception as e:
+            logger.error(f"Failed to fetch catalogs: {str(e)}")
+            return []
+        finally:
+            self.release()
+    
+    @cached_lookup('schemas')
+    def get_schemas(self, catalog):
+        try:
+            if not self.connect(catalog):
+                return []
+            query = f"SHOW SCHEMAS FROM {catalog}"
+            schemas = [row[0] for row in self._execute('show_schemas', query)]
+            logger.info(f"Found {len(schemas)} schemas in catalog {catalog}")
+            return schemas
+        except Exception as e:
+            logger.error(f"Failed to fetch schemas from catalog {catalog}: {str(e)}")
+            return []
+        finally:
+            self.release()
+    
+    @cached_lookup('tables')
+    def get_tables(self, catalog, schema):
+        try:
+            if not self.connect(catalog, schema):
+                return []
+            query = f"SHOW TABLES FROM {catalog}.{schema}"
+            tables = [row[0] for row in self._execute('show_tables', query)]
+            logger.info(f"Found {len(tables)} tables in {catalog}.{schema}")
+            return tables
+        except Exception as e:
+            logger.error(f"Failed to fetch tables from {catalog}.{schema}: {str(e)}")
+            return []
+        finally:
+            self.release()
+    
+    @cached_lookup('columns')
+    def get_table_columns(self, catalog, schema, table_name):
+        try:
+            if not self.connect(catalog, schema):
+                return []
+            query = f"DESCRIBE {catalog}.{schema}.{table_name}"
+            columns = self._execute('describe', query)
+            return [{'name': col[0], 'type': col[1]} for col in columns]
+        except Exception as e:
+            logger.error(f"Failed to get columns for {catalog}.{schema}.{table_name}: {str(e)}")
+            return []
+        finally:
+            self.release()
+    
+    @cached_lookup('schema_columns')
+    def get_schema_columns(self, catalog, schema):
+        """Fetch columns for every table in a schema with a single information_schema query.
+
+        Returns a dict of table name -> column list, or None when information_schema
+        is not available for the catalog's connector.
+        """
+        try:
+            if not self.connect(catalog, schema):
+                return None
+            schema_literal = schema.replace("'", "''")
+            query = f"""
+                SELECT table_name, column_name, data_type
+                FROM {catalog}.information_schema.columns
+                WHERE table_schema = '{schema_literal}'
+                ORDER BY table_name, ordinal_position
+            """
+            table_columns = self._execute('information_schema_columns', query, fetch=self._fetch_columns_by_table)
+            
+            logger.info(f"Fetched columns for {len(table_columns)} tables in {catalog}.{schema} from information_schema")
+            if self.cache is not None:
+                for table_name, columns in table_columns.items():
+                    self.cache.set(('columns', catalog, schema, table_name), columns)
+            return table_columns
+        except Exception as e:
+            logger.warning(f"information_schema unavailable for {catalog}.{schema}: {str(e)}")
+            return None
+        finally:
+            self.release()
+    
+    def get_all_table_columns(self, catalog, schema, tables):
+        """Build the table -> columns map for the given tables, falling back to DESCRIBE per table"""
+        schema_columns = self.get_schema_columns(catalog, schema)
+        if schema_columns is None:
+            logger.info(f"Falling back to per-table DESCRIBE for {len(tables)} tables in {catalog}.{schema}")
+            schema_columns = {}
+        
+        table_columns = {}
+        for table in tables:
+            if table in schema_columns:
+                table_columns[table] = schema_columns[table]
+            else:
+                table_columns[table] = self.get_table_columns(catalog, schema, table)
+        return table_columns
+    
+    def iter_all_table_columns(self, catalog, schema, tables):
+        """get_all_table_columns() in pieces: yields table -> columns dicts as information_schema rows arrive.
+
+        Rows come ordered by table, so every fetchmany() batch completes the tables
+        before its last one; those are yielded straight away. Tables information_schema
+        does not cover are then DESCRIBEd one at a time.
+        """
+        remaining = dict.fromkeys(tables)
+        found, schema_columns = self._cached(('schema_columns', catalog, schema))
+        if found:
+            table_columns = {table: columns for table, columns in schema_columns.items() if table in remaining}
+            if table_columns:
+                yield table_columns
+            for table in table_columns:
+                del remaining[table]
+        else:
+            schema_columns = {}
+            try:
+                if self.connect(catalog, schema):
+                    schema_literal = schema.replace("'", "''")
+                    query = f"""
+                        SELECT table_name, column_name, data_type
+                        FROM {catalog}.information_schema.columns
+                        WHERE table_schema = '{schema_literal}'
+                        ORDER BY table_name, ordinal_position
+                    """
+                    fetch_batch = lambda cursor: cursor.fetchmany(COLUMN_FETCH_BATCH_SIZE)
+                    rows = self._execute('information_schema_columns', query, fetch=fetch_batch)
+                    open_table = None  # Last table of the previous batch, whose columns may continue
+                    while rows:
+                        finished = []
+                        for table_name, column_name, data_type in rows:
+                            if table_name not in schema_columns:
+                                schema_columns[table_name] = []
+                                finished.append(table_name)
+                            schema_columns[table_name].append({'name': column_name, 'type': data_type})
+                        last_table = rows[-1][0]
+                        if open_table is not None and open_table != last_table:
+                            finished.insert(0, open_table)
+                        open_table = last_table
+                        completed = {table: schema_columns[table] for table in finished
+                                     if table != last_table and table in remaining}
+                        if completed:
+                            yield completed
+                            for table in completed:
+                                del remaining[table]
+                        rows = self.cursor.fetchmany(COLUMN_FETCH_BATCH_SIZE)
+                    if open_table in remaining:
+                        yield {open_table: schema_columns[open_table]}
+                        del remaining[open_table]
+                    if self.cache is not None:
+                        self.cache.set(('schema_columns', catalog, schema), schema_columns)
+                        for table_name, columns in schema_columns.items():
+                            self.cache.set(('columns', catalog, schema, table_name), columns)
+            except Exception as e:
+                logger.warning(f"information_schema unavailable for {catalog}.{schema}: {str(e)}")
+            finally:
+                self.release()
+        
+        if remaining:
+            logger.info(f"Falling back to per-table DESCRIBE for {len(remaining)} tables in {catalog}.{schema}")
+        for table in list(remaining):
+            yield {table: self.get_table_columns(catalog, schema, table)}
+    
+    def get_columns_for_tables(self, catalog, schema, tables):
+        """Columns for just the given tables: cached entries first, then one information_schema query for the rest"""
+        table_columns = {}
+        missing = []
+        for table in tables:
+            found, columns = self._cached(('columns', catalog, schema, table))
+            if found:
+                table_columns[table] = columns
+            else:
+                missing.append(table)
+        if not missing:
+            return table_columns
+        
+        fetched = {}
+        try:
+            if self.connect(catalog, schema):
+                schema_literal = schema.replace("'", "''")
+                table_literals = self._literal_list(missing)
+                fetched = self._execute('information_schema_columns', f"""
+                    SELECT table_name, column_name, data_type
+                    FROM {catalog}.information_schema.columns
+                    WHERE table_schema = '{schema_literal}' AND table_name IN ({table_literals})
+                    ORDER BY table_name, ordinal_position
+                """, fetch=self._fetch_columns_by_table)
+                if self.cache is not None:
+                    for table_name, columns in fetched.items():
+                        self.cache.set(('columns', catalog, schema, table_name), columns)
+        except Exception as e:
+            logger.warning(f"information_schema unavailable for {catalog}.{schema}: {str(e)}")
+        finally:
+            self.release()
+        
+        for table in missing:
+            if table in fetched:
+                table_columns[table] = fetched[table]
+            else:
+                table_columns[table] = self.get_table_columns(catalog, schema, table)
+        return table_columns
+    
+    def resolve_schema_tables(self, catalog, schema_tables):
+        """Table lists for many schemas plus columns for the wanted tables, in one pass.
+
+        `schema_tables` maps schema -> table names whose columns are needed. Schemas
+        are resolved DISCOVERY_SCHEMAS_PER_QUERY at a time with information_schema
+        queries filtered by IN lists, DISCOVERY_CONCURRENCY batches in parallel, and
+        everything fetched is cached per schema and table. Returns schema ->
+        {'tables': [...], 'columns': {table: columns}}; the table list is empty for
+        schemas that do not exist. Wanted tables missing from their schema are left out.
+        """
+        resolved = {}
+        for batch_result in self.iter_resolve_schema_tables(catalog, schema_tables):
+            resolved.update(batch_result)
+        return resolved
+    
+    def iter_resolve_schema_tables(self, catalog, schema_tables):
+        """resolve_schema_tables() one batch at a time: cached schemas first, then each batch in schema order"""
+        resolved = {}
+        pending = {}
+        for schema, tables in schema_tables.items():
+            listed, listing = self._cached(('tables', catalog, schema))
+            wanted = list(dict.fromkeys(tables))
+            columns = {}
+            for table in wanted:
+                found, table_columns = self._cached(('columns', catalog, schema, table))
+                if found:
+                    columns[table] = table_columns
+            if listed and all(table in columns or table not in listing for table in wanted):
+                resolved[schema] = {'tables': listing, 'columns': columns}
+            else:
+                pending[schema] = (listing if listed else None, wanted, columns)
+        if resolved:
+            yield resolved
+        
+        schemas = list(pending)
+        batch_size = max(DISCOVERY_SCHEMAS_PER_QUERY, 1)
+        batches = [{schema: pending[schema] for schema in schemas[i:i + batch_size]}
+                   for i in range(0, len(schemas), batch_size)]
+        logger.info(f"Resolving {len(schema_tables)} schemas in {catalog} "
+                    f"({len(resolved)} cached, {len(schemas)} from Trino in {len(batches)} batches)")
+        if len(batches) > 1 and DISCOVERY_CONCURRENCY > 1:
+            with ThreadPoolExecutor(max_workers=min(DISCOVERY_CONCURRENCY, len(batches)),
+                                    thread_name_prefix='discover') as executor:
+                for batch_result in executor.map(lambda batch: self._resolve_schema_batch(catalog, batch), batches):
+                    yield batch_result
+        else:
+            for batch in batches:
+                yield self._resolve_schema_batch(catalog, batch)
+    
+    def _resolve_schema_batch(self, catalog, batch):
+        """One information_schema.tables and one information_schema.columns query for a batch of schemas"""
+        listings = {schema: listing for schema, (listing, _, _) in batch.items() if listing is not None}
+        columns_found = {}
+        try:
+            if not self.connect(catalog):
+                raise trino_exceptions.TrinoConnectionError(f"Could not connect to catalog {catalog}")
+            
+            unlisted = [schema for schema in batch if schema not in listings]
+            if unlisted:
+                rows = self._execute('information_schema_tables', f"""
+                    SELECT table_schema, table_name
+                    FROM {catalog}.information_schema.tables
+                    WHERE table_schema IN ({self._literal_list(unlisted)})
+                    ORDER BY table_schema, table_name
+                """)
+                for schema in unlisted:
+                    listings[schema] = []
+                for schema, table_name in rows:
+                    listings[schema].append(table_name)
+                if self.cache is not None:
+                    for schema in unlisted:
+                        if listings[schema]:
+                            self.cache.set(('tables', catalog, schema), listings[schema])
+            
+            wanted = {}
+            for schema, (_, tables, columns) in batch.items():
+                existing = set(listings[schema])
+                missing = [table for table in tables if table in existing and table not in columns]
+                if missing:
+                    wanted[schema] = missing
+            if wanted:
+                table_names = list(dict.fromkeys(table for tables in wanted.values() for table in tables))
+                columns_found = self._execute('information_schema_columns', f"""
+                    SELECT table_schema, table_name, column_name, data_type
+                    FROM {catalog}.information_schema.columns
+                    WHERE table_schema IN ({self._literal_list(wanted)})
+                    AND table_name IN ({self._literal_list(table_names)})
+                    ORDER BY table_schema, table_name, ordinal_position
+                """, fetch=self._fetch_columns_by_schema_table)
+                if self.cache is not None:
+                    for (schema, table_name), table_columns in columns_found.items():
+                        self.cache.set(('columns', catalog, schema, table_name), table_columns)
+        except Exception as e:
+            logger.warning(f"information_schema lookup failed for {len(batch)} schemas in {catalog}, "
+                           f"falling back to per-schema queries: {str(e)}")
+        finally:
+            self.release()
+        
+        resolved = {}
+        for schema, (_, tables, columns) in batch.items():
+            listing = listings[schema] if schema in listings else self.get_tables(catalog, schema)
+            existing = set(listing)
+            missing = []
+            for table in tables:
+                if table not in existing or table in columns:
+                    continue
+                if (schema, table) in columns_found:
+                    columns[table] = columns_found[(schema, table)]
+                else:
+                    missing.append(table)
+            if missing:
+                # Connectors without information_schema columns (or views it skips) go table by table
+                columns.update(self.get_columns_for_tables(catalog, schema, missing))
+            resolved[schema] = {'tables': listing, 'columns': columns}
+        return resolved
+    
+    def get_schema_fingerprints(self, catalog, schemas):
+        """Column count and order-independent checksum of every given schema's tables and columns.
+
+        One grouped information_schema query; schemas without columns get (0, None).
+        Returns None when the catalog's connector cannot answer it.
+        """
+        try:
+            if not self.connect(catalog):
+                return None
+            rows = self._execute('information_schema_fingerprint', f"""
+                SELECT table_schema, count(*), checksum(table_name || '.' || column_name || ' ' || data_type)
+                FROM {catalog}.information_schema.columns
+                WHERE table_schema IN ({self._literal_list(schemas)})
+                GROUP BY table_schema
+            """)
+            fingerprints = {schema: (0, None) for schema in schemas}
+            for schema, column_count, checksum in rows:
+                fingerprints[schema] = (column_count, checksum)
+            return fingerprints
+        except Exception as e:
+            logger.warning(f"Could not fingerprint {len(schemas)} schemas in {catalog}: {str(e)}")
+            return None
+        finally:
+            self.release()
+    
+    def get_schema_listings(self, catalog, schemas):
+        """Every table and column of the given schemas: schema -> {'tables': [...], 'columns': {table: columns}}.
+
+        Two information_schema queries filtered by a table_schema IN list, falling
+        back to SHOW TABLES and per-schema column loading when those fail.
+        """
+        try:
+            if not self.connect(catalog):
+                raise trino_exceptions.TrinoConnectionError(f"Could not connect to catalog {catalog}")
+            schema_literals = self._literal_list(schemas)
+            rows = self._execute('information_schema_tables', f"""
+                SELECT table_schema, table_name
+                FROM {catalog}.information_schema.tables
+                WHERE table_schema IN ({schema_literals})
+                ORDER BY table_schema, table_name
+            """)
+            columns = self._execute('information_schema_columns', f"""
+                SELECT table_schema, table_name, column_name, data_type
+                FROM {catalog}.information_schema.columns
+                WHERE table_schema IN ({schema_literals})
+                ORDER BY table_schema, table_name, ordinal_position
+            """, fetch=self._fetch_columns_by_schema_table)
+            listings = {schema: {'tables': [], 'columns': {}} for schema in schemas}
+            for schema, table_name in rows:
+                listings[schema]['tables'].append(table_name)
+            for (schema, table_name), table_columns in columns.items():
+                listings[schema]['columns'][table_name] = table_columns
+            return listings
+        except Exception as e:
+            logger.warning(f"information_schema listing failed for {len(schemas)} schemas in {catalog}, "
+                           f"falling back to per-schema queries: {str(e)}")
+        finally:
+            self.release()
+        
+        listings = {}
+        for schema in schemas:
+            tables = self.get_tables(catalog, schema)
+            listings[schema] = {'tables': tables, 'columns': self.get_all_table_columns(catalog, schema, tables)}
+        return listings
+    
+    def get_table_row_count_estimate(self, catalog, schema, table_name):
+        """Read the connector's row count statistic via SHOW STATS FOR (no table scan)"""
+        try:
+            if not self.connect(catalog, schema):
+                return None
+            # The summary row has a NULL column_name and carries row_count in the 5th field
+            for row in self._execute('show_stats', f"SHOW STATS FOR {catalog}.{schema}.{table_name}"):
+                if row[0] is None and row[4] is not None:
+                    return int(row[4])
+            return None
+        except Exception as e:
+            logger.warning(f"No statistics available for {catalog}.{schema}.{table_name}: {str(e)}")
+            return None
+        finally:
+            self.release()
+    
+    def get_table_row_count_exact(self, catalog, schema, table_name, timeout=TRINO_COUNT_TIMEOUT):
+        """Run SELECT COUNT(*), cancelling the query if it runs past the deadline.
+
+        The deadline is always set and never longer than TRINO_COUNT_TIMEOUT, whatever
+        the caller asks for, so a request cannot start an unbounded full-table scan.
+        """
+        if not timeout or timeout <= 0 or timeout > TRINO_COUNT_TIMEOUT:
+            timeout = TRINO_COUNT_TIMEOUT
+        timer = None
+        try:
+            if not self.connect(catalog, schema):
+                return None
+            cursor = self.cursor
+            timer = threading.Timer(timeout, cursor.cancel)
+            timer.daemon = True
+            timer.start()
+            with track_trino_query('count'):
+                cursor.execute(f"SELECT COUNT(*) FROM {catalog}.{schema}.{table_name}")
+                return cursor.fetchone()[0]
+        except Exception as e:
+            logger.warning(f"Exact row count failed for {catalog}.{schema}.{table_name} (deadline {timeout}s): {str(e)}")
+            return None
+        finally:
+            if timer:
+                timer.cancel()
+            self.release()
+    
+    def get_table_summary(self, catalog, schema, table_name, exact_count=False, count_timeout=TRINO_COUNT_TIMEOUT):
+        try:
+            columns = self.get_table_columns(catalog, schema, table_name)
+            if not columns:
+                return None
+            
+            # Row count comes from connector statistics; an exact COUNT(*) scans the
+            # whole table, so it only runs when explicitly requested and under a deadline
+            row_count = None
+            row_count_source = 'unavailable'
+            if exact_count:
+                row_count = self.get_table_row_count_exact(catalog, schema, table_name, count_timeout)
+                if row_count is not None:
+                    row_count_source = 'exact'
+            if row_count is None:
+                row_count = self.get_table_row_count_estimate(catalog, schema, table_name)
+                if row_count is not None:
+                    row_count_source = 'statistics'
+            
+            return {
+                'table_name': table_name,
+                'columns': columns,
+                'row_count': row_count if row_count is not None else "N/A",
+                'row_count_source': row_count_source
+            }
+        except Exception as e:
+            logger.error(f"Failed to get table summary for {table_name}: {str(e)}")
+            return None
+
+trino_connector = TrinoConnector(cache=metadata_cache)
+
+class CatalogCrawler:
+    """Background thread that walks catalogs and schemas into the metadata cache.
+
+    Each pass lists the catalogs and their schemas, then fingerprints the crawled
+    schemas (column count and checksum, one grouped information_schema query per
+    batch). Only schemas whose fingerprint changed, or whose entries fell out of the
+    cache, have their tables and columns fetched again; the rest just get their expiry
+    extended. Entries are written with a TTL of at least two crawl intervals so they
+    stay warm between passes.
+    """
+    
+    def __init__(self, cache, catalogs=CRAWLER_CATALOGS, schemas=CRAWLER_SCHEMAS,
+                 interval=CRAWLER_INTERVAL, concurrency=CRAWLER_CONCURRENCY):
+        # An uncached connector, so every lookup goes to Trino
+        self.connector = TrinoConnector()
+        self.cache = cache
+        self.catalogs = list(catalogs)
+        self.schemas = set(schemas)
+        self.interval = interval
+        self.concurrency = max(concurrency, 1)
+        self._fingerprints = {}  # (catalog, schema) -> fingerprint from the last refresh
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.passes = 0
+        self.schemas_refreshed = 0
+        self.schemas_unchanged = 0
+        self.failures = 0
+        self.last_started = None
+        self.last_duration = None
+        self.last_error = None
+    
+    @property
+    def entry_ttl(self):
+        return max(self.cache.ttl, 2 * self.interval)
+    
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        if self.running:
+            return False
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='catalog-crawler', daemon=True)
+        self._thread.start()
+        logger.info(f"Catalog crawler started (every {self.interval}s, catalogs={self.catalogs or 'all'})")
+        return True
+    
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.crawl()
+            except Exception as e:
+                with self._lock:
+                    self.failures += 1
+                    self.last_error = str(e)
+                logger.error(f"Catalog crawl failed: {str(e)}")
+            self._stop.wait(self.interval)
+    
+    def crawl(self):
+        """Run one pass over the configured catalogs and return its counts"""
+        started = time.monotonic()
+        with self._lock:
+            self.last_started = time.time()
+        counts = {'catalogs': 0, 'schemas_refreshed': 0, 'schemas_unchanged': 0}
+        
+        catalogs = self.connector.get_catalogs()
+        if not catalogs:
+            raise trino_exceptions.TrinoConnectionError("No catalogs returned by Trino")
+        self.cache.set(('catalogs',), catalogs, ttl=self.entry_ttl)
+        targets = [c for c in self.catalogs if c in catalogs] if self.catalogs else [c for c in catalogs if c != 'system']
+        
+        for catalog in targets:
+            if self._stop.is_set():
+                break
+            refreshed, unchanged = self._crawl_catalog(catalog)
+            counts['catalogs'] += 1
+            counts['schemas_refreshed'] += refreshed
+            counts['schemas_unchanged'] += unchanged
+        
+        duration = time.monotonic() - started
+        with self._lock:
+            self.passes += 1
+            self.schemas_refreshed += counts['schemas_refreshed']
+            self.schemas_unchanged += counts['schemas_unchanged']
+            self.last_duration = round(duration, 3)
+            self.last_error = None
+        logger.info(f"Catalog crawl finished in {duration:.1f}s: {counts}")
+        return counts
+    
+    def _crawl_catalog(self, catalog):
+        schemas = self.connector.get_schemas(catalog)
+        if not schemas:
+            return 0, 0
+        self.cache.set(('schemas', catalog), schemas, ttl=self.entry_ttl)
+        
+        # Forget schemas that were dropped since the last pass
+        listed = set(schemas)
+        for key in [key for key in self._fingerprints if key[0] == catalog and key[1] not in listed]:
+            del self._fingerprints[key]
+            self.cache.invalidate(catalog, key[1])
+        
+        targets = [s for s in schemas if s != 'information_schema' and (not self.schemas or s in self.schemas)]
+        batch_size = max(DISCOVERY_SCHEMAS_PER_QUERY, 1)
+        batches = [targets[i:i + batch_size] for i in range(0, len(targets), batch_size)]
+        if not batches:
+            return 0, 0
+        with ThreadPoolExecutor(max_workers=min(self.concurrency, len(batches)), thread_name_prefix='crawl') as executor:
+            results = list(executor.map(lambda batch: self._crawl_batch(catalog, batch), batches))
+        return sum(r[0] for r in results), sum(r[1] for r in results)
+    
+    def _crawl_batch(self, catalog, schemas):
+        fingerprints = self.connector.get_schema_fingerprints(catalog, schemas) or {}
+        changed = []
+        for schema in schemas:
+            fingerprint = fingerprints.get(schema)
+            if (fingerprint is not None and fingerprint == self._fingerprints.get((catalog, schema))
+                    and self.cache.touch(catalog, schema, ttl=self.entry_ttl)):
+                continue
+            changed.append(schema)
+        if not changed:
+            return 0, len(schemas)
+        
+        listings = self.connector.get_schema_listings(catalog, changed)
+        for schema in changed:
+            listing = listings.get(schema)
+            if not listing or not listing['tables']:
+                self._fingerprints.pop((catalog, schema), None)
+                continue
+            # Drop stale per-table entries (dropped tables, old summaries) before rewriting
+            self.cache.invalidate(catalog, schema)
+            self.cache.set(('tables', catalog, schema), listing['tables'], ttl=self.entry_ttl)
+            self.cache.set(('schema_columns', catalog, schema), listing['columns'], ttl=self.entry_ttl)
+            for table_name, columns in listing['columns'].items():
+                self.cache.set(('columns', catalog, schema, table_name), columns, ttl=self.entry_ttl)
+            self._fingerprints[(catalog, schema)] = fingerprints.get(schema)
+        return len(changed), len(schemas) - len(changed)
+    
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': CRAWLER_ENABLED,
+                'running': self.running,
+                'catalogs': self.catalogs or 'all',
+                'schemas': sorted(self.schemas) or 'all',
+                'interval': self.interval,
+                'concurrency': self.concurrency,
+                'passes': self.passes,
+                'schemas_tracked': len(self._fingerprints),
+                'schemas_refreshed': self.schemas_refreshed,
+                'schemas_unchanged': self.schemas_unchanged,
+                'failures': self.failures,
+                'last_started': (datetime.datetime.fromtimestamp(self.last_started).isoformat()
+                                 if self.last_started else None),
+                'last_duration': self.last_duration,
+                'last_error': self.last_error
+            }
+
+catalog_crawler = CatalogCrawler(metadata_cache)
\ No newline at end of file